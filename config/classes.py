@@ -1,54 +1,201 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal, Optional
 
 
-class ToolConfig(BaseModel):
+class FrozenModel(BaseModel):
+    """Base of the configuration models; a loaded configuration is shared read-only."""
+    model_config = ConfigDict(frozen=True)
+
+
+class ToolDedupConfig(FrozenModel):
+    enabled: bool = False
+    threshold: float = Field(default=0.6, gt=0, le=1)
+    num_perm: int = Field(default=64, gt=0)
+    shingle_size: int = Field(default=4, gt=0)
+    max_attempts: int = Field(default=3, gt=0)
+    index_path: str = "tool_index.sqlite"
+
+
+class ToolConfig(FrozenModel):
     count: int = Field(gt=0)
+    dedup: ToolDedupConfig = Field(default_factory=ToolDedupConfig)
 
 
-class DocumentsConfig(BaseModel):
+class DocumentsConfig(FrozenModel):
     types: List[str]
     per_tool: int
 
 
-class ModelConfig(BaseModel):
+class ModelConfig(FrozenModel):
     tool: str
     toc: str
     section: str
 
 
-class TemperatureConfig(BaseModel):
+class TemperatureConfig(FrozenModel):
     tool: float
     section: float
 
 
-class PromptConfig(BaseModel):
+class PromptConfig(FrozenModel):
     tool: str
     toc: str
     section: str
+    tool_batch: str = "tool_ideation_batch_v1.md"
+    toc_batch: str = "toc_generation_batch_v2.md"
+    section_batch: str = "section_batch_generation_v2.md"
+    continuation: str = "continuation_v1.md"
+    issue_repair: str = "issue_repair_v1.md"
 
 
-class MaxTokensConfig(BaseModel):
+class MaxTokensConfig(FrozenModel):
     tool: int
     toc: int
     section: int
 
 
-class GenerationConfig(BaseModel):
+class SiblingBatchConfig(FrozenModel):
+    enabled: bool = False
+    token_budget: int = Field(default=4000, gt=0)
+
+
+class AdaptiveMaxTokensConfig(FrozenModel):
+    enabled: bool = False
+    path: str = "data/.cache/section_lengths.sqlite"
+    percentile: float = Field(default=95, gt=0, le=100)
+    headroom: float = Field(default=1.2, ge=1)
+    min_samples: int = Field(default=5, gt=0)
+    max_samples: int = Field(default=200, gt=0)
+    min_tokens: int = Field(default=128, gt=0)
+    max_tokens: int = Field(default=4000, gt=0)
+
+
+class TruncationConfig(FrozenModel):
+    max_continuations: int = Field(default=2, ge=0)
+    max_reissues: int = Field(default=2, ge=0)
+    growth: float = Field(default=2.0, gt=1)
+    max_tokens: int = Field(default=16000, gt=0)
+
+
+class GenerationConfig(FrozenModel):
     temperature: TemperatureConfig
     max_tokens: MaxTokensConfig
+    stream_sections: bool = False
+    tools_per_call: int = Field(default=1, gt=0)
+    tocs_per_call: int = Field(default=1, gt=0)
+    sibling_batch: SiblingBatchConfig = Field(default_factory=SiblingBatchConfig)
+    adaptive_max_tokens: AdaptiveMaxTokensConfig = Field(default_factory=AdaptiveMaxTokensConfig)
+    truncation: TruncationConfig = Field(default_factory=TruncationConfig)
+
 
+class IssueRepairConfig(FrozenModel):
+    enabled: bool = False
+    model: Optional[str] = None
+    max_attempts: int = Field(default=2, gt=0)
+    max_tokens: int = Field(default=400, gt=0)
 
-class IssueConfig(BaseModel):
+
+class IssueConfig(FrozenModel):
     min_per_document: int = Field(ge=0)
     max_per_document: int = Field(ge=0)
+    repair: IssueRepairConfig = Field(default_factory=IssueRepairConfig)
 
 
-class OutputConfig(BaseModel):
+class OutputConfig(FrozenModel):
     data_dir: str = "data"
+    incremental_html: bool = False
+    store: Literal["files", "sqlite"] = "files"
+    store_path: str = "artifacts.sqlite"
+    index: bool = True
+    index_path: str = "index.sqlite"
+
+
+class ConcurrencyConfig(FrozenModel):
+    documents: int = Field(default=1, gt=0)
+    sections: int = Field(default=1, gt=0)
+    context_policy: Literal["full", "preceding_siblings", "parent", "none"] = "full"
+    max_in_flight: Optional[int] = Field(default=None, gt=0)
+
+
+class WorkQueueConfig(FrozenModel):
+    lease_s: float = Field(default=600, gt=0)
+    heartbeat_s: float = Field(default=60, gt=0)
+    max_attempts: int = Field(default=3, gt=0)
+    poll_s: float = Field(default=5, gt=0)
+    wal: bool = True
+
+
+class ContextConfig(FrozenModel):
+    strategy: Literal["full", "titles", "digest", "window"] = "full"
+    digest_words: int = Field(default=60, gt=0)
+    window_tokens: int = Field(default=1500, gt=0)
+
+
+class CacheConfig(FrozenModel):
+    mode: Literal["read_through", "write_through", "bypass"] = "bypass"
+    path: str = "data/.cache/llm_responses.sqlite"
+    max_entries: Optional[int] = Field(default=None, gt=0)
+    max_age_days: Optional[float] = Field(default=None, gt=0)
+
+
+class RetryConfig(FrozenModel):
+    max_attempts: int = Field(default=5, gt=0)
+    base_delay: float = Field(default=1.0, ge=0)
+    max_delay: float = Field(default=60.0, ge=0)
+    jitter: float = Field(default=0.5, ge=0)
+    issue_attempts: int = Field(default=3, gt=0)
+
+
+class RateLimitConfig(FrozenModel):
+    rpm: Optional[int] = Field(default=None, gt=0)
+    tpm: Optional[int] = Field(default=None, gt=0)
+
+
+class ModelPricingConfig(FrozenModel):
+    input: float = Field(ge=0)
+    output: float = Field(ge=0)
+
+
+class MockBackendConfig(FrozenModel):
+    latency_distribution: Literal["constant", "uniform", "normal", "lognormal"] = "normal"
+    latency_s: float = Field(default=0.05, ge=0)
+    latency_spread_s: float = Field(default=0.02, ge=0)
+    failure_rate: float = Field(default=0.0, ge=0, le=1)
+    issue_miss_rate: float = Field(default=0.0, ge=0, le=1)
+    toc_sections: int = Field(default=5, gt=0)
+    toc_subsections: int = Field(default=2, ge=0)
+    section_paragraphs: int = Field(default=3, gt=0)
+    paragraph_words: int = Field(default=60, gt=0)
+    prefix_cache: bool = True
+    prefix_cache_min_tokens: int = Field(default=1024, ge=0)
+    seed: Optional[int] = None
+
+
+class HttpConfig(FrozenModel):
+    max_connections: int = Field(default=100, gt=0)
+    max_keepalive_connections: int = Field(default=20, ge=0)
+    keepalive_expiry_s: float = Field(default=30.0, ge=0)
+    http2: bool = True
+    connect_timeout_s: float = Field(default=10.0, gt=0)
+    timeout_s: float = Field(default=120.0, gt=0)
+    stage_timeouts_s: Dict[str, float] = Field(default_factory=dict)
+
+
+class BackendConfig(FrozenModel):
+    name: Literal["openai", "mock"] = "openai"
+    base_url: Optional[str] = None
+    api_key_env: str = "OPENAI_API_KEY"
+    http: HttpConfig = Field(default_factory=HttpConfig)
+    cassette: Optional[str] = None
+    cassette_mode: Literal["record", "replay"] = "replay"
+    mock: MockBackendConfig = Field(default_factory=MockBackendConfig)
+
+
+class RegistryConfig(FrozenModel):
+    hot_reload: bool = False
 
 
-class AppConfig(BaseModel):
+class AppConfig(FrozenModel):
     seed: int
     tools: ToolConfig
     documents: DocumentsConfig
@@ -57,3 +204,12 @@ class AppConfig(BaseModel):
     generation: GenerationConfig
     issues: IssueConfig
     output: OutputConfig
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
+    work_queue: WorkQueueConfig = Field(default_factory=WorkQueueConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    context: ContextConfig = Field(default_factory=ContextConfig)
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+    rate_limits: Dict[str, RateLimitConfig] = Field(default_factory=dict)
+    pricing: Dict[str, ModelPricingConfig] = Field(default_factory=dict)
+    backend: BackendConfig = Field(default_factory=BackendConfig)
+    registry: RegistryConfig = Field(default_factory=RegistryConfig)
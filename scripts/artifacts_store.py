@@ -1,8 +1,11 @@
 import json
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from datetime import datetime
-from typing import List
-from software_whitelisting_assistant.scripts.classes import Tool, TOC, InjectedIssue
+from typing import Any, Dict, Iterator, List, Optional
+from software_whitelisting_assistant.scripts.classes import Tool, TOC, Section, InjectedIssue
+from software_whitelisting_assistant.scripts.dataset_index import DatasetIndex, open_index
+from software_whitelisting_assistant.scripts.sqlite_store import SQLiteArtifactStore, open_store
 from software_whitelisting_assistant.scripts.utils import normalize_name
 
 
@@ -31,6 +34,74 @@ def load_prompt(name: str) -> str:
     return path.read_text(encoding="utf-8")
 
 
+def dataset_dir() -> Path:
+    """
+    Return the root folder of the dataset configured in `output.data_dir`.
+
+    Returns:
+        Path: The folder, relative paths resolved against the package root.
+    """
+    # imported here: the registry loads its prompt templates through this module
+    from software_whitelisting_assistant.scripts.registry import get_config
+
+    folder = Path(get_config().output.data_dir)
+    if not folder.is_absolute():
+        folder = Path(__file__).parent.parent / folder
+    return folder
+
+
+def sqlite_store(output_folder: Path) -> Optional[SQLiteArtifactStore]:
+    """
+    Return the SQLite store of a dataset folder, if `output.store` is `sqlite`.
+
+    Args:
+        output_folder (Path): Root folder of the dataset.
+
+    Returns:
+        SQLiteArtifactStore | None: The store, or None for the directory layout.
+    """
+    # imported here: the registry loads its prompt templates through this module
+    from software_whitelisting_assistant.scripts.registry import get_config
+
+    output = get_config().output
+    if output.store != "sqlite":
+        return None
+    return open_store(Path(output_folder) / output.store_path)
+
+
+def dataset_index(output_folder: Path) -> Optional[DatasetIndex]:
+    """
+    Return the query index of a dataset folder, if `output.index` is enabled.
+
+    Args:
+        output_folder (Path): Root folder of the dataset.
+
+    Returns:
+        DatasetIndex | None: The index, or None if disabled.
+    """
+    from software_whitelisting_assistant.scripts.registry import get_config
+
+    output = get_config().output
+    if not output.index:
+        return None
+    return open_index(Path(output_folder) / output.index_path, Path(output_folder))
+
+
+@contextmanager
+def artifacts_transaction(output_folder: Path) -> Iterator[None]:
+    """
+    Group the saves made inside the block into one transaction of the SQLite store.
+
+    Without a SQLite store files are written one by one as before.
+
+    Args:
+        output_folder (Path): Root folder of the dataset.
+    """
+    store = sqlite_store(output_folder)
+    with store.transaction() if store is not None else nullcontext():
+        yield
+
+
 def save_tool(tool: Tool, tool_dir: Path):
     """
     Save a Tool object to disk as a JSON file.
@@ -40,16 +111,22 @@ def save_tool(tool: Tool, tool_dir: Path):
         tool_dir (Path): Directory where the TOC file will be written.
     """
 
+    store = sqlite_store(tool_dir.parent)
+    if store is not None:
+        store.save_tool(tool_dir.name, tool)
+        return
+
     path = tool_dir / f"{normalize_name(tool.name)}.json"
     path.write_text(tool.model_dump_json(indent=2), encoding="utf-8")
 
 
-def load_tool(toolname: str) -> Tool:
+def load_tool(toolname: str, output_folder: Optional[Path] = None) -> Tool:
     """
     Load a Tool json object from disk.
 
     Args:
         toolname (str): The name of the tool to load.
+        output_folder (Path | None): Root folder of the dataset, defaults to TOOLS_DIR.
 
     Returns:
         Tool: The loaded and validated Tool object.
@@ -57,7 +134,12 @@ def load_tool(toolname: str) -> Tool:
     Raises:
         FileNotFoundError: If the tool JSON file does not exist.
     """
-    path = TOOLS_DIR / toolname / f"{toolname}.json"
+    folder = output_folder or TOOLS_DIR
+    store = sqlite_store(folder)
+    if store is not None:
+        return store.load_tool(toolname)
+
+    path = folder / toolname / f"{toolname}.json"
     if not path.exists():
         raise FileNotFoundError(f"Tool not found: {path}")
     return Tool.model_validate_json(path.read_text(encoding="utf-8"))
@@ -72,25 +154,98 @@ def save_toc(toc: TOC, tool_dir, toc_name: str):
         tool_dir (Path): Directory where the TOC file will be written.
         toc_name (str): Name of the TOC file (without extension).
     """
+    store = sqlite_store(Path(tool_dir).parent)
+    if store is not None:
+        store.save_toc(Path(tool_dir).name, toc_name.removeprefix("toc_"), toc)
+        return
+
     path = tool_dir / f"{toc_name}.json"
     path.write_text(toc.model_dump_json(indent=2), encoding="utf-8")
 
 
-def load_toc(toolname, document_name: str) -> TOC:
+def load_toc(toolname, document_name: str, output_folder: Optional[Path] = None) -> TOC:
     """
     Load a table of contents (TOC) for a tool from disk.
 
     Args:
         toolname (str): The name of the tool whose TOC should be loaded.
         document_name ( str): The normalized name of the document type (e.g. terms_of_service)
+        output_folder (Path | None): Root folder of the dataset, defaults to TOOLS_DIR.
 
     Returns:
         TOC: The loaded and validated TOC object.
     """
-    path = TOOLS_DIR / toolname / f"toc_{document_name}.json"
+    folder = output_folder or TOOLS_DIR
+    store = sqlite_store(folder)
+    if store is not None:
+        return store.load_toc(toolname, document_name)
+
+    path = folder / toolname / f"toc_{document_name}.json"
     return TOC.model_validate_json(path.read_text(encoding="utf-8"))
 
 
+def save_sections(sections: List[Section], tool_dir: Path, document_name: str):
+    """
+    Save the generated sections of a document to disk as a JSON file.
+
+    Args:
+        sections (List[Section]): The generated sections.
+        tool_dir (Path): Directory where the sections file will be written.
+        document_name (str): The normalized name of the document type.
+    """
+    store = sqlite_store(tool_dir.parent)
+    if store is not None:
+        store.save_sections(tool_dir.name, document_name, sections)
+        return
+
+    path = tool_dir / f"sections_{document_name}.json"
+    path.write_text(
+        json.dumps([section.model_dump(mode="json") for section in sections], indent=2),
+        encoding="utf-8"
+    )
+
+
+def load_sections(toolname: str, document_name: str, output_folder: Optional[Path] = None) -> List[Section]:
+    """
+    Load the generated sections of a document from disk.
+
+    Args:
+        toolname (str): The name of the tool the document belongs to.
+        document_name (str): The normalized name of the document type (e.g. terms_of_service)
+        output_folder (Path | None): Root folder of the dataset, defaults to TOOLS_DIR.
+
+    Returns:
+        List[Section]: The loaded and validated sections.
+
+    Raises:
+        FileNotFoundError: If the sections file does not exist.
+    """
+    folder = output_folder or TOOLS_DIR
+    store = sqlite_store(folder)
+    if store is not None:
+        return store.load_sections(toolname, document_name)
+
+    path = folder / toolname / f"sections_{document_name}.json"
+    if not path.exists():
+        raise FileNotFoundError(f"Sections not found: {path}")
+    return [Section.model_validate(raw) for raw in json.loads(path.read_text(encoding="utf-8"))]
+
+
+def html_path(tool_dir: Path, document_name: str) -> Path:
+    """
+    Return the path of the HTML file of a document.
+
+    Args:
+        tool_dir (Path): Directory of the tool.
+        document_name (str): Base name of the document (without extension).
+
+    Returns:
+        Path: The path of the HTML file.
+    """
+    document_name = document_name.replace("-", "_")
+    return tool_dir / f"{document_name}.html"
+
+
 def save_html(
     html: str,
     tool_dir: Path,
@@ -105,9 +260,38 @@ def save_html(
         document_name (str): Base name of the document (without extension).
     """
 
-    document_name = document_name.replace("-", "_")
-    path = tool_dir / f"{document_name}.html"
-    path.write_text(html, encoding="utf-8")
+    store = sqlite_store(tool_dir.parent)
+    if store is not None:
+        store.save_html(tool_dir.name, document_name.replace("-", "_"), html)
+        return
+
+    html_path(tool_dir, document_name).write_text(html, encoding="utf-8")
+
+
+def load_metadata(toolname: str, document_name: str, output_folder: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Load the metadata of a generated document.
+
+    Args:
+        toolname (str): The name of the tool the document belongs to.
+        document_name (str): The normalized name of the document type (e.g. terms_of_service)
+        output_folder (Path | None): Root folder of the dataset, defaults to TOOLS_DIR.
+
+    Returns:
+        Dict[str, Any]: The metadata written by `save_metadata`.
+
+    Raises:
+        FileNotFoundError: If the metadata file does not exist.
+    """
+    folder = output_folder or TOOLS_DIR
+    store = sqlite_store(folder)
+    if store is not None:
+        return store.load_metadata(toolname, document_name)
+
+    path = folder / toolname / f"{document_name}_metadata.json"
+    if not path.exists():
+        raise FileNotFoundError(f"Metadata not found: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
 
 
 def save_metadata(
@@ -124,7 +308,9 @@ def save_metadata(
     max_tokens_tool: int,
     max_tokens_toc: int,
     max_tokens_section: int,
-    issue_sections: List[InjectedIssue]
+    issue_sections: List[InjectedIssue],
+    usage: Optional[Dict[str, Any]] = None,
+    prompts: Optional[Dict[str, Dict[str, str]]] = None
 ) -> Path:
     """
     Save metadata describing a generated document and its generation parameters.
@@ -144,9 +330,13 @@ def save_metadata(
         max_tokens_section (int): Token limit for section generation.
         issue_sections (List[InjectedIssue]): List of injected issues found in the
             generated document.
+        usage (Dict[str, Any], optional): Token, latency and call totals of the
+            LLM calls made for the document.
+        prompts (Dict[str, Dict[str, str]], optional): Name and content hash of
+            the prompt template used for each stage.
 
     Returns:
-        Path: The path to the saved metadata JSON file.
+        Path: The path to the saved metadata JSON file (the SQLite store, if used).
     """
 
     titles_with_issues = [issue.section_title for issue in issue_sections]
@@ -175,13 +365,30 @@ def save_metadata(
         },
         "issues": {
             "total_count": len(titles_with_issues),
-            "sections_with_issues": titles_with_issues
+            "sections_with_issues": titles_with_issues,
+            "injected": [issue.model_dump(mode="json") for issue in issue_sections]
         },
         "timestamp": datetime.now().isoformat()
     }
 
+    if prompts is not None:
+        metadata["prompts"] = prompts
+
+    if usage is not None:
+        metadata["usage"] = usage
+
     filename = normalize_name(document_type)
-    metadata_path = tool_dir / f"{filename}_metadata.json"
-    metadata_path.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+
+    store = sqlite_store(tool_dir.parent)
+    if store is not None:
+        store.save_metadata(tool_dir.name, filename, metadata)
+        metadata_path = store.path
+    else:
+        metadata_path = tool_dir / f"{filename}_metadata.json"
+        metadata_path.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+
+    index = dataset_index(tool_dir.parent)
+    if index is not None:
+        index.add(tool_dir.name, filename, metadata)
 
     return metadata_path
@@ -0,0 +1,430 @@
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import openai
+from pydantic import ValidationError
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import Tool, TOC, TOCSection, Section, SectionLLMOutput, InjectedIssue
+from software_whitelisting_assistant.scripts.artifacts_store import save_toc, dataset_dir
+from software_whitelisting_assistant.scripts.context_builder import ContextBuilder
+from software_whitelisting_assistant.scripts.generate_dataset import prepare_tool_dir, finalize_document
+from software_whitelisting_assistant.scripts.generate_sections import (
+    iter_toc_sections,
+    plan_issue_sections,
+    build_issue_instruction,
+    section_from_output,
+)
+from software_whitelisting_assistant.scripts.generate_toc import generate_TOC
+from software_whitelisting_assistant.scripts.llm_client import call_llm, get_client
+from software_whitelisting_assistant.scripts.registry import get_config, get_prompt, use_config
+from software_whitelisting_assistant.scripts.seeds import SeedTree, plan_document_types
+from software_whitelisting_assistant.scripts.telemetry import telemetry_context
+from software_whitelisting_assistant.scripts.tool_dedup import generate_distinct_tool, open_tool_index
+from software_whitelisting_assistant.scripts.utils import normalize_name
+from software_whitelisting_assistant.scripts.validate import validate_toc
+
+
+BATCHES_NAME = ".batches"
+
+PLAN_NAME = "plan.json"
+REQUESTS_NAME = "requests.jsonl"
+BATCH_NAME = "batch.json"
+RESULTS_NAME = "results.jsonl"
+ERRORS_NAME = "errors.jsonl"
+
+BATCH_ENDPOINT = "/v1/responses"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchError(Exception):
+    """Raised when a batch cannot be submitted, finished or ingested."""
+    pass
+
+
+def section_request_body(config: AppConfig, prompt: str) -> Dict[str, Any]:
+    """
+    Build the Responses API request body of a section prompt.
+
+    Args:
+        config (AppConfig): The application configuration.
+        prompt (str): The rendered section prompt.
+
+    Returns:
+        Dict[str, Any]: Request body asking for a `SectionLLMOutput` JSON object.
+    """
+    return {
+        "model": config.models.section,
+        "input": prompt,
+        "temperature": config.generation.temperature.section,
+        "max_output_tokens": config.generation.max_tokens.section,
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "SectionLLMOutput",
+                "schema": SectionLLMOutput.model_json_schema(),
+                "strict": False,
+            }
+        },
+    }
+
+
+# -----------------------------
+# Phase 1: render
+# -----------------------------
+def render_batch(config: AppConfig, batch_dir: Path, output_folder: Path) -> Path:
+    """
+    Generate tools and TOCs, plan issues and render every section prompt of the run.
+
+    Batched sections cannot see each other's content, so the `previous_sections`
+    context is always the outline of the preceding section titles.
+
+    Args:
+        config (AppConfig): The application configuration.
+        batch_dir (Path): Folder receiving the plan and the JSONL request file.
+        output_folder (Path): Root folder of the generated dataset.
+
+    Returns:
+        Path: The JSONL request file.
+    """
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    seeds = SeedTree(config.seed)
+
+    doc_types_per_tool = plan_document_types(
+        seeds, config.documents.types, config.documents.per_tool, config.tools.count
+    )
+
+    template = get_prompt(config.prompts.section, "section")
+    documents: List[Dict[str, Any]] = []
+    request_count = 0
+    existing_tools = open_tool_index(output_folder, config.tools.dedup) if config.tools.dedup.enabled else None
+
+    with (batch_dir / REQUESTS_NAME).open("w", encoding="utf-8") as requests_file:
+        for tool_index, doc_types in enumerate(doc_types_per_tool):
+            print(f"[Tool] Generating Tool {tool_index+1}...")
+            try:
+                with telemetry_context(stage="tool"):
+                    tool = generate_distinct_tool(config, existing_tools)
+            except Exception as e:
+                print(f"[Error] Tool {tool_index+1} skipped: {e}")
+                continue
+            tool_dir = prepare_tool_dir(tool, output_folder)
+
+            for doc_index, document_type in enumerate(doc_types):
+                print(f"  → {document_type}")
+                try:
+                    with telemetry_context(tool=tool.name, document_type=document_type):
+                        toc = generate_TOC(
+                            tool=tool,
+                            document_type=document_type,
+                            prompt_name=config.prompts.toc,
+                            model=config.models.toc,
+                            max_tokens=config.generation.max_tokens.toc
+                        )
+                    validate_toc(toc)
+                except Exception as e:
+                    print(f"[Error] {tool.name} / {document_type} skipped: {e}")
+                    continue
+
+                save_toc(toc, tool_dir, f"toc_{normalize_name(document_type)}")
+
+                issue_sections = plan_issue_sections(toc, seeds.document(tool.name, document_type))
+                context = ContextBuilder(strategy="titles")
+                outline: List[Section] = []
+                sections: List[Dict[str, Any]] = []
+
+                for section_index, (section, level, parent) in enumerate(iter_toc_sections(toc)):
+                    custom_id = f"t{tool_index}-d{doc_index}-s{section_index}"
+                    prompt = template.render(
+                        tool_name=tool.name,
+                        purpose=tool.purpose,
+                        document_type=document_type,
+                        section_title=section.title,
+                        parent_title=parent.title if parent else "None",
+                        previous_sections=context.render(outline),
+                        issue_instruction=build_issue_instruction(section.id in issue_sections),
+                    )
+                    requests_file.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": section_request_body(config, prompt),
+                    }, ensure_ascii=False) + "\n")
+                    request_count += 1
+
+                    sections.append({
+                        "custom_id": custom_id,
+                        "id": section.id,
+                        "level": level,
+                        "parent_title": parent.title if parent else None,
+                        "prompt": prompt,
+                    })
+                    outline.append(Section(
+                        id=section.id, title=section.title, level=level,
+                        parent_id=None, content_html=""
+                    ))
+
+                documents.append({
+                    "tool": tool.model_dump(mode="json"),
+                    "tool_dir": tool_dir.name,
+                    "document_type": document_type,
+                    "toc": toc.model_dump(mode="json"),
+                    "issue_sections": sorted(issue_sections),
+                    "sections": sections,
+                })
+
+    plan = {
+        "created": datetime.now().isoformat(),
+        "config": config.model_dump(mode="json"),
+        "output_folder": str(output_folder),
+        "documents": documents,
+    }
+    (batch_dir / PLAN_NAME).write_text(json.dumps(plan, indent=2), encoding="utf-8")
+    print(f"[Info] Rendered {request_count} section requests for {len(documents)} documents")
+
+    return batch_dir / REQUESTS_NAME
+
+
+# -----------------------------
+# Phase 2: submit and poll
+# -----------------------------
+def submit_batch(batch_dir: Path, client: openai.OpenAI) -> str:
+    """
+    Upload the request file and create a batch on the provider.
+
+    Args:
+        batch_dir (Path): Folder holding the rendered request file.
+        client (openai.OpenAI): Client of the provider.
+
+    Returns:
+        str: Id of the created batch.
+    """
+    with (batch_dir / REQUESTS_NAME).open("rb") as requests_file:
+        input_file = client.files.create(file=requests_file, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    (batch_dir / BATCH_NAME).write_text(batch.model_dump_json(indent=2), encoding="utf-8")
+    print(f"[Info] Submitted batch {batch.id}")
+
+    return batch.id
+
+
+def wait_for_batch(
+    batch_dir: Path,
+    client: openai.OpenAI,
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None
+):
+    """
+    Poll the submitted batch until it reaches a final status and download its results.
+
+    Args:
+        batch_dir (Path): Folder holding the batch id.
+        client (openai.OpenAI): Client of the provider.
+        poll_interval (float): Seconds between status checks.
+        timeout (float | None): Give up after this many seconds.
+
+    Returns:
+        Batch: The finished batch object.
+
+    Raises:
+        BatchError: If the batch did not complete or the timeout was reached.
+    """
+    batch_id = json.loads((batch_dir / BATCH_NAME).read_text(encoding="utf-8"))["id"]
+    started = time.monotonic()
+
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        (batch_dir / BATCH_NAME).write_text(batch.model_dump_json(indent=2), encoding="utf-8")
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"[Batch] {batch_id}: {batch.status} ({progress})")
+
+        if batch.status in FINAL_STATUSES:
+            break
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise BatchError(f"Batch {batch_id} not finished after {timeout}s")
+        time.sleep(poll_interval)
+
+    if batch.status != "completed":
+        raise BatchError(f"Batch {batch_id} ended with status '{batch.status}'")
+
+    if batch.output_file_id:
+        content = client.files.content(batch.output_file_id)
+        (batch_dir / RESULTS_NAME).write_text(content.text, encoding="utf-8")
+    if batch.error_file_id:
+        content = client.files.content(batch.error_file_id)
+        (batch_dir / ERRORS_NAME).write_text(content.text, encoding="utf-8")
+
+    return batch
+
+
+# -----------------------------
+# Phase 3: ingest
+# -----------------------------
+def _output_text(body: Dict[str, Any]) -> str:
+    """Concatenate the output text parts of a Responses API response body."""
+    return "".join(
+        part.get("text", "")
+        for item in body.get("output", [])
+        if item.get("type") == "message"
+        for part in item.get("content", [])
+        if part.get("type") == "output_text"
+    )
+
+
+def _load_results(batch_dir: Path) -> Dict[str, SectionLLMOutput]:
+    """Parse the batch result file into section outputs keyed by custom id."""
+    results: Dict[str, SectionLLMOutput] = {}
+    path = batch_dir / RESULTS_NAME
+    if not path.exists():
+        return results
+
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            continue
+        try:
+            results[record["custom_id"]] = SectionLLMOutput.model_validate_json(
+                _output_text(response.get("body", {}))
+            )
+        except ValidationError as e:
+            print(f"[Warning] Invalid section output for {record['custom_id']}: {e}")
+
+    return results
+
+
+def _regenerate(config: AppConfig, prompt: str, has_issue: bool) -> SectionLLMOutput:
+    """Synchronously regenerate a section missing from, or rejected in, the batch results."""
+    attempts = 0
+    while True:
+        attempts += 1
+        result = call_llm(
+            prompt=prompt,
+            model=config.models.section,
+            temperature=config.generation.temperature.section,
+            max_tokens=config.generation.max_tokens.section,
+            text_format=SectionLLMOutput
+        )
+        if result.issue or not has_issue or attempts >= config.retry.issue_attempts:
+            return result
+
+
+def ingest_batch(batch_dir: Path) -> List[Tuple[str, str, Exception]]:
+    """
+    Turn the batch results into sections and save the finished documents.
+
+    Outputs go through the same `SectionLLMOutput` validation, `clean_html` and
+    `build_full_html` path as synchronous generation. Sections that failed in the
+    batch, or lack their planned issue, are regenerated synchronously. The
+    configuration the batch was rendered with is served to every stage, and
+    the documents are saved to the output folder of the plan.
+
+    Args:
+        batch_dir (Path): Folder holding the plan and the downloaded results.
+
+    Returns:
+        List[Tuple[str, str, Exception]]: Failed (tool, document type, error) entries.
+    """
+    plan = json.loads((batch_dir / PLAN_NAME).read_text(encoding="utf-8"))
+    config = AppConfig.model_validate(plan["config"])
+    # validation, prompts and regenerations read the configuration from the registry
+    use_config(config)
+    output_folder = Path(plan["output_folder"])
+    results = _load_results(batch_dir)
+    failures: List[Tuple[str, str, Exception]] = []
+    regenerated = 0
+
+    for document in plan["documents"]:
+        tool = Tool.model_validate(document["tool"])
+        toc = TOC.model_validate(document["toc"])
+        document_type = document["document_type"]
+        issue_sections = set(document["issue_sections"])
+        toc_sections: Dict[str, TOCSection] = {
+            section.id: section for section, _, _ in iter_toc_sections(toc)
+        }
+
+        try:
+            with telemetry_context(tool=tool.name, document_type=document_type, stage="section"):
+                sections: List[Section] = []
+                collected_issues: List[InjectedIssue] = []
+
+                for planned in document["sections"]:
+                    has_issue = planned["id"] in issue_sections
+                    result = results.get(planned["custom_id"])
+
+                    if result is None or (has_issue and not result.issue):
+                        regenerated += 1
+                        with telemetry_context(section_id=planned["id"]):
+                            result = _regenerate(config, planned["prompt"], has_issue)
+
+                    section, issue = section_from_output(
+                        toc_sections[planned["id"]],
+                        planned["level"],
+                        planned["parent_title"],
+                        result,
+                        has_issue
+                    )
+                    sections.append(section)
+                    if issue:
+                        collected_issues.append(issue)
+
+                finalize_document(
+                    config, tool, output_folder / document["tool_dir"], document_type,
+                    toc, sections, collected_issues
+                )
+        except Exception as e:
+            print(f"[Error] {tool.name} / {document_type} failed: {e}")
+            failures.append((tool.name, document_type, e))
+
+    print(f"[Info] Ingested {len(results)} batch results, regenerated {regenerated} sections synchronously")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate section content through the provider batch API.")
+    parser.add_argument(
+        "phase",
+        choices=["render", "submit", "wait", "ingest", "run"],
+        help="render prompts, submit the batch, wait for and download results, "
+             "ingest results into documents, or run all phases"
+    )
+    parser.add_argument("--batch-dir", type=Path, help="Batch folder (defaults to a new folder for render/run)")
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="Seconds between status checks")
+    args = parser.parse_args(argv)
+
+    if args.batch_dir is None:
+        if args.phase not in {"render", "run"}:
+            parser.error("--batch-dir is required for this phase")
+        args.batch_dir = dataset_dir() / BATCHES_NAME / datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    # only the batch endpoints need a provider client
+    client = get_client() if args.phase in {"submit", "wait", "run"} else None
+
+    if args.phase in {"render", "run"}:
+        output_folder = dataset_dir()
+        output_folder.mkdir(parents=True, exist_ok=True)
+        render_batch(get_config(), args.batch_dir, output_folder)
+    if args.phase in {"submit", "run"}:
+        submit_batch(args.batch_dir, client)
+    if args.phase in {"wait", "run"}:
+        wait_for_batch(args.batch_dir, client, poll_interval=args.poll_interval)
+    if args.phase in {"ingest", "run"}:
+        failures = ingest_batch(args.batch_dir)
+        if failures:
+            print(f"\n[Warning] {len(failures)} document(s) failed")
+
+    print(f"\nBatch folder: {args.batch_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from software_whitelisting_assistant.scripts.generate_sections import build_issue_instruction
+
+
+ISSUE_INSTRUCTION = build_issue_instruction(True)
+
+
+def stub_section_output(custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a fake `SectionLLMOutput` for a batched section request.
+
+    An issue is injected whenever the prompt asks for one.
+
+    Args:
+        custom_id (str): Id of the batched request.
+        body (Dict[str, Any]): Responses API request body.
+
+    Returns:
+        Dict[str, Any]: The structured section output.
+    """
+    output: Dict[str, Any] = {"content": f"<p>Stub content for {custom_id}.</p>"}
+    if ISSUE_INSTRUCTION in body.get("input", ""):
+        output["issue"] = {
+            "section_id": custom_id,
+            "section_title": custom_id,
+            "description": "Stub issue",
+            "severity": "minor",
+        }
+    return output
+
+
+class BatchStubServer:
+    """
+    Local stand-in for the provider file and batch endpoints.
+
+    Implements the subset of the API used by `scripts/batch.py`:
+    - POST /v1/files (multipart upload)
+    - GET  /v1/files/{id}/content
+    - POST /v1/batches
+    - GET  /v1/batches/{id}
+
+    Batches complete on the first status check after `delay` seconds. Every
+    request gets a `stub_section_output`, except the custom ids listed in
+    `fail_ids`, which come back with an error status.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, fail_ids=()):
+        self.delay = delay
+        self.fail_ids = set(fail_ids)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "BatchStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "BatchStubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -----------------------------
+    # API objects
+    # -----------------------------
+    def _store_file(self, filename: str, content: bytes, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        file = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._lock:
+            self.files[file_id] = {**file, "content": content}
+        return file
+
+    def _create_batch(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            input_file = self.files.get(payload.get("input_file_id"))
+        if input_file is None:
+            return 404, {"error": {"message": "Input file not found", "type": "invalid_request_error"}}
+
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        lines = [line for line in input_file["content"].decode("utf-8").splitlines() if line.strip()]
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": payload.get("endpoint"),
+            "input_file_id": input_file["id"],
+            "completion_window": payload.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self.batches[batch_id] = {**batch, "_lines": lines, "_started": time.monotonic()}
+        return 200, batch
+
+    def _complete_batch(self, batch: Dict[str, Any]) -> None:
+        """Produce the output and error files of a batch."""
+        outputs, errors = [], []
+        for line in batch["_lines"]:
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+            record_id = f"batch_req_{uuid.uuid4().hex[:24]}"
+
+            if custom_id in self.fail_ids:
+                errors.append({
+                    "id": record_id,
+                    "custom_id": custom_id,
+                    "response": {"status_code": 500, "body": {"error": {"message": "Stub failure"}}},
+                    "error": None,
+                })
+                continue
+
+            text = json.dumps(stub_section_output(custom_id, request["body"]))
+            outputs.append({
+                "id": record_id,
+                "custom_id": custom_id,
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "object": "response",
+                        "status": "completed",
+                        "model": request["body"].get("model"),
+                        "output": [{
+                            "type": "message",
+                            "role": "assistant",
+                            "content": [{"type": "output_text", "text": text, "annotations": []}],
+                        }],
+                    },
+                },
+                "error": None,
+            })
+
+        def to_jsonl(records) -> bytes:
+            return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+        batch["output_file_id"] = self._store_file("output.jsonl", to_jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self._store_file("errors.jsonl", to_jsonl(errors), "batch_output")["id"]
+        batch["request_counts"] = {
+            "total": len(batch["_lines"]), "completed": len(outputs), "failed": len(errors)
+        }
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def _retrieve_batch(self, batch_id: str) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return 404, {"error": {"message": "Batch not found", "type": "invalid_request_error"}}
+            if batch["status"] == "in_progress" and time.monotonic() - batch["_started"] >= self.delay:
+                self._complete_batch(batch)
+            return 200, {k: v for k, v in batch.items() if not k.startswith("_")}
+
+    # -----------------------------
+    # HTTP handling
+    # -----------------------------
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: Any, raw: bool = False):
+                data = payload if raw else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                if self.path == "/v1/files":
+                    # parse the multipart upload as a MIME message
+                    header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+                    message = BytesParser(policy=HTTP).parsebytes(header + self._body())
+                    fields = {
+                        part.get_param("name", header="content-disposition"): part
+                        for part in message.iter_parts()
+                    }
+                    upload = fields.get("file")
+                    purpose = fields["purpose"].get_content() if "purpose" in fields else "batch"
+                    if upload is None:
+                        return self._send(400, {"error": {"message": "Missing file"}})
+                    return self._send(200, stub._store_file(
+                        upload.get_filename() or "upload.jsonl",
+                        upload.get_payload(decode=True),
+                        purpose.strip()
+                    ))
+
+                if self.path == "/v1/batches":
+                    return self._send(*stub._create_batch(json.loads(self._body() or b"{}")))
+
+                self._send(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+
+                if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+                    return self._send(*stub._retrieve_batch(parts[2]))
+
+                if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+                    with stub._lock:
+                        file = stub.files.get(parts[2])
+                    if file is None:
+                        return self._send(404, {"error": {"message": "File not found"}})
+                    return self._send(200, file["content"], raw=True)
+
+                self._send(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the provider batch endpoints.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before a batch completes")
+    args = parser.parse_args()
+
+    with BatchStubServer(port=args.port, delay=args.delay) as server:
+        print(f"Batch stub server listening on {server.base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
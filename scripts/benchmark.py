@@ -0,0 +1,276 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import yaml
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import TOC
+from software_whitelisting_assistant.scripts.generate_sections import iter_toc_sections
+from software_whitelisting_assistant.scripts.load_config import load_configuration
+from software_whitelisting_assistant.scripts.sqlite_store import open_store
+from software_whitelisting_assistant.scripts.telemetry import get_telemetry
+
+
+def benchmark_config(args: argparse.Namespace, output_dir: Path) -> AppConfig:
+    """
+    Derive the benchmark configuration from `config.yaml` and the command line.
+
+    The run uses the mock backend (or a cassette), no response cache and
+    no rate limits, and writes into `output_dir`.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        output_dir (Path): Folder receiving the generated dataset.
+
+    Returns:
+        AppConfig: The benchmark configuration.
+    """
+    raw = load_configuration().model_dump(mode="json")
+
+    raw["tools"]["count"] = args.tools
+    raw["documents"]["per_tool"] = min(args.documents_per_tool, len(raw["documents"]["types"]))
+    raw["output"]["data_dir"] = str(output_dir)
+    raw["output"]["store"] = args.store
+    raw["concurrency"]["documents"] = args.document_workers
+    raw["concurrency"]["sections"] = args.section_workers
+    raw["generation"]["sibling_batch"]["enabled"] = args.sibling_batch
+    raw["issues"]["repair"]["enabled"] = args.issue_repair
+    # learned section lengths stay with the run instead of the package cache
+    raw["generation"]["adaptive_max_tokens"]["path"] = str(output_dir.parent / "section_lengths.sqlite")
+    if args.section_prompt:
+        raw["prompts"]["section"] = args.section_prompt
+    if args.toc_prompt:
+        raw["prompts"]["toc"] = args.toc_prompt
+    raw["cache"]["mode"] = "bypass"
+    raw["rate_limits"] = {}
+    raw["retry"]["base_delay"] = 0.01
+    raw["retry"]["max_delay"] = 0.1
+    raw["backend"] = {
+        "name": "mock",
+        "cassette": str(args.cassette) if args.cassette else None,
+        "cassette_mode": args.cassette_mode,
+        "mock": {
+            "latency_distribution": args.distribution,
+            "latency_s": args.latency,
+            "latency_spread_s": args.latency_spread,
+            "failure_rate": args.failure_rate,
+            "issue_miss_rate": args.issue_miss_rate,
+            "toc_sections": args.toc_sections,
+            "toc_subsections": args.toc_subsections,
+            "seed": raw["seed"],
+        },
+    }
+
+    return AppConfig.model_validate(raw)
+
+
+def count_outputs(output_dir: Path, store_path: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Count the completed documents and their sections in a generated dataset.
+
+    Args:
+        output_dir (Path): Folder holding the generated dataset.
+        store_path (Path | None): SQLite store holding the dataset, if used.
+
+    Returns:
+        Dict[str, int]: Number of documents and sections.
+    """
+    documents = sections = 0
+    if store_path is not None:
+        for document in open_store(store_path).iter_documents(with_html=False):
+            if document.metadata is not None:
+                documents += 1
+                if document.toc is not None:
+                    sections += sum(1 for _ in iter_toc_sections(document.toc))
+        return {"documents": documents, "sections": sections}
+
+    for metadata_path in output_dir.glob("*/*_metadata.json"):
+        doc_name = metadata_path.name[:-len("_metadata.json")]
+        toc_path = metadata_path.parent / f"toc_{doc_name}.json"
+        documents += 1
+        if toc_path.exists():
+            toc = TOC.model_validate_json(toc_path.read_text(encoding="utf-8"))
+            sections += sum(1 for _ in iter_toc_sections(toc))
+    return {"documents": documents, "sections": sections}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run `generate_dataset.main` against the offline backend and measure it.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict[str, Any]: Throughput, CPU time, peak RSS and time per stage.
+    """
+    # imported here so the backend picks up the benchmark configuration
+    from software_whitelisting_assistant.scripts import generate_dataset
+
+    with tempfile.TemporaryDirectory(prefix="swa_benchmark_") as tmp:
+        tmp_dir = Path(tmp)
+        output_dir = tmp_dir / "data"
+        config = benchmark_config(args, output_dir)
+
+        config_path = tmp_dir / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config.model_dump(mode="json")), encoding="utf-8")
+        previous_config_path = os.environ.get("CONFIG_PATH")
+        os.environ["CONFIG_PATH"] = str(config_path)
+
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                generate_dataset.main([])
+        finally:
+            if previous_config_path is None:
+                os.environ.pop("CONFIG_PATH", None)
+            else:
+                os.environ["CONFIG_PATH"] = previous_config_path
+        wall = time.perf_counter() - start
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+
+        counts = count_outputs(
+            output_dir,
+            output_dir / config.output.store_path if config.output.store == "sqlite" else None
+        )
+
+    report = get_telemetry().build_report()
+    cpu = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+
+    return {
+        "documents": counts["documents"],
+        "sections": counts["sections"],
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "documents_per_s": round(counts["documents"] / wall, 3),
+        "sections_per_s": round(counts["sections"] / wall, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "llm_calls": report["totals"]["calls"],
+        "retries": report["totals"]["retries"],
+        "input_tokens": report["totals"]["input_tokens"],
+        "cached_ratio": report["totals"]["cached_ratio"],
+        "truncations": report["totals"]["truncations"],
+        "continuations": report["totals"]["continuations"],
+        "reissues": report["totals"]["reissues"],
+        "issue_repairs": report["issue_repairs"],
+        "stages": report["stage_times"],
+        "settings": {
+            "tools": args.tools,
+            "documents_per_tool": args.documents_per_tool,
+            "toc_sections": args.toc_sections,
+            "toc_subsections": args.toc_subsections,
+            "latency": f"{args.distribution} {args.latency}s ± {args.latency_spread}s",
+            "failure_rate": args.failure_rate,
+            "document_workers": args.document_workers,
+            "section_workers": args.section_workers,
+            "store": args.store,
+            "prompts": [config.prompts.toc, config.prompts.section],
+        },
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare a benchmark result with a baseline result.
+
+    Args:
+        result (Dict[str, Any]): The current result.
+        baseline (Dict[str, Any]): The baseline result.
+        tolerance (float): Allowed relative slowdown or memory growth.
+
+    Returns:
+        List[str]: The regressions found, empty if none.
+    """
+    regressions = []
+    for key in ("documents_per_s", "sections_per_s"):
+        if result[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f"{key}: {result[key]} < baseline {baseline[key]}")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {result['peak_rss_mb']} > baseline {baseline['peak_rss_mb']}")
+    return regressions
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(f"Documents:      {result['documents']} ({result['documents_per_s']}/s)")
+    print(f"Sections:       {result['sections']} ({result['sections_per_s']}/s)")
+    print(f"LLM calls:      {result['llm_calls']} ({result['retries']} retries)")
+    print(f"Prompt cache:   {result['cached_ratio']:.1%} of {result['input_tokens']} input tokens")
+    print(f"Truncations:    {result['truncations']} ({result['continuations']} continued, {result['reissues']} re-issued)")
+    repairs = result["issue_repairs"]
+    print(f"Issue repairs:  {repairs['repaired']} of {repairs['sections']} sections "
+          f"({repairs['success_rate']:.0%}, {repairs['tokens_saved']} tokens / "
+          f"{repairs['output_tokens_saved']} output tokens saved)")
+    print(f"Wall time:      {result['wall_s']}s")
+    print(f"CPU time:       {result['cpu_s']}s")
+    print(f"Peak RSS:       {result['peak_rss_mb']} MB")
+    print("Per stage (summed over workers):")
+    for stage, times in result["stages"].items():
+        print(f"  {stage:<10} {times['count']:>5}x  wall {times['wall_s']:>8}s  cpu {times['cpu_s']:>8}s")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the dataset generator end to end against the offline mock backend."
+    )
+    parser.add_argument("--tools", type=int, default=5)
+    parser.add_argument("--documents-per-tool", type=int, default=4)
+    parser.add_argument("--toc-sections", type=int, default=5, help="Top-level sections per TOC")
+    parser.add_argument("--toc-subsections", type=int, default=2, help="Maximum subsections per section")
+    parser.add_argument("--distribution", choices=["constant", "uniform", "normal", "lognormal"], default="normal")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean mock latency in seconds")
+    parser.add_argument("--latency-spread", type=float, default=0.02, help="Spread of the mock latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of mock requests that time out")
+    parser.add_argument("--issue-miss-rate", type=float, default=0.0, help="Share of mock issue sections without the issue")
+    parser.add_argument("--document-workers", type=int, default=1, help="concurrency.documents")
+    parser.add_argument("--section-workers", type=int, default=1, help="concurrency.sections")
+    parser.add_argument("--sibling-batch", action="store_true", help="generation.sibling_batch.enabled")
+    parser.add_argument("--issue-repair", action="store_true", help="issues.repair.enabled")
+    parser.add_argument("--section-prompt", help="prompts.section, e.g. section_generation_v8.md")
+    parser.add_argument("--toc-prompt", help="prompts.toc, e.g. toc_generation_v8.md")
+    parser.add_argument("--store", choices=["files", "sqlite"], default="files", help="output.store")
+    parser.add_argument("--cassette", type=Path, help="Record to, or replay from, this cassette")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--output", type=Path, help="Write the result as JSON")
+    parser.add_argument("--baseline", type=Path, help="Fail if slower or larger than this earlier result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    result = run_benchmark(args)
+    print_result(result)
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\n[Regression]")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regression against the baseline ✔")
+
+
+if __name__ == "__main__":
+    main()
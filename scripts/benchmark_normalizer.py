@@ -0,0 +1,166 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, Section
+from software_whitelisting_assistant.scripts.generate_sections import build_full_html
+from software_whitelisting_assistant.scripts.html_normalizer import normalize_html
+from software_whitelisting_assistant.scripts.validate import validate_html
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # bs4 is only needed for the comparison
+    BeautifulSoup = None
+
+
+_WORDS = (
+    "the provider shall process personal data only on documented instructions of the controller "
+    "including with regard to transfers service availability security incident notification"
+).split()
+
+
+def sample_fragment(rng: random.Random, paragraphs: int, malformed: bool) -> str:
+    """
+    Build a section fragment shaped like LLM section output.
+
+    Args:
+        rng (random.Random): Random source.
+        paragraphs (int): Number of paragraphs.
+        malformed (bool): Drop a closing tag and add a stray one.
+
+    Returns:
+        str: The HTML fragment.
+    """
+    def words(count: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+    parts = []
+    for i in range(paragraphs):
+        parts.append(
+            f"<p>{words(20)} <strong>{words(2)}</strong> &amp; {words(15)} "
+            f'<a href="https://example.com/terms?a=1&amp;b={i}">{words(3)}</a> {words(10)}.</p>'
+        )
+        if i % 3 == 2:
+            parts.append("<ul>" + "".join(f"<li>{words(8)}</li>" for _ in range(3)) + "</ul>")
+
+    html = "\n".join(parts)
+    if malformed:
+        html = html.replace("</strong>", "", 1) + "</div>"
+    return html
+
+
+def time_per_item(function: Callable[[Any], Any], items: List[Any], repeat: int) -> float:
+    """Best time per item over `repeat` runs, in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Time section cleaning and document validation with and without the normalizer.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict[str, Any]: Microseconds per section and per document for each path.
+    """
+    rng = random.Random(args.seed)
+    fragments = [
+        sample_fragment(rng, args.paragraphs, rng.random() < args.malformed)
+        for _ in range(args.sections)
+    ]
+
+    toc = TOC(
+        id="benchmark",
+        title="Benchmark",
+        sections=[TOCSection(id=f"s{i}", title=f"Section {i}") for i in range(args.sections_per_document)]
+    )
+
+    def documents(clean: Callable[[str], str]) -> List[str]:
+        cleaned = [clean(fragment) for fragment in fragments]
+        return [
+            build_full_html(toc, [
+                Section(id=f"s{i}", title=f"Section {i}", level=1, parent_id=None, content_html=content)
+                for i, content in enumerate(cleaned[start:start + args.sections_per_document])
+            ])
+            for start in range(0, len(cleaned) - args.sections_per_document + 1, args.sections_per_document)
+        ]
+
+    normalized_documents = documents(lambda fragment: normalize_html(fragment).html)
+    result: Dict[str, Any] = {
+        "sections": len(fragments),
+        "documents": len(normalized_documents),
+        "normalizer": {
+            "clean_us_per_section": round(time_per_item(normalize_html, fragments, args.repeat), 1),
+            "validate_us_per_document": round(time_per_item(
+                lambda html: validate_html(html, trusted=True), normalized_documents, args.repeat
+            ), 1),
+        },
+    }
+
+    if BeautifulSoup is not None:
+        def bs4_clean(fragment: str) -> str:
+            return str(BeautifulSoup(fragment, "html.parser"))
+
+        bs4_documents = documents(bs4_clean)
+        result["bs4"] = {
+            "clean_us_per_section": round(time_per_item(bs4_clean, fragments, args.repeat), 1),
+            "validate_us_per_document": round(time_per_item(validate_html, bs4_documents, args.repeat), 1),
+        }
+        identical = sum(
+            bs4_clean(fragment) == normalize_html(fragment).html for fragment in fragments
+        )
+        result["identical_output"] = round(identical / len(fragments), 3)
+
+    return result
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(f"Sections: {result['sections']}, documents: {result['documents']}")
+    for path in ("bs4", "normalizer"):
+        if path in result:
+            print(
+                f"  {path:<11} clean {result[path]['clean_us_per_section']:>8} µs/section   "
+                f"validate {result[path]['validate_us_per_document']:>9} µs/document"
+            )
+    if "bs4" in result:
+        clean = result["bs4"]["clean_us_per_section"] / result["normalizer"]["clean_us_per_section"]
+        print(f"  clean speedup: {clean:.1f}x, identical output: {result['identical_output']:.1%}")
+    else:
+        print("  bs4 is not installed, comparison skipped")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark section cleaning and HTML validation against the BeautifulSoup path."
+    )
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--sections-per-document", type=int, default=20)
+    parser.add_argument("--malformed", type=float, default=0.1, help="Share of malformed sections")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Write the result as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    result = run_benchmark(args)
+    print_result(result)
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import Tool, TOC, Section, InjectedIssue
+
+
+MANIFEST_NAME = "manifest.json"
+JOURNAL_NAME = "journal.jsonl"
+
+
+class CheckpointError(Exception):
+    """Raised when a run manifest or journal cannot be found or read."""
+    pass
+
+
+@dataclass
+class DocumentState:
+    """
+    Completed work of a single (tool, document type) pair, rebuilt from the journal.
+    """
+    toc: Optional[TOC] = None
+    issue_plan: Optional[Set[str]] = None
+    sections: Dict[str, Tuple[Section, Optional[InjectedIssue]]] = field(default_factory=dict)
+    done: bool = False
+
+
+@dataclass
+class RunState:
+    """
+    In-memory state of a run, rebuilt by replaying its journal.
+    """
+    doc_types_per_tool: Optional[List[List[str]]] = None
+    tools: Dict[int, Tool] = field(default_factory=dict)
+    documents: Dict[Tuple[str, str], DocumentState] = field(default_factory=dict)
+
+    def document(self, tool_name: str, document_type: str) -> DocumentState:
+        return self.documents.setdefault((tool_name, document_type), DocumentState())
+
+
+class RunJournal:
+    """
+    Run manifest plus append-only journal of completed work.
+
+    Every completed tool, TOC, issue plan, section and document is appended
+    to `journal.jsonl` and flushed to disk before the run moves on, so a
+    crashed run can be resumed from the last completed step.
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = run_dir
+        self.manifest_path = run_dir / MANIFEST_NAME
+        self.journal_path = run_dir / JOURNAL_NAME
+        self.state = RunState()
+        self._lock = threading.Lock()
+
+        if not self.manifest_path.exists():
+            raise CheckpointError(f"Run manifest not found: {self.manifest_path}")
+
+        self.manifest: Dict[str, Any] = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        self._replay()
+        self._file = self.journal_path.open("a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, runs_dir: Path, config: AppConfig) -> "RunJournal":
+        """
+        Start a new run with a fresh manifest and an empty journal.
+
+        Args:
+            runs_dir (Path): Folder holding all run directories.
+            config (AppConfig): The configuration of the run.
+
+        Returns:
+            RunJournal: The journal of the new run.
+        """
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        run_dir = runs_dir / run_id
+        run_dir.mkdir(parents=True, exist_ok=False)
+
+        manifest = {
+            "run_id": run_id,
+            "created": datetime.now().isoformat(),
+            "status": "running",
+            "config": config.model_dump(mode="json"),
+        }
+        (run_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        (run_dir / JOURNAL_NAME).touch()
+
+        return cls(run_dir)
+
+    @classmethod
+    def open(cls, runs_dir: Path, run_id: str = "latest") -> "RunJournal":
+        """
+        Open an existing run for resuming.
+
+        Args:
+            runs_dir (Path): Folder holding all run directories.
+            run_id (str): Id of the run, or "latest" for the most recent one.
+
+        Returns:
+            RunJournal: The journal of the run, with its state replayed.
+
+        Raises:
+            CheckpointError: If no matching run exists.
+        """
+        if run_id == "latest":
+            runs = sorted(p for p in runs_dir.glob("*") if (p / MANIFEST_NAME).exists())
+            if not runs:
+                raise CheckpointError(f"No runs to resume in {runs_dir}")
+            return cls(runs[-1])
+
+        return cls(runs_dir / run_id)
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest["run_id"]
+
+    @property
+    def config(self) -> AppConfig:
+        """The configuration snapshot the run was started with."""
+        return AppConfig.model_validate(self.manifest["config"])
+
+    # -----------------------------
+    # Journal
+    # -----------------------------
+    def _replay(self) -> None:
+        if not self.journal_path.exists():
+            return
+
+        lines = self.journal_path.read_text(encoding="utf-8").splitlines()
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # a crash can leave a partially written last line
+                if number == len(lines):
+                    break
+                raise CheckpointError(f"Corrupt journal line {number} in {self.journal_path}")
+            self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        event = record["event"]
+
+        if event == "plan":
+            self.state.doc_types_per_tool = record["doc_types_per_tool"]
+            return
+        if event == "tool":
+            self.state.tools[record["index"]] = Tool.model_validate(record["tool"])
+            return
+
+        document = self.state.document(record["tool"], record["document_type"])
+        if event == "toc":
+            document.toc = TOC.model_validate(record["toc"])
+        elif event == "issue_plan":
+            document.issue_plan = set(record["section_ids"])
+        elif event == "section":
+            issue = record["issue"]
+            document.sections[record["section"]["id"]] = (
+                Section.model_validate(record["section"]),
+                InjectedIssue.model_validate(issue) if issue else None
+            )
+        elif event == "document":
+            document.done = True
+
+    def record(self, event: str, **payload: Any) -> None:
+        """
+        Append a completed step to the journal and apply it to the run state.
+
+        Args:
+            event (str): The kind of completed step.
+            **payload: JSON-serializable data describing the step.
+        """
+        record = {"event": event, **payload}
+        line = json.dumps(record, ensure_ascii=False)
+
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(record)
+
+    def record_plan(self, doc_types_per_tool: List[List[str]]) -> None:
+        self.record("plan", doc_types_per_tool=doc_types_per_tool)
+
+    def record_tool(self, index: int, tool: Tool) -> None:
+        self.record("tool", index=index, tool=tool.model_dump(mode="json"))
+
+    def document(self, tool_name: str, document_type: str) -> "DocumentCheckpoint":
+        """
+        Return the checkpoint of a single document.
+
+        Args:
+            tool_name (str): Name of the tool.
+            document_type (str): The document type.
+
+        Returns:
+            DocumentCheckpoint: Completed work and recorder for the document.
+        """
+        with self._lock:
+            state = self.state.document(tool_name, document_type)
+        return DocumentCheckpoint(self, tool_name, document_type, state)
+
+    def mark_status(self, status: str) -> None:
+        """
+        Update the status stored in the run manifest.
+
+        Args:
+            status (str): New status, e.g. "complete" or "failed".
+        """
+        self.manifest["status"] = status
+        self.manifest["updated"] = datetime.now().isoformat()
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        tmp_path.replace(self.manifest_path)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class DocumentCheckpoint:
+    """
+    Journal view scoped to one (tool, document type) pair.
+
+    Exposes the work completed in a previous attempt and records new work.
+    """
+
+    def __init__(self, journal: RunJournal, tool_name: str, document_type: str, state: DocumentState):
+        self.journal = journal
+        self.tool_name = tool_name
+        self.document_type = document_type
+        self.state = state
+
+    @property
+    def done(self) -> bool:
+        return self.state.done
+
+    @property
+    def toc(self) -> Optional[TOC]:
+        return self.state.toc
+
+    @property
+    def issue_plan(self) -> Optional[Set[str]]:
+        return self.state.issue_plan
+
+    def completed_section(self, section_id: str) -> Optional[Tuple[Section, Optional[InjectedIssue]]]:
+        return self.state.sections.get(section_id)
+
+    def _record(self, event: str, **payload: Any) -> None:
+        self.journal.record(
+            event,
+            tool=self.tool_name,
+            document_type=self.document_type,
+            **payload
+        )
+
+    def record_toc(self, toc: TOC) -> None:
+        self._record("toc", toc=toc.model_dump(mode="json"))
+
+    def record_issue_plan(self, section_ids: Set[str]) -> None:
+        self._record("issue_plan", section_ids=sorted(section_ids))
+
+    def record_section(self, section: Section, issue: Optional[InjectedIssue]) -> None:
+        self._record(
+            "section",
+            section=section.model_dump(mode="json"),
+            issue=issue.model_dump(mode="json") if issue else None
+        )
+
+    def record_done(self) -> None:
+        self._record("document")
@@ -11,7 +11,7 @@ class TOCSection(BaseModel):
     """
     id: str
     title: str
-    subsections: list[TOCSection] = Field(default_factory=list)
+    subsections: list["TOCSection"] = Field(default_factory=list)
 
 
 class TOC(BaseModel):
@@ -50,6 +50,29 @@ class Tool(BaseModel):
     user_base: str
 
 
+class ToolBatch(BaseModel):
+    """
+    Structured output returned by the LLM when several tools are generated in one call.
+    """
+    tools: List[Tool]
+
+
+class DocumentTOC(BaseModel):
+    """
+    The TOC of one document type, as returned in a batched TOC call.
+    """
+    document_type: str
+    toc: TOC
+
+
+class TOCBatch(BaseModel):
+    """
+    Structured output returned by the LLM when the TOCs of several
+    document types of one tool are generated in one call.
+    """
+    tocs: List[DocumentTOC]
+
+
 class SectionLLMOutput(BaseModel):
     """
     Structured output returned by the LLM for a single section.
@@ -57,7 +80,34 @@ class SectionLLMOutput(BaseModel):
     Includes generated content and any injected quality issues.
     """
     content: str
-    issue: InjectedIssue = None
+    issue: "InjectedIssue" = None
+
+
+class SectionBatchItem(BaseModel):
+    """
+    Output of one section within a batched sibling-section call.
+    """
+    id: str
+    content: str
+    issue: Optional["InjectedIssue"] = None
+
+
+class SectionBatchOutput(BaseModel):
+    """
+    Structured output returned by the LLM when several sibling
+    sections are generated in one call.
+    """
+    sections: List[SectionBatchItem]
+
+
+class IssueRepairOutput(BaseModel):
+    """
+    Structured output of an issue repair call: one passage of the section
+    text and its replacement containing the injected issue.
+    """
+    original: str
+    replacement: str
+    issue: Optional["InjectedIssue"] = None
 
 
 class InjectedIssue(BaseModel):
@@ -70,4 +120,7 @@ class InjectedIssue(BaseModel):
     severity: Optional[str] = None
 
 
-TOCSection.model_rebuild()
\ No newline at end of file
+TOCSection.model_rebuild()
+SectionLLMOutput.model_rebuild()
+SectionBatchItem.model_rebuild()
+IssueRepairOutput.model_rebuild()
\ No newline at end of file
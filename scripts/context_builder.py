@@ -0,0 +1,148 @@
+import html
+import re
+from typing import Dict, List
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import Section
+from software_whitelisting_assistant.scripts.utils import estimate_tokens
+
+
+CONTEXT_STRATEGIES = ("full", "titles", "digest", "window")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def html_to_text(html_str: str) -> str:
+    """
+    Strip tags from an HTML fragment and collapse whitespace.
+
+    Args:
+        html_str (str): The HTML fragment.
+
+    Returns:
+        str: The plain text of the fragment.
+    """
+    text = html.unescape(_TAG_RE.sub(" ", html_str))
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class ContextBuilder:
+    """
+    Renders the `previous_sections` context passed to section prompts.
+
+    Strategies:
+    - full: repr of every previous Section, including its full HTML
+    - titles: indented outline of the previous section titles
+    - digest: title plus the first `digest_words` words of every previous section
+    - window: the most recent digests that fit into `window_tokens`
+
+    Digests are computed once per section and reused for every later prompt.
+    The builder also keeps the estimated input tokens of the prompts it was
+    used for, so the per-document total can be reported.
+    """
+
+    def __init__(
+        self,
+        strategy: str = "full",
+        digest_words: int = 60,
+        window_tokens: int = 1500
+    ):
+        if strategy not in CONTEXT_STRATEGIES:
+            raise ValueError(
+                f"Unknown context strategy '{strategy}', expected one of {CONTEXT_STRATEGIES}"
+            )
+        self.strategy = strategy
+        self.digest_words = digest_words
+        self.window_tokens = window_tokens
+        self.prompt_tokens = 0
+        self.prompt_count = 0
+        self._digests: Dict[str, str] = {}
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "ContextBuilder":
+        return cls(
+            strategy=config.context.strategy,
+            digest_words=config.context.digest_words,
+            window_tokens=config.context.window_tokens
+        )
+
+    def digest(self, section: Section) -> str:
+        """
+        Return the compact digest of a section, computing it on first use.
+
+        Args:
+            section (Section): A generated section.
+
+        Returns:
+            str: Indented title followed by the opening words of the section.
+        """
+        digest = self._digests.get(section.id)
+        if digest is None:
+            words = html_to_text(section.content_html).split()
+            summary = " ".join(words[:self.digest_words])
+            if len(words) > self.digest_words:
+                summary += " …"
+            indent = "  " * (section.level - 1)
+            digest = f"{indent}- {section.title}: {summary}"
+            self._digests[section.id] = digest
+        return digest
+
+    def render(self, sections: List[Section]) -> str:
+        """
+        Render the context for the previously generated sections.
+
+        Args:
+            sections (List[Section]): Previously generated sections, in TOC order.
+
+        Returns:
+            str: The context to insert into the prompt.
+        """
+        if self.strategy == "full":
+            return str(sections)
+
+        if not sections:
+            return "None"
+
+        if self.strategy == "titles":
+            return "\n".join(
+                f"{'  ' * (section.level - 1)}- {section.title}" for section in sections
+            )
+
+        if self.strategy == "digest":
+            return "\n".join(self.digest(section) for section in sections)
+
+        # window: newest digests first, until the token budget is used up
+        window: List[str] = []
+        budget = self.window_tokens
+        for section in reversed(sections):
+            digest = self.digest(section)
+            cost = estimate_tokens(digest) + 1
+            if cost > budget:
+                break
+            window.append(digest)
+            budget -= cost
+
+        return "\n".join(reversed(window)) if window else "None"
+
+    def record_prompt(self, prompt: str) -> None:
+        """
+        Add the estimated input tokens of a rendered prompt to the document total.
+
+        Args:
+            prompt (str): The rendered prompt sent to the LLM.
+        """
+        self.prompt_tokens += estimate_tokens(prompt)
+        self.prompt_count += 1
+
+    def report(self, document_type: str) -> None:
+        """
+        Print the estimated input tokens of all prompts built for a document.
+
+        Args:
+            document_type (str): The document type, used as label.
+        """
+        average = self.prompt_tokens // self.prompt_count if self.prompt_count else 0
+        print(
+            f"[Info] {document_type}: ~{self.prompt_tokens} section input tokens "
+            f"over {self.prompt_count} prompts (avg ~{average}, context: {self.strategy})"
+        )
@@ -0,0 +1,440 @@
+import argparse
+import json
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Severities in increasing order, as requested by the section prompt
+SEVERITIES = ("low", "medium", "high")
+
+
+@dataclass(frozen=True)
+class IndexedDocument:
+    """
+    A document as recorded in the index.
+
+    The paths point into the directory layout. With the SQLite artifact store
+    the document is loaded by `tool_key` and `document_name` instead.
+    """
+    tool_key: str
+    document_name: str
+    tool_name: str
+    category: str
+    document_type: str
+    document_title: str
+    model_tool: str
+    model_toc: str
+    model_section: str
+    prompt_tool: Optional[str]
+    prompt_toc: Optional[str]
+    prompt_section: Optional[str]
+    issue_count: int
+    timestamp: str
+    html_path: Path
+    metadata_path: Path
+
+
+@dataclass(frozen=True)
+class IndexedIssue:
+    """An injected issue as recorded in the index."""
+    tool_key: str
+    document_name: str
+    document_type: str
+    section_id: str
+    section_title: str
+    description: Optional[str]
+    severity: Optional[str]
+
+
+_DOCUMENT_COLUMNS = (
+    "tool_key", "document_name", "tool_name", "category", "document_type", "document_title",
+    "model_tool", "model_toc", "model_section", "prompt_tool", "prompt_toc", "prompt_section",
+    "issue_count", "timestamp",
+)
+
+
+def _prompt_name(prompt: str) -> str:
+    """Prompt file name, so `section_generation_v7` matches `section_generation_v7.md`."""
+    return prompt if Path(prompt).suffix else f"{prompt}.md"
+
+
+class DatasetIndex:
+    """
+    Persistent SQLite index over the tools, documents and injected issues of a dataset.
+
+    Built from the metadata saved for every document and updated on every
+    `save_metadata`, so queries never have to walk the dataset. Documents
+    are keyed by tool folder and normalized document name, as in the
+    artifact store.
+    """
+
+    def __init__(self, path: Path, data_dir: Path):
+        self.path = Path(path)
+        self.data_dir = Path(data_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                tool_key TEXT NOT NULL,
+                document_name TEXT NOT NULL,
+                tool_name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                document_type TEXT NOT NULL,
+                document_title TEXT NOT NULL,
+                model_tool TEXT NOT NULL,
+                model_toc TEXT NOT NULL,
+                model_section TEXT NOT NULL,
+                prompt_tool TEXT,
+                prompt_toc TEXT,
+                prompt_section TEXT,
+                issue_count INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (tool_key, document_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_tool ON documents (tool_name);
+            CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (document_type);
+            CREATE INDEX IF NOT EXISTS idx_documents_model ON documents (model_section);
+            CREATE INDEX IF NOT EXISTS idx_documents_prompt ON documents (prompt_section);
+            CREATE INDEX IF NOT EXISTS idx_documents_issue_count ON documents (issue_count);
+
+            CREATE TABLE IF NOT EXISTS issues (
+                tool_key TEXT NOT NULL,
+                document_name TEXT NOT NULL,
+                section_id TEXT NOT NULL,
+                section_title TEXT NOT NULL,
+                description TEXT,
+                severity TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_issues_document ON issues (tool_key, document_name);
+            CREATE INDEX IF NOT EXISTS idx_issues_severity ON issues (severity);
+            """
+        )
+        self._conn.commit()
+
+    # -----------------------------
+    # Updates
+    # -----------------------------
+    def add(self, tool_key: str, document_name: str, metadata: Dict[str, Any]) -> None:
+        """
+        Add or replace a document from its metadata.
+
+        Args:
+            tool_key (str): Folder name of the tool.
+            document_name (str): Normalized name of the document type.
+            metadata (Dict[str, Any]): The metadata written by `save_metadata`.
+        """
+        generation = metadata["generation"]
+        prompts = metadata.get("prompts", {})
+        issues = metadata["issues"]
+        # metadata written before issue details were recorded only lists the titles
+        injected = issues.get("injected") or [
+            {"section_id": "", "section_title": title} for title in issues["sections_with_issues"]
+        ]
+
+        row = (
+            tool_key,
+            document_name,
+            metadata["tool"]["name"],
+            metadata["tool"]["category"],
+            metadata["document"]["type"],
+            metadata["document"]["title"],
+            generation["model_tool"],
+            generation["model_toc"],
+            generation["model_section"],
+            prompts.get("tool", {}).get("name"),
+            prompts.get("toc", {}).get("name"),
+            prompts.get("section", {}).get("name"),
+            issues["total_count"],
+            metadata["timestamp"],
+        )
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM issues WHERE tool_key = ? AND document_name = ?",
+                    (tool_key, document_name)
+                )
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO documents ({', '.join(_DOCUMENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _DOCUMENT_COLUMNS)})",
+                    row
+                )
+                self._conn.executemany(
+                    "INSERT INTO issues (tool_key, document_name, section_id, section_title, description, severity) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            tool_key, document_name, issue["section_id"], issue["section_title"],
+                            issue.get("description"), issue.get("severity"),
+                        )
+                        for issue in injected
+                    ]
+                )
+
+    def rebuild(self, documents: Iterator[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """
+        Replace the index contents with the given documents.
+
+        Args:
+            documents (Iterator[Tuple[str, str, Dict[str, Any]]]): Tool key,
+                document name and metadata of every document.
+
+        Returns:
+            int: Number of indexed documents.
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM issues")
+                self._conn.execute("DELETE FROM documents")
+
+        count = 0
+        for tool_key, document_name, metadata in documents:
+            self.add(tool_key, document_name, metadata)
+            count += 1
+        return count
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    @staticmethod
+    def _filters(
+        tool: Optional[str],
+        document_type: Optional[str],
+        model: Optional[str],
+        prompt: Optional[str],
+        min_issues: Optional[int],
+        max_issues: Optional[int],
+        severity: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        conditions, parameters = [], []
+        if tool is not None:
+            conditions.append("(d.tool_name = ? OR d.tool_key = ?)")
+            parameters += [tool, tool]
+        if document_type is not None:
+            conditions.append("d.document_type = ?")
+            parameters.append(document_type)
+        if model is not None:
+            conditions.append("? IN (d.model_tool, d.model_toc, d.model_section)")
+            parameters.append(model)
+        if prompt is not None:
+            conditions.append("? IN (d.prompt_tool, d.prompt_toc, d.prompt_section)")
+            parameters.append(_prompt_name(prompt))
+        if min_issues is not None:
+            conditions.append("d.issue_count >= ?")
+            parameters.append(min_issues)
+        if max_issues is not None:
+            conditions.append("d.issue_count <= ?")
+            parameters.append(max_issues)
+        if severity is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM issues s WHERE s.tool_key = d.tool_key "
+                "AND s.document_name = d.document_name AND s.severity = ?)"
+            )
+            parameters.append(severity)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), parameters
+
+    def documents(
+        self,
+        *,
+        tool: Optional[str] = None,
+        document_type: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt: Optional[str] = None,
+        min_issues: Optional[int] = None,
+        max_issues: Optional[int] = None,
+        severity: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[IndexedDocument]:
+        """
+        Find documents. All given filters must match.
+
+        Args:
+            tool (str | None): Tool name or folder name.
+            document_type (str | None): Document type, e.g. "Privacy Policy".
+            model (str | None): Model used for any stage.
+            prompt (str | None): Prompt template used for any stage, with or without `.md`.
+            min_issues (int | None): Minimum number of injected issues.
+            max_issues (int | None): Maximum number of injected issues.
+            severity (str | None): At least one injected issue has this severity.
+            limit (int | None): Maximum number of results.
+
+        Returns:
+            List[IndexedDocument]: The matching documents, ordered by tool and document.
+        """
+        where, parameters = self._filters(tool, document_type, model, prompt, min_issues, max_issues, severity)
+        sql = (
+            f"SELECT {', '.join('d.' + column for column in _DOCUMENT_COLUMNS)} FROM documents d {where} "
+            "ORDER BY d.tool_key, d.document_name"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, parameters).fetchall()
+
+        results = []
+        for row in rows:
+            record = dict(zip(_DOCUMENT_COLUMNS, row))
+            tool_dir = self.data_dir / record["tool_key"]
+            results.append(IndexedDocument(
+                **record,
+                html_path=tool_dir / f"{record['document_name']}.html",
+                metadata_path=tool_dir / f"{record['document_name']}_metadata.json"
+            ))
+        return results
+
+    def issues(
+        self,
+        *,
+        tool: Optional[str] = None,
+        document_type: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt: Optional[str] = None,
+        severity: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[IndexedIssue]:
+        """
+        Find injected issues, filtered by their own severity and by their document.
+
+        Args:
+            tool (str | None): Tool name or folder name.
+            document_type (str | None): Document type, e.g. "Privacy Policy".
+            model (str | None): Model used for any stage.
+            prompt (str | None): Prompt template used for any stage, with or without `.md`.
+            severity (str | None): Severity of the issue.
+            limit (int | None): Maximum number of results.
+
+        Returns:
+            List[IndexedIssue]: The matching issues.
+        """
+        where, parameters = self._filters(tool, document_type, model, prompt, None, None, None)
+        if severity is not None:
+            where = f"{where} AND i.severity = ?" if where else "WHERE i.severity = ?"
+            parameters.append(severity)
+        sql = (
+            "SELECT i.tool_key, i.document_name, d.document_type, i.section_id, i.section_title, "
+            "i.description, i.severity FROM issues i "
+            "JOIN documents d ON d.tool_key = i.tool_key AND d.document_name = i.document_name "
+            f"{where} ORDER BY i.tool_key, i.document_name, i.section_id"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, parameters).fetchall()
+        return [IndexedIssue(*row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Indexes opened by the process, one per database file
+_indexes: Dict[Path, DatasetIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(path: Path, data_dir: Path) -> DatasetIndex:
+    """
+    Return the process-wide index of a database file, opening it on first use.
+
+    Args:
+        path (Path): Path of the index database.
+        data_dir (Path): Root folder of the indexed dataset.
+
+    Returns:
+        DatasetIndex: The index.
+    """
+    path = Path(path).resolve()
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = DatasetIndex(path, data_dir)
+        return index
+
+
+def iter_directory_metadata(data_dir: Path) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Read the metadata of every document of a `data/<tool>/` directory tree.
+
+    Yields:
+        Tuple[str, str, Dict[str, Any]]: Tool key, document name and metadata.
+    """
+    for metadata_path in sorted(Path(data_dir).glob("*/*_metadata.json")):
+        document_name = metadata_path.name[:-len("_metadata.json")]
+        yield metadata_path.parent.name, document_name, json.loads(metadata_path.read_text(encoding="utf-8"))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query or rebuild the dataset index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("rebuild", help="Rebuild the index from the saved metadata")
+
+    query = subparsers.add_parser("query", help="Find documents (or issues, with --issues)")
+    query.add_argument("--tool")
+    query.add_argument("--document-type")
+    query.add_argument("--model")
+    query.add_argument("--prompt", help="Prompt template, e.g. section_generation_v7")
+    query.add_argument("--min-issues", type=int)
+    query.add_argument("--max-issues", type=int)
+    query.add_argument("--severity", choices=SEVERITIES)
+    query.add_argument("--issues", action="store_true", help="List the matching issues instead of documents")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--json", action="store_true", help="Print full records as JSON lines")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    # imported here: the artifact store resolves the configured index
+    from software_whitelisting_assistant.scripts.artifacts_store import dataset_index, dataset_dir, sqlite_store
+
+    args = parse_args(argv)
+    data_dir = dataset_dir()
+    index = dataset_index(data_dir)
+    if index is None:
+        raise SystemExit("The dataset index is disabled (output.index: false)")
+
+    if args.command == "rebuild":
+        store = sqlite_store(data_dir)
+        if store is not None:
+            documents = (
+                (document.tool_key, document.document_name, document.metadata)
+                for document in store.iter_documents(with_html=False)
+                if document.metadata is not None
+            )
+        else:
+            documents = iter_directory_metadata(data_dir)
+        print(f"[Info] Indexed {index.rebuild(documents)} documents in {index.path}")
+        return
+
+    filters = dict(tool=args.tool, document_type=args.document_type, model=args.model, prompt=args.prompt)
+    if args.issues:
+        results = index.issues(**filters, severity=args.severity, limit=args.limit)
+    else:
+        results = index.documents(
+            **filters, min_issues=args.min_issues, max_issues=args.max_issues,
+            severity=args.severity, limit=args.limit
+        )
+
+    for result in results:
+        if args.json:
+            print(json.dumps(asdict(result), default=str))
+        elif args.issues:
+            print(f"{result.tool_key}/{result.document_name}  [{result.severity}] {result.section_title}: {result.description}")
+        else:
+            print(result.html_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, Section
+from software_whitelisting_assistant.scripts.artifacts_store import load_toc, load_sections
+from software_whitelisting_assistant.scripts.html_normalizer import is_trusted_section
+from software_whitelisting_assistant.scripts.html_writer import SECTION_END_HTML, html_document_parts, section_start_html
+from software_whitelisting_assistant.scripts.validate import HTMLValidationError, validate_html_fragment
+
+
+def section_hash(section: Section) -> str:
+    """
+    Hash the parts of a section that end up in its rendered HTML.
+
+    Args:
+        section (Section): The section to hash.
+
+    Returns:
+        str: A 16 character hex digest.
+    """
+    payload = "\0".join((section.title, str(section.level), section.content_html))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class FragmentCache:
+    """
+    Rendered and validated HTML of single sections, keyed by section id and content hash.
+
+    A fragment is the opening tag, heading and content of a section. Each
+    fragment is validated once when it enters the cache, unless its content
+    came from `normalize_html`. The least recently used fragments are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fragment(self, section: Section) -> str:
+        """
+        Return the rendered fragment of a section, rendering and validating it on a miss.
+
+        Args:
+            section (Section): The section to render.
+
+        Returns:
+            str: The section markup, without subsections and closing tag.
+
+        Raises:
+            HTMLValidationError: If the section HTML is not balanced.
+        """
+        key = (section.id, section_hash(section))
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+
+        fragment = section_start_html(section)
+        if not is_trusted_section(section):
+            try:
+                validate_html_fragment(fragment + SECTION_END_HTML)
+            except HTMLValidationError as e:
+                raise HTMLValidationError(f"Section '{section.id}': {e}") from e
+
+        with self._lock:
+            self.misses += 1
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+
+# Fragment cache shared by all documents of the process, created on first use
+_fragment_cache: FragmentCache | None = None
+_fragment_cache_lock = threading.Lock()
+
+
+def get_fragment_cache() -> FragmentCache:
+    """
+    Return the process-wide fragment cache.
+
+    Returns:
+        FragmentCache: The fragment cache.
+    """
+    global _fragment_cache
+    with _fragment_cache_lock:
+        if _fragment_cache is None:
+            _fragment_cache = FragmentCache()
+        return _fragment_cache
+
+
+class DocumentFragments:
+    """
+    A document kept as rendered subtrees, so single sections can be replaced cheaply.
+
+    The rendered HTML of every TOC subtree is kept. Replacing a section
+    re-renders only that section and the wrappers of its ancestors, reusing
+    the cached subtrees of everything else. Section fragments are validated
+    when they are rendered, so the document is never parsed as a whole.
+
+    `html` is identical to `build_full_html` with the same `strict` flag,
+    and a document accepted here passes `validate_html`.
+    """
+
+    def __init__(
+        self,
+        toc: TOC,
+        sections: List[Section], *,
+        strict: bool = False,
+        cache: Optional[FragmentCache] = None
+    ):
+        self.toc = toc
+        self.strict = strict
+        self._cache = cache or get_fragment_cache()
+        self._head, self._tail = html_document_parts(toc.title)
+
+        self._sections: Dict[str, Section] = {section.id: section for section in sections}
+        self._parents: Dict[str, Optional[str]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._subtrees: Dict[str, str] = {}
+
+        for node in toc.sections:
+            self._index(node, None)
+        self._html: Optional[str] = None
+
+    def _index(self, node: TOCSection, parent: Optional[str]) -> None:
+        self._parents[node.id] = parent
+        self._children[node.id] = [child.id for child in node.subsections or []]
+        for child in node.subsections or []:
+            self._index(child, node.id)
+        self._subtrees[node.id] = self._render(node.id)
+
+    def _render(self, node_id: str) -> str:
+        """Render a subtree from the fragment of its root and the cached subtrees of its children."""
+        section = self._sections.get(node_id)
+        if section is None:
+            if self.strict:
+                raise KeyError(f"No Section found for TOC id '{node_id}'")
+            return ""  # skip this node (and its subtree)
+
+        parts = [self._cache.fragment(section)]
+        for child_id in self._children[node_id]:
+            if self._subtrees[child_id]:
+                parts.append(self._subtrees[child_id])
+        return "\n".join(parts) + SECTION_END_HTML
+
+    def replace(self, section: Section) -> str:
+        """
+        Replace (or add) the section of a TOC node and re-render the affected subtrees.
+
+        Args:
+            section (Section): The regenerated or edited section.
+
+        Returns:
+            str: The updated HTML document.
+
+        Raises:
+            KeyError: If the section id is not part of the TOC.
+            HTMLValidationError: If the section HTML is not balanced. The
+                document is left unchanged.
+        """
+        if section.id not in self._parents:
+            raise KeyError(f"Section '{section.id}' is not part of TOC '{self.toc.id}'")
+
+        self._cache.fragment(section)
+
+        self._sections[section.id] = section
+        node_id: Optional[str] = section.id
+        while node_id is not None:
+            self._subtrees[node_id] = self._render(node_id)
+            node_id = self._parents[node_id]
+
+        self._html = None
+        return self.html
+
+    @property
+    def sections(self) -> List[Section]:
+        """The sections of the document, in TOC order."""
+        return [self._sections[node_id] for node_id in self._parents if node_id in self._sections]
+
+    @property
+    def html(self) -> str:
+        """The full HTML document."""
+        if self._html is None:
+            body = "\n\n".join(
+                self._subtrees[node.id] for node in self.toc.sections if self._subtrees[node.id]
+            )
+            self._html = self._head + body + self._tail
+        return self._html
+
+    def validate(self) -> None:
+        """
+        Run the document level checks of `validate_html`.
+
+        The fragments were validated when they were rendered, so only the
+        checks on the document as a whole are left.
+
+        Raises:
+            HTMLValidationError: If the document has no sections.
+        """
+        if not any(self._subtrees[node.id] for node in self.toc.sections):
+            raise HTMLValidationError("HTML contains no headings")
+
+
+def load_document_fragments(
+    toolname: str,
+    document_name: str, *,
+    strict: bool = False,
+    output_folder: Optional[Path] = None
+) -> DocumentFragments:
+    """
+    Load a generated document from its saved TOC and sections.
+
+    Args:
+        toolname (str): The name of the tool the document belongs to.
+        document_name (str): The normalized name of the document type (e.g. terms_of_service)
+        strict (bool): Raise KeyError for TOC nodes without a section instead of skipping them.
+        output_folder (Path | None): Root folder of the dataset, defaults to TOOLS_DIR.
+
+    Returns:
+        DocumentFragments: The document, ready for section replacement.
+    """
+    return DocumentFragments(
+        load_toc(toolname, document_name, output_folder),
+        load_sections(toolname, document_name, output_folder),
+        strict=strict
+    )
@@ -1,79 +1,360 @@
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
-from software_whitelisting_assistant.scripts.classes import Section, InjectedIssue
-import random
-from software_whitelisting_assistant.scripts.generate_tool import generate_tool
-from software_whitelisting_assistant.scripts.generate_toc import generate_TOC
-from software_whitelisting_assistant.scripts.generate_sections import generate_sections_from_toc, build_full_html
-from software_whitelisting_assistant.scripts.artifacts_store import save_toc, save_tool, save_html, save_metadata, load_tool, load_toc
-from software_whitelisting_assistant.scripts.load_config import load_configuration
+from typing import List, Optional, Sequence, Tuple
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import Section, InjectedIssue, Tool, TOC
+from software_whitelisting_assistant.scripts.generate_tool import generate_tools
+from software_whitelisting_assistant.scripts.generate_toc import generate_TOC, generate_TOCs
+from software_whitelisting_assistant.scripts.generate_sections import generate_sections_from_toc, build_full_html, check_cancelled, iter_toc_sections, plan_issue_sections
+from software_whitelisting_assistant.scripts.generate_sections_async import generate_sections_from_toc_async
+from software_whitelisting_assistant.scripts.artifacts_store import save_toc, save_tool, save_html, save_sections, save_metadata, load_tool, load_toc, load_metadata, html_path, artifacts_transaction, sqlite_store, dataset_dir
+from software_whitelisting_assistant.scripts.checkpoint import RunJournal, DocumentCheckpoint
+from software_whitelisting_assistant.scripts.fragment_cache import DocumentFragments, load_document_fragments
+from software_whitelisting_assistant.scripts.html_normalizer import is_trusted_section
+from software_whitelisting_assistant.scripts.html_writer import IncrementalHTMLWriter
+from software_whitelisting_assistant.scripts.llm_client import LLM_ERRORS, get_cache, run_async, set_cache_mode
+from software_whitelisting_assistant.scripts.registry import get_config, get_prompt, use_config
+from software_whitelisting_assistant.scripts.seeds import SeedTree, plan_document_types
+from software_whitelisting_assistant.scripts.telemetry import get_telemetry, telemetry_context
+from software_whitelisting_assistant.scripts.tool_dedup import ToolIndex, generate_distinct_tool, open_tool_index
 from software_whitelisting_assistant.scripts.utils import normalize_name
-from software_whitelisting_assistant.scripts.validate import validate_toc, validate_html, validate_injected_issues
+from software_whitelisting_assistant.scripts.validate import ToolValidationError, validate_toc, validate_html, validate_injected_issues
 
-def main():
 
-    # Load configuration
-    config = load_configuration()
-    print("Loaded configuration:")
-    print(config.model_dump_json(indent=2))
+def create_tool(
+    config: AppConfig,
+    journal: RunJournal,
+    index: int,
+    tool_index: Optional[ToolIndex] = None
+) -> Tool:
+    """
+    Generate a single tool with the configured model and prompt.
 
-    # Set seed (for testing)
-    random.seed(config.seed)
-    print(f"Seed set to {config.seed}")
+    A tool completed in an earlier attempt of the run is taken from the journal.
+    With a tool index, near-duplicates of existing tools are regenerated
+    before any TOC or section work is spent on them.
 
-    # Define output folder
-    output_folder = Path(__file__).parent.parent / "data"
-    output_folder.mkdir(parents=True, exist_ok=True)
+    Args:
+        config (AppConfig): The application configuration.
+        journal (RunJournal): Checkpoint journal of the run.
+        index (int): Index of the tool within the run.
+        tool_index (ToolIndex | None): Index of the existing tools for near-duplicate detection.
 
-    # -----------------------------
-    # Generate tools
-    # -----------------------------
-    tools = []
-    for i in range(config.tools.count):
-    # for i in range(1):
-        print(f"[Tool] Generating Tool {i+1}...")
-        tool = generate_tool(
-            model=config.models.tool,         
-            temperature=config.generation.temperature.tool,
-            max_tokens=config.generation.max_tokens.tool,
-            prompt_name=config.prompts.tool
-        )
-        tools.append(tool)
-    
-    # DEBUG
-    # tool = load_tool("pixelweave_studio")
-    # tools.append(tool)
+    Returns:
+        Tool: The generated tool.
 
-    print(f"[Info] Total tools generated: {len(tools)}")
+    Raises:
+        DuplicateToolError: If every attempt produced a near-duplicate.
+    """
+    tool = journal.state.tools.get(index)
+    if tool is not None:
+        if tool_index is not None:
+            tool_index.add(tool, claimed=True)
+        return tool
 
-    # for tool in tools:
-    #     print(tool.model_dump_json(indent=2))
+    with get_telemetry().timed("tool"):
+        tool = generate_distinct_tool(config, tool_index)
+    journal.record_tool(index, tool)
 
-    # --------------------------------------------------
-    # 3. Generate documents per tool
-    # --------------------------------------------------
-    for tool in tools:
+    return tool
+
+
+def create_tools(config: AppConfig, journal: RunJournal, tool_index: Optional[ToolIndex] = None) -> None:
+    """
+    Generate the tools missing from the journal in batches of `generation.tools_per_call`.
 
-        tool_name = normalize_name(tool.name)
-        tool_dir = output_folder / tool_name
+    The tools are recorded in the journal, where `create_tool` picks them up.
+    Tools rejected as near-duplicates, and all tools of a failed batch, are
+    left to `create_tool`, which generates them one at a time.
+
+    Args:
+        config (AppConfig): The application configuration.
+        journal (RunJournal): Checkpoint journal of the run.
+        tool_index (ToolIndex | None): Index of the existing tools for near-duplicate detection.
+    """
+    per_call = config.generation.tools_per_call
+    missing = [i for i in range(config.tools.count) if i not in journal.state.tools]
+    if per_call <= 1 or len(missing) < 2:
+        return
+
+    for start in range(0, len(missing), per_call):
+        indices = missing[start:start + per_call]
+        print(f"[Tool] Generating Tools {indices[0]+1}-{indices[-1]+1} in one call...")
+        try:
+            with get_telemetry().timed("tool"):
+                tools = generate_tools(
+                    len(indices),
+                    model=config.models.tool,
+                    temperature=config.generation.temperature.tool,
+                    max_tokens=config.generation.max_tokens.tool,
+                    prompt_name=config.prompts.tool_batch,
+                    single_prompt_name=config.prompts.tool
+                )
+        except LLM_ERRORS + (ToolValidationError,) as e:
+            print(f"[Warning] Tool batch failed, generating the tools one by one: {e}")
+            continue
+
+        for i, tool in zip(indices, tools):
+            match = tool_index.claim(tool) if tool_index is not None else None
+            if match is not None:
+                print(
+                    f"[Tool] '{tool.name}' is a near-duplicate of '{match.name}' "
+                    f"(similarity {match.similarity:.2f}), regenerating it alone"
+                )
+                continue
+            journal.record_tool(i, tool)
+
+
+def create_tocs(
+    config: AppConfig,
+    tool: Tool,
+    tool_dir: Path,
+    doc_types: List[str],
+    journal: RunJournal
+) -> None:
+    """
+    Generate the missing TOCs of a tool's documents in batches of `generation.tocs_per_call`.
+
+    The TOCs are validated, saved and recorded in the document checkpoints,
+    where `generate_document` picks them up. Documents without a TOC after
+    the batch generate it themselves, with the usual error reporting.
+
+    Args:
+        config (AppConfig): The application configuration.
+        tool (Tool): The tool the documents are generated for.
+        tool_dir (Path): Folder where the document artifacts are written.
+        doc_types (List[str]): Document types of the tool.
+        journal (RunJournal): Checkpoint journal of the run.
+    """
+    per_call = config.generation.tocs_per_call
+    if per_call <= 1:
+        return
+
+    checkpoints = {document_type: journal.document(tool.name, document_type) for document_type in doc_types}
+    pending = [
+        document_type for document_type, checkpoint in checkpoints.items()
+        if not checkpoint.done and checkpoint.toc is None
+    ]
+
+    for start in range(0, len(pending), per_call):
+        document_types = pending[start:start + per_call]
+        if len(document_types) < 2:
+            break
+
+        try:
+            with telemetry_context(tool=tool.name), get_telemetry().timed("toc"):
+                tocs = generate_TOCs(
+                    tool=tool,
+                    document_types=document_types,
+                    prompt_name=config.prompts.toc_batch,
+                    single_prompt_name=config.prompts.toc,
+                    model=config.models.toc,
+                    max_tokens=config.generation.max_tokens.toc
+                )
+        except LLM_ERRORS as e:
+            print(f"[Warning] TOC batch of {tool.name} failed, generating the TOCs one by one: {e}")
+            continue
+
+        for document_type, toc in tocs.items():
+            save_toc(toc, tool_dir, f"toc_{normalize_name(document_type)}")
+            checkpoints[document_type].record_toc(toc)
+
+
+def prepare_tool_dir(tool: Tool, output_folder: Path) -> Path:
+    """
+    Create the output folder of a tool and save the tool into it.
+
+    With the SQLite store no folder is created, the path only names the tool.
+
+    Args:
+        tool (Tool): The generated tool.
+        output_folder (Path): Root folder of the generated dataset.
+
+    Returns:
+        Path: The folder holding all artifacts of the tool.
+    """
+    tool_dir = output_folder / normalize_name(tool.name)
+    if sqlite_store(output_folder) is None:
         tool_dir.mkdir(parents=True, exist_ok=True)
 
-        # Save tools to output folder
-        save_tool(tool, tool_dir)
+    # Save tools to output folder
+    save_tool(tool, tool_dir)
 
-        print(f"\nGenerating documents for tool: {tool.name}\n")
+    return tool_dir
+
+
+def finalize_document(
+    config: AppConfig,
+    tool: Tool,
+    tool_dir: Path,
+    document_type: str,
+    toc: TOC,
+    sections: List[Section],
+    collected_issues: List[InjectedIssue],
+    writer: Optional[IncrementalHTMLWriter] = None,
+    fragments: Optional[DocumentFragments] = None
+) -> None:
+    """
+    Assemble, validate and save the HTML, sections and metadata of a generated document.
+
+    With an incremental writer the sections are already on disk, and the
+    writer only completes and publishes the document. With the fragments of
+    the document, only its replaced sections were rendered and validated.
 
-        # Pick 4 distinct document types
-        doc_types = random.sample(config.documents.types, k=config.documents.per_tool)
+    Args:
+        config (AppConfig): The application configuration.
+        tool (Tool): The tool the document is generated for.
+        tool_dir (Path): Folder where the document artifacts are written.
+        document_type (str): The type of the document.
+        toc (TOC): The table of contents of the document.
+        sections (List[Section]): The generated sections.
+        collected_issues (List[InjectedIssue]): Issues injected into the sections.
+        writer (IncrementalHTMLWriter | None): Writer that received the sections.
+        fragments (DocumentFragments | None): The document with its sections
+            already replaced, see `regenerate_sections`.
+    """
+    doc_name = normalize_name(document_type)
 
-        for document_type in doc_types:
-            print(f"  → {document_type}")
+    if writer is not None:
+        # ---- Validate & publish the incrementally written document ----
+        validate_injected_issues(collected_issues)
+        written_path = writer.close()
+    elif fragments is not None:
+        # ---- Reuse the rendered subtrees of the unchanged sections ----
+        full_html = fragments.html
+        fragments.validate()
+        validate_injected_issues(collected_issues)
+    else:
+        # ---- Assemble full HTML document ----
+        full_html = build_full_html(toc, sections)
 
-            doc_name = normalize_name(document_type)
+        # ---- Validate ----
+        validate_html(full_html, trusted=all(is_trusted_section(section) for section in sections))
+        validate_injected_issues(collected_issues)
 
-            # -----------------------------
-            # TOC
-            # -----------------------------
+    # ---- Save ----
+    with artifacts_transaction(tool_dir.parent):
+        if writer is None:
+            save_html(
+                html=full_html,
+                tool_dir=tool_dir,
+                document_name=doc_name,
+            )
+        elif config.output.store == "sqlite":
+            # the writer works on a file, the finished document goes into the store
+            save_html(
+                html=written_path.read_text(encoding="utf-8"),
+                tool_dir=tool_dir,
+                document_name=doc_name,
+            )
+            written_path.unlink()
+
+        # sections are kept so single sections can be re-assembled later (see fragment_cache)
+        save_sections(sections, tool_dir, doc_name)
+
+        # -----------------------------
+        # Metadata
+        # -----------------------------
+        usage = get_telemetry().document_totals(tool.name, document_type)
+        print(
+            f"[Info] {tool.name} / {document_type}: {usage['cached_tokens']} of {usage['input_tokens']} "
+            f"input tokens served from the provider prompt cache ({usage['cached_ratio']:.0%})"
+        )
+        repairs = usage["issue_repairs"]
+        if repairs["sections"]:
+            print(
+                f"[Info] {tool.name} / {document_type}: {repairs['repaired']} of {repairs['sections']} missing "
+                f"issues repaired ({repairs['success_rate']:.0%}), {repairs['tokens_saved']} tokens "
+                f"({repairs['output_tokens_saved']} output tokens) saved"
+            )
+
+        save_metadata(
+            tool=tool,
+            toc=toc,
+            document_type=document_type,
+            tool_dir=tool_dir,
+            model_tool=config.models.tool,
+            model_toc=config.models.toc,
+            model_section=config.models.section,
+            temperature_tool=config.generation.temperature.tool,
+            temperature_section=config.generation.temperature.section,
+            max_tokens_tool=config.generation.max_tokens.tool,
+            max_tokens_toc=config.generation.max_tokens.toc,
+            max_tokens_section=config.generation.max_tokens.section,
+            issue_sections=collected_issues,
+            usage=usage,
+            prompts={
+                stage: {"name": name, "content_hash": get_prompt(name, stage).content_hash}
+                for stage, name in config.prompts.model_dump().items()
+            }
+        )
+
+
+def generate_document(
+    config: AppConfig,
+    tool: Tool,
+    tool_dir: Path,
+    document_type: str,
+    checkpoint: Optional[DocumentCheckpoint] = None,
+    toc: Optional[TOC] = None,
+    cancel: Optional[threading.Event] = None,
+    partial_tag: Optional[str] = None
+) -> None:
+    """
+    Generate, validate and save a single document (TOC, HTML and metadata) for a tool.
+
+    All LLM calls made for the document are labelled with the tool and
+    document type in the run telemetry.
+
+    Args:
+        config (AppConfig): The application configuration.
+        tool (Tool): The tool the document is generated for.
+        tool_dir (Path): Folder where the document artifacts are written.
+        document_type (str): The type of document to generate.
+        checkpoint (DocumentCheckpoint | None): Checkpoint of the document. Work
+            completed in an earlier attempt of the run is reused.
+        toc (TOC | None): An existing TOC to generate the sections from, instead
+            of generating a new one. A TOC in the checkpoint takes precedence.
+        cancel (threading.Event | None): Event abandoning the document before the
+            next section, or before it is saved, once it is set.
+        partial_tag (str | None): Tag of the incremental `.partial` file, unique
+            per writer of the document.
+
+    Raises:
+        GenerationCancelledError: If `cancel` is set before the document is saved.
+    """
+    with telemetry_context(tool=tool.name, document_type=document_type):
+        _generate_document(config, tool, tool_dir, document_type, checkpoint, toc, cancel, partial_tag)
+
+
+def _generate_document(
+    config: AppConfig,
+    tool: Tool,
+    tool_dir: Path,
+    document_type: str,
+    checkpoint: Optional[DocumentCheckpoint],
+    toc: Optional[TOC] = None,
+    cancel: Optional[threading.Event] = None,
+    partial_tag: Optional[str] = None
+) -> None:
+    if checkpoint is not None and checkpoint.done:
+        print(f"  ✔ {document_type} (already completed)")
+        return
+
+    print(f"  → {document_type}")
+
+    doc_name = normalize_name(document_type)
+
+    # -----------------------------
+    # TOC
+    # -----------------------------
+    if checkpoint is not None and checkpoint.toc is not None:
+        toc = checkpoint.toc
+
+    if toc is None:
+        with get_telemetry().timed("toc"):
             toc = generate_TOC(
                 tool=tool,
                 document_type=document_type,
@@ -82,74 +363,451 @@ def main():
                 max_tokens=config.generation.max_tokens.toc
             )
 
-            # DEBUG
-            # doc_name = "compliance_and_certifications"
-            # toc = load_toc("pixelweave_studio", doc_name)
+        # DEBUG
+        # doc_name = "compliance_and_certifications"
+        # toc = load_toc("pixelweave_studio", doc_name)
+
+        # DEBUG
+        # if isinstance(toc, str):
+        #     print("Raw LLM output:\n", toc)
+
+        # ---- Validate & save ----
+        validate_toc(toc)
+        save_toc(toc, tool_dir, f"toc_{doc_name}")
+
+        if checkpoint is not None:
+            checkpoint.record_toc(toc)
+
+    # -----------------------------
+    # Sections / HTML
+    # -----------------------------
+    writer = None
+    if config.output.incremental_html:
+        writer = IncrementalHTMLWriter(toc, html_path(tool_dir, doc_name), partial_tag=partial_tag)
+
+    section_kwargs = dict(
+        tool=tool,
+        toc=toc,
+        document_type=document_type,
+        model=config.models.section,
+        temperature=config.generation.temperature.section,
+        max_tokens=config.generation.max_tokens.section,
+        prompt_name=config.prompts.section,
+        checkpoint=checkpoint,
+        writer=writer,
+        seeds=SeedTree(config.seed).document(tool.name, document_type),
+        cancel=cancel
+    )
+    try:
+        with get_telemetry().timed("section"):
+            if config.concurrency.sections > 1:
+                sections, collected_issues = run_async(
+                    generate_sections_from_toc_async(**section_kwargs)
+                )
+            else:
+                sections, collected_issues = generate_sections_from_toc(**section_kwargs)
+
+        check_cancelled(cancel, "assembly")
+        with get_telemetry().timed("assemble"):
+            finalize_document(config, tool, tool_dir, document_type, toc, sections, collected_issues, writer)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    if checkpoint is not None:
+        checkpoint.record_done()
+
+
+def regenerate_sections(
+    config: AppConfig,
+    tool: Tool,
+    tool_dir: Path,
+    document_type: str,
+    section_ids: Sequence[str]
+) -> None:
+    """
+    Regenerate single sections of a saved document and re-assemble it.
+
+    The other sections are kept as they are and serve as the context of the
+    regenerated ones. The document is re-assembled with `DocumentFragments`,
+    so only the replaced sections and the wrappers of their ancestors are
+    rendered and validated again.
+
+    Args:
+        config (AppConfig): The application configuration.
+        tool (Tool): The tool the document belongs to.
+        tool_dir (Path): Folder of the tool in the dataset.
+        document_type (str): The type of the document.
+        section_ids (Sequence[str]): TOC ids of the sections to regenerate.
 
-            # DEBUG
-            # for sec in toc.sections:
-            #     print(f"\nTOC Section id: {sec.id}")
-            #     print(f"TOC Section title: {sec.title}\n")
+    Raises:
+        ValueError: If a section id is not part of the TOC of the document, or
+            the saved issues do not match the issue plan (e.g. after a change of
+            `seed` or `issues`).
+        FileNotFoundError: If the document has no saved TOC, sections or metadata.
+    """
+    doc_name = normalize_name(document_type)
+    document = load_document_fragments(tool_dir.name, doc_name, output_folder=tool_dir.parent)
 
-            # DEBUG
-            # if isinstance(toc, str):
-            #     print("Raw LLM output:\n", toc)
+    unknown = sorted(set(section_ids) - {section.id for section, _, _ in iter_toc_sections(document.toc)})
+    if unknown:
+        raise ValueError(f"Unknown section id(s) {unknown} in {tool.name} / {document_type}")
 
-            # ---- Validate & save ----
-            validate_toc(toc)
-            save_toc(toc, tool_dir, f"toc_{doc_name}")
+    # the saved issues follow the issue plan of the document in TOC order
+    seeds = SeedTree(config.seed).document(tool.name, document_type)
+    issue_sections = plan_issue_sections(document.toc, seeds)
+    planned = [section.id for section in document.sections if section.id in issue_sections]
+    metadata = load_metadata(tool_dir.name, doc_name, tool_dir.parent)
+    injected = [InjectedIssue.model_validate(raw) for raw in metadata["issues"]["injected"]]
+    if len(injected) != len(planned):
+        raise ValueError(
+            f"The saved issues of {tool.name} / {document_type} do not match its issue plan, "
+            f"regenerate the whole document instead"
+        )
+    issues = dict(zip(planned, injected))
+    keep = {
+        section.id: (section, issues.get(section.id))
+        for section in document.sections
+        if section.id not in section_ids
+    }
 
-            # -----------------------------
-            # Sections / HTML
-            # -----------------------------
+    with telemetry_context(tool=tool.name, document_type=document_type):
+        with get_telemetry().timed("section"):
             sections, collected_issues = generate_sections_from_toc(
                 tool=tool,
-                toc=toc,
+                toc=document.toc,
                 document_type=document_type,
                 model=config.models.section,
                 temperature=config.generation.temperature.section,
                 max_tokens=config.generation.max_tokens.section,
-                prompt_name=config.prompts.section
+                prompt_name=config.prompts.section,
+                seeds=seeds,
+                keep=keep
             )
 
-            # DEBUG
-            # for sec in sections:
-            #     print(f"\n Section id: {sec.id}")
-            #     print(f"Section title: {sec.title}\n")
+        with get_telemetry().timed("assemble"):
+            for section in sections:
+                if section.id not in keep:
+                    document.replace(section)
+            finalize_document(
+                config, tool, tool_dir, document_type, document.toc,
+                document.sections, collected_issues, fragments=document
+            )
 
-            # ---- Assemble full HTML document ----
-            full_html = build_full_html(toc, sections)
 
-            # ---- Validate & save ----
-            validate_html(full_html)
-            validate_injected_issues(collected_issues)
-            save_html(
-                html=full_html,
-                tool_dir=tool_dir,
-                document_name=doc_name,
-            )
+def run_serial(
+    config: AppConfig,
+    output_folder: Path,
+    doc_types_per_tool: List[List[str]],
+    journal: RunJournal
+) -> List[Tuple[str, str, Exception]]:
+    """
+    Generate all tools and documents one after another.
 
-            # -----------------------------
-            # Metadata
-            # -----------------------------
-            save_metadata(
-                tool=tool,
-                toc=toc,
-                document_type=document_type,
-                tool_dir=tool_dir,
-                model_tool=config.models.tool,
-                model_toc=config.models.toc,
-                model_section=config.models.section,
-                temperature_tool=config.generation.temperature.tool,
-                temperature_section=config.generation.temperature.section,
-                max_tokens_tool=config.generation.max_tokens.tool,
-                max_tokens_toc=config.generation.max_tokens.toc,
-                max_tokens_section=config.generation.max_tokens.section,
-                issue_sections=collected_issues
-            )
+    Args:
+        config (AppConfig): The application configuration.
+        output_folder (Path): Root folder of the generated dataset.
+        doc_types_per_tool (List[List[str]]): Document types to generate, per tool index.
+        journal (RunJournal): Checkpoint journal of the run.
+
+    Returns:
+        List[Tuple[str, str, Exception]]: Failed (tool, document type, error) entries.
+    """
+    failures: List[Tuple[str, str, Exception]] = []
+    tool_index = open_tool_index(output_folder, config.tools.dedup) if config.tools.dedup.enabled else None
+
+    # -----------------------------
+    # Generate tools
+    # -----------------------------
+    create_tools(config, journal, tool_index)
+
+    tools = []
+    for i in range(config.tools.count):
+        print(f"[Tool] Generating Tool {i+1}...")
+        try:
+            tools.append((i, create_tool(config, journal, i, tool_index)))
+        except Exception as e:
+            print(f"[Error] Tool {i+1} failed: {e}")
+            failures.append((f"tool {i+1}", "*", e))
+
+    # DEBUG
+    # tool = load_tool("pixelweave_studio")
+    # tools.append(tool)
+
+    print(f"[Info] Total tools generated: {len(tools)}")
+
+    # --------------------------------------------------
+    # Generate documents per tool
+    # --------------------------------------------------
+    for i, tool in tools:
+        tool_dir = prepare_tool_dir(tool, output_folder)
+
+        print(f"\nGenerating documents for tool: {tool.name}\n")
+        create_tocs(config, tool, tool_dir, doc_types_per_tool[i], journal)
+
+        for document_type in doc_types_per_tool[i]:
+            try:
+                generate_document(
+                    config, tool, tool_dir, document_type,
+                    checkpoint=journal.document(tool.name, document_type)
+                )
+            except Exception as e:
+                print(f"[Error] {tool.name} / {document_type} failed: {e}")
+                failures.append((tool.name, document_type, e))
+
+    return failures
+
+
+def run_parallel(
+    config: AppConfig,
+    output_folder: Path,
+    doc_types_per_tool: List[List[str]],
+    journal: RunJournal
+) -> List[Tuple[str, str, Exception]]:
+    """
+    Generate tools and documents concurrently on a thread pool.
+
+    At most `concurrency.documents` tool or document jobs are in flight at once.
+    Documents of a tool are scheduled as soon as the tool and its batched TOCs
+    are generated, and a failing document does not affect any other document.
+
+    Args:
+        config (AppConfig): The application configuration.
+        output_folder (Path): Root folder of the generated dataset.
+        doc_types_per_tool (List[List[str]]): Document types to generate, per tool index.
+        journal (RunJournal): Checkpoint journal of the run.
+
+    Returns:
+        List[Tuple[str, str, Exception]]: Failed (tool, document type, error) entries.
+    """
+    failures: List[Tuple[str, str, Exception]] = []
+    tool_index = open_tool_index(output_folder, config.tools.dedup) if config.tools.dedup.enabled else None
+
+    create_tools(config, journal, tool_index)
+
+    def prepare_tool(i: int) -> Tuple[Tool, Path]:
+        tool = create_tool(config, journal, i, tool_index)
+        tool_dir = prepare_tool_dir(tool, output_folder)
+        create_tocs(config, tool, tool_dir, doc_types_per_tool[i], journal)
+        return tool, tool_dir
+
+    with ThreadPoolExecutor(max_workers=config.concurrency.documents) as executor:
+        tool_futures = {
+            executor.submit(prepare_tool, i): i
+            for i in range(config.tools.count)
+        }
+        document_futures = {}
+
+        for future in as_completed(tool_futures):
+            i = tool_futures[future]
+            try:
+                tool, tool_dir = future.result()
+            except Exception as e:
+                print(f"[Error] Tool {i+1} failed: {e}")
+                failures.append((f"tool {i+1}", "*", e))
+                continue
+
+            print(f"[Tool] Generated Tool {i+1}: {tool.name}")
+
+            for document_type in doc_types_per_tool[i]:
+                future = executor.submit(
+                    generate_document, config, tool, tool_dir, document_type,
+                    checkpoint=journal.document(tool.name, document_type)
+                )
+                document_futures[future] = (tool.name, document_type)
+
+        for future in as_completed(document_futures):
+            tool_name, document_type = document_futures[future]
+            try:
+                future.result()
+                print(f"[Done] {tool_name} / {document_type}")
+            except Exception as e:
+                print(f"[Error] {tool_name} / {document_type} failed: {e}")
+                failures.append((tool_name, document_type, e))
+
+    return failures
+
+
+def regenerate_document(
+    config: AppConfig,
+    output_folder: Path,
+    tool_name: str,
+    document_type: str,
+    new_toc: bool = False,
+    section_ids: Optional[Sequence[str]] = None
+) -> None:
+    """
+    Regenerate a single document of an existing tool, leaving the rest of the dataset untouched.
+
+    The document draws its random choices from its own node of the seed tree,
+    so with the saved TOC it gets the same issue plan as in the run that first
+    generated it, independently of every other document. A `read_through`
+    response cache is switched to `write_through`: numbering sampled requests
+    from 0 again, it would replay the cached responses and write back the
+    same document. The new responses replace the cached ones.
+
+    Args:
+        config (AppConfig): The application configuration.
+        output_folder (Path): Root folder of the generated dataset.
+        tool_name (str): Name (or folder name) of the tool.
+        document_type (str): The document type to regenerate.
+        new_toc (bool): Generate a new TOC instead of reusing the saved one.
+        section_ids (Sequence[str] | None): Regenerate only these sections of
+            the saved document, see `regenerate_sections`.
+
+    Raises:
+        ValueError: If the document type is not configured, or section ids are
+            combined with a new TOC.
+        FileNotFoundError: If the tool is not in the dataset.
+    """
+    if document_type not in config.documents.types:
+        raise ValueError(
+            f"Unknown document type '{document_type}', expected one of {config.documents.types}"
+        )
+    if section_ids and new_toc:
+        raise ValueError("Single sections can only be regenerated with the saved TOC")
+
+    if config.cache.mode == "read_through":
+        set_cache_mode("write_through")
+
+    tool_key = normalize_name(tool_name)
+    tool = load_tool(tool_key, output_folder)
+    tool_dir = output_folder / tool_key
+
+    if section_ids:
+        print(f"\nRegenerating {tool.name} / {document_type}: {', '.join(section_ids)}\n")
+        regenerate_sections(config, tool, tool_dir, document_type, section_ids)
+        print(f"[Done] {tool.name} / {document_type}")
+        return
+
+    toc = None
+    if not new_toc:
+        try:
+            toc = load_toc(tool_key, normalize_name(document_type), output_folder)
+        except FileNotFoundError:
+            print(f"[Info] No saved TOC for {tool.name} / {document_type}, generating one")
+
+    print(f"\nRegenerating {tool.name} / {document_type}\n")
+    generate_document(config, tool, tool_dir, document_type, toc=toc)
+    print(f"[Done] {tool.name} / {document_type}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line arguments of the dataset generator.
+
+    Args:
+        argv (List[str] | None): Arguments to parse, defaults to `sys.argv`.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Generate the synthetic document dataset.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Resume an interrupted run (the latest one if no id is given), "
+             "skipping every tool, TOC and section recorded in its journal."
+    )
+    parser.add_argument(
+        "--regenerate",
+        nargs=2,
+        metavar=("TOOL", "DOCUMENT_TYPE"),
+        help="Regenerate a single document of an existing tool with the same seeds, "
+             "reusing its saved TOC."
+    )
+    parser.add_argument(
+        "--new-toc",
+        action="store_true",
+        help="With --regenerate, also generate a new TOC."
+    )
+    parser.add_argument(
+        "--sections",
+        nargs="+",
+        metavar="SECTION_ID",
+        help="With --regenerate, regenerate only these sections (TOC ids) "
+             "and keep the rest of the document."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    # Define output folder
+    output_folder = dataset_dir()
+    output_folder.mkdir(parents=True, exist_ok=True)
+    runs_dir = output_folder / ".runs"
+
+    if args.regenerate:
+        config = get_config()
+        regenerate_document(
+            config, output_folder, *args.regenerate, new_toc=args.new_toc, section_ids=args.sections
+        )
+        print(f"[Info] LLM usage: {get_telemetry().build_report()['totals']}")
+        return
+
+    # Load configuration
+    if args.resume:
+        journal = RunJournal.open(runs_dir, args.resume)
+        config = journal.config
+        # the stages read the configuration from the registry, which now serves the snapshot
+        use_config(config)
+        print(f"Resuming run {journal.run_id}")
+    else:
+        config = get_config()
+        journal = RunJournal.create(runs_dir, config)
+        print(f"Started run {journal.run_id}")
+
+    print("Loaded configuration:")
+    print(config.model_dump_json(indent=2))
+
+    # Random choices come from a seed tree under the configured seed
+    # (run -> tool -> document type -> section), see scripts/seeds.py
+    seeds = SeedTree(config.seed)
+    print(f"Seed set to {config.seed}")
+
+    # Pick distinct document types per tool up front,
+    # so both execution modes make the same choices
+    doc_types_per_tool = journal.state.doc_types_per_tool
+    if doc_types_per_tool is None:
+        doc_types_per_tool = plan_document_types(
+            seeds, config.documents.types, config.documents.per_tool, config.tools.count
+        )
+        journal.record_plan(doc_types_per_tool)
+
+    try:
+        if config.concurrency.documents > 1:
+            failures = run_parallel(config, output_folder, doc_types_per_tool, journal)
+        else:
+            failures = run_serial(config, output_folder, doc_types_per_tool, journal)
+    except BaseException:
+        journal.mark_status("interrupted")
+        raise
+    finally:
+        journal.close()
+
+    print(f"\n[Info] LLM cache: {get_cache().stats()}")
+
+    report_path = journal.run_dir / "report.json"
+    report = get_telemetry().write_report(report_path)
+    print(f"[Info] LLM usage: {report['totals']} (report: {report_path})")
+
+    if failures:
+        journal.mark_status("failed")
+        print(f"\n[Warning] {len(failures)} document(s) failed:")
+        for tool_name, document_type, error in failures:
+            print(f"  - {tool_name} / {document_type}: {error}")
+        print(f"\nDataset generation finished with errors ✘ (resume with --resume {journal.run_id})")
+        return
 
+    journal.mark_status("complete")
     print("\nDataset generation complete ✔")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
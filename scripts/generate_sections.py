@@ -1,12 +1,46 @@
-from typing import List, Set, Tuple, Mapping
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Mapping
 import random
-import html
-from bs4 import BeautifulSoup
-from software_whitelisting_assistant.scripts.classes import Tool, TOC, TOCSection, Section, SectionLLMOutput, InjectedIssue
-from software_whitelisting_assistant.scripts.llm_client import call_llm
-from software_whitelisting_assistant.scripts.load_config import load_configuration
+import threading
+from software_whitelisting_assistant.scripts.classes import (
+    Tool, TOC, TOCSection, Section, SectionLLMOutput, InjectedIssue, SectionBatchOutput
+)
+from software_whitelisting_assistant.scripts.issue_repair import IssueRepair
+from software_whitelisting_assistant.scripts.length_model import SectionLengthModel, open_length_model
+from software_whitelisting_assistant.scripts.llm_client import LLM_ERRORS, call_llm
+from software_whitelisting_assistant.scripts.registry import get_config, get_prompt
 from software_whitelisting_assistant.scripts.utils import print_injected_issues, print_section_console
-from software_whitelisting_assistant.scripts.artifacts_store import load_prompt
+from software_whitelisting_assistant.scripts.checkpoint import DocumentCheckpoint
+from software_whitelisting_assistant.scripts.context_builder import ContextBuilder
+from software_whitelisting_assistant.scripts.html_normalizer import normalize_html
+from software_whitelisting_assistant.scripts.html_writer import (
+    IncrementalHTMLWriter,
+    SECTION_END_HTML,
+    html_document_parts,
+    section_start_html,
+)
+from software_whitelisting_assistant.scripts.retry import RetryBudgetExceededError
+from software_whitelisting_assistant.scripts.seeds import SeedTree
+from software_whitelisting_assistant.scripts.telemetry import LLMCallRecord, telemetry_context
+
+
+class GenerationCancelledError(Exception):
+    """Raised when the generation of a document is cancelled between two sections."""
+    pass
+
+
+def check_cancelled(cancel: Optional[threading.Event], step: str) -> None:
+    """
+    Stop the generation of a document once its cancel event is set.
+
+    Args:
+        cancel (threading.Event | None): The cancel event, e.g. set when a queue lease is lost.
+        step (str): The step about to start, e.g. "section '1.2'".
+
+    Raises:
+        GenerationCancelledError: If `cancel` is set.
+    """
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelledError(f"Generation cancelled before {step}")
 
 
 def collect_section_ids(toc) -> list[str]:
@@ -36,6 +70,7 @@ def get_issue_sections(
     section_ids: list[str],
     min_issues: int,
     max_issues: int,
+    rng: random.Random,
 ) -> Set[str]:
     """
     Randomly select section IDs that will contain issues.
@@ -44,13 +79,323 @@ def get_issue_sections(
         section_ids (list[str]): List of all available section IDs.
         min_issues (int): Minimum number of sections to mark with issues.
         max_issues (int): Maximum number of sections to mark with issues.
+        rng (random.Random): Random generator of the document.
 
     Returns:
         set[str]: A set of randomly selected section IDs that will contain issues.
     """
 
-    count = random.randint(min_issues, max_issues)
-    return set(random.sample(section_ids, count))
+    count = rng.randint(min_issues, max_issues)
+    return set(rng.sample(section_ids, count))
+
+
+def plan_issue_sections(
+    toc: TOC,
+    seeds: SeedTree,
+    checkpoint: Optional[DocumentCheckpoint] = None
+) -> Set[str]:
+    """
+    Plan which sections of a document will contain issues.
+
+    A plan recorded by an earlier attempt of the same run is reused,
+    a new plan is recorded to the checkpoint journal. A new plan depends
+    only on the seed of the document and its TOC.
+
+    Args:
+        toc (TOC): The table of contents of the document.
+        seeds (SeedTree): Seed tree node of the document.
+        checkpoint (DocumentCheckpoint | None): Checkpoint of the document, if any.
+
+    Returns:
+        set[str]: Ids of the sections that will contain issues.
+    """
+    if checkpoint is not None and checkpoint.issue_plan is not None:
+        return checkpoint.issue_plan
+
+    config = get_config()
+    issue_sections = get_issue_sections(
+        collect_section_ids(toc),
+        config.issues.min_per_document,
+        config.issues.max_per_document,
+        seeds.child("issues").rng()
+    )
+
+    if checkpoint is not None:
+        checkpoint.record_issue_plan(issue_sections)
+
+    return issue_sections
+
+
+def iter_toc_sections(toc: TOC) -> Iterator[Tuple[TOCSection, int, TOCSection | None]]:
+    """
+    Iterate over all TOC sections in depth-first order.
+
+    Args:
+        toc (TOC): The table of contents to traverse.
+
+    Yields:
+        Tuple[TOCSection, int, TOCSection | None]: The section, its nesting level
+            (1 for top-level sections) and its parent section, if any.
+    """
+
+    def walk(section: TOCSection, level: int, parent: TOCSection | None):
+        yield section, level, parent
+        for child in section.subsections:
+            yield from walk(child, level + 1, section)
+
+    for top in toc.sections:
+        yield from walk(top, 1, None)
+
+
+def build_issue_instruction(has_issue: bool) -> str:
+    """
+    Build the issue instruction passed to the section prompt.
+
+    Args:
+        has_issue (bool): Whether the section was planned to contain an issue.
+
+    Returns:
+        str: Instruction telling the LLM whether to inject exactly one issue.
+    """
+    return (
+        "Include exactly ONE and only ONE of the following issue types in this section: "
+        "a minor typo, a minor internal contradiction, a single instance of inconsistent terminology, "
+        "or a minor ambiguity. Choose ONE type only. "
+        "The issue must be subtle, realistic, and limited to a single occurrence."
+        if has_issue
+        else
+        "Write the section as a fully correct, internally consistent legal text with precise terminology."
+    )
+
+
+def section_max_tokens(
+    length_model: Optional[SectionLengthModel],
+    document_type: str,
+    section: TOCSection,
+    level: int,
+    default: int
+) -> int:
+    """
+    Output token limit of a section request.
+
+    Args:
+        length_model (SectionLengthModel | None): Learned section lengths, if enabled.
+        document_type (str): Type of the document.
+        section (TOCSection): The TOC section.
+        level (int): Nesting level of the section.
+        default (int): The configured `max_tokens.section`.
+
+    Returns:
+        int: The limit learned for the section, or `default`.
+    """
+    if length_model is None:
+        return default
+    return length_model.max_tokens_for(document_type, level, section.title, default)
+
+
+def length_observer(
+    length_model: Optional[SectionLengthModel],
+    document_type: str,
+    section: TOCSection,
+    level: int
+) -> Optional[Callable[[LLMCallRecord], None]]:
+    """
+    Build the `on_usage` callback recording the output length of completed section responses.
+
+    Args:
+        length_model (SectionLengthModel | None): Learned section lengths, if enabled.
+        document_type (str): Type of the document.
+        section (TOCSection): The TOC section.
+        level (int): Nesting level of the section.
+
+    Returns:
+        Callable[[LLMCallRecord], None] | None: The callback, or None without a model.
+    """
+    if length_model is None:
+        return None
+
+    def observe(record: LLMCallRecord) -> None:
+        # the length of a truncated response is its budget, not the length of the section;
+        # the re-issued request that completes it is observed instead
+        if not record.truncated:
+            length_model.observe(document_type, level, section.title, record.output_tokens)
+
+    return observe
+
+
+def sibling_groups(toc: TOC, max_tokens: int, token_budget: int) -> Dict[str, List[TOCSection]]:
+    """
+    Group consecutive leaf subsections of the same parent for batched generation.
+
+    Runs of sibling subsections without subsections of their own are split
+    into chunks whose combined `max_tokens` fit into `token_budget`.
+    Top-level sections are never grouped.
+
+    Args:
+        toc (TOC): The table of contents of the document.
+        max_tokens (int): Maximum output tokens of a single section.
+        token_budget (int): Maximum output tokens of one batched call.
+
+    Returns:
+        Dict[str, List[TOCSection]]: The group (of at least two sections, in TOC
+            order) of every grouped section id.
+    """
+    size = token_budget // max_tokens
+    groups: Dict[str, List[TOCSection]] = {}
+    if size < 2:
+        return groups
+
+    def add(run: List[TOCSection]):
+        for start in range(0, len(run), size):
+            chunk = run[start:start + size]
+            if len(chunk) > 1:
+                for member in chunk:
+                    groups[member.id] = chunk
+
+    for section, _, _ in iter_toc_sections(toc):
+        run: List[TOCSection] = []
+        for child in section.subsections:
+            if child.subsections:
+                add(run)
+                run = []
+            else:
+                run.append(child)
+        add(run)
+
+    return groups
+
+
+def render_sibling_sections(sections: List[TOCSection], issue_sections: Set[str]) -> str:
+    """
+    Render the list of sections of a batched sibling prompt, each with its own issue instruction.
+
+    Args:
+        sections (List[TOCSection]): The sections of the group.
+        issue_sections (Set[str]): Ids of the sections planned to contain an issue.
+
+    Returns:
+        str: One entry per section.
+    """
+    return "\n".join(
+        f"- id: {section.id}\n"
+        f"  title: {section.title}\n"
+        f"  issue instruction: {build_issue_instruction(section.id in issue_sections)}"
+        for section in sections
+    )
+
+
+def sections_from_batch_output(
+    sections: List[TOCSection],
+    level: int,
+    parent_title: str | None,
+    output: SectionBatchOutput,
+    issue_sections: Set[str]
+) -> Dict[str, Tuple[Section, InjectedIssue | None]]:
+    """
+    Map the output of a batched sibling call back onto the sections of the group.
+
+    Entries with unknown or repeated ids are ignored. A section missing from
+    the output, or planned to contain an issue its entry does not have, is
+    left out, so the caller can generate it alone.
+
+    Args:
+        sections (List[TOCSection]): The sections of the group.
+        level (int): The nesting level of the sections.
+        parent_title (str | None): The title of the common parent section.
+        output (SectionBatchOutput): The structured LLM output.
+        issue_sections (Set[str]): Ids of the sections planned to contain an issue.
+
+    Returns:
+        Dict[str, Tuple[Section, InjectedIssue | None]]: Section and injected issue per section id.
+    """
+    by_id = {section.id: section for section in sections}
+    results: Dict[str, Tuple[Section, InjectedIssue | None]] = {}
+
+    for item in SectionBatchOutput.model_validate(output).sections:
+        section = by_id.get(item.id)
+        if section is None or item.id in results:
+            continue
+
+        has_issue = item.id in issue_sections
+        if has_issue and not item.issue:
+            continue
+
+        results[item.id] = section_from_output(
+            section, level, parent_title,
+            SectionLLMOutput.model_construct(content=item.content, issue=item.issue),
+            has_issue
+        )
+
+    return results
+
+
+def clean_html(html_str: str) -> str:
+    """
+    Clean and fix HTML content by automatically closing unclosed tags.
+
+    Args:
+        html_str (str): A string containing HTML content that may be malformed or have unclosed tags.
+
+    Returns:
+        str: A cleaned HTML string with properly closed tags.
+    """
+    return normalize_html(html_str).html
+
+
+def section_from_output(
+    section: TOCSection,
+    level: int,
+    parent_title: str | None,
+    result: SectionLLMOutput,
+    has_issue: bool
+) -> Tuple[Section, InjectedIssue | None]:
+    """
+    Turn the LLM output of a section into a Section with cleaned HTML.
+
+    An issue the LLM injected into a section that was not planned to have one
+    is dropped. The section is printed to the console.
+
+    Args:
+        section (TOCSection): The TOC section the output belongs to.
+        level (int): The nesting level of the section.
+        parent_title (str | None): The title of the parent section, if any.
+        result (SectionLLMOutput): The structured LLM output.
+        has_issue (bool): Whether the section was planned to contain an issue.
+
+    Returns:
+        Tuple[Section, InjectedIssue | None]: The section and its injected issue, if any.
+    """
+    # if LLM injected issue to the wrong section set it to null
+    if result.issue and not has_issue:
+        # DEBUG
+        # print("\nLLM introduced issue to the WRONG section\n")
+        # print_injected_issues(result.issue, level)
+        result.issue = None
+
+    result = SectionLLMOutput.model_validate(result)
+
+    # Clean HTML and update section
+    section_html = clean_html(result.content)
+
+    print_section_console(
+        title=section.title,
+        content=section_html,
+        level=level,
+        parent_title=parent_title
+    )
+
+    print_injected_issues(result.issue, level)
+
+    return (
+        Section(
+            id=section.id,
+            title=section.title,
+            level=level,
+            content_html=section_html,
+            parent_id=section.id if parent_title else None,
+        ),
+        result.issue
+    )
 
 
 def assemble_sections_from_toc(
@@ -75,19 +420,13 @@ def assemble_sections_from_toc(
                 raise KeyError(f"No Section found for TOC id '{node.id}'")
             return ""  # skip this node (and its subtree)
 
-        inner_parts = [sec.content_html]
+        inner_parts = [section_start_html(sec)]
         for child in node.subsections or []:
             child_html = render_node(child)
             if child_html:
                 inner_parts.append(child_html)
 
-        level_attr = f' data-level="{sec.level}"' if getattr(sec, "level", None) is not None else ""
-        return (
-            f'<section id="{html.escape(sec.id, quote=True)}"{level_attr}>'
-            + f"<h{sec.level+1}>{sec.title}</h{sec.level+1}>"
-            + "\n".join(inner_parts)
-            + "</section>"
-        )
+        return "\n".join(inner_parts) + SECTION_END_HTML
 
     for node in toc_sections:
         rendered = render_node(node)
@@ -117,20 +456,8 @@ def build_full_html(
     section_by_id: Mapping[str, Section] = {s.id: s for s in sections}
     body_html = assemble_sections_from_toc(toc.sections, section_by_id, strict=strict)
 
-    return (
-        f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-        <meta charset="utf-8" />
-        <title>{html.escape(toc.title)}</title>
-        </head>
-        <body>
-        {body_html}
-        </body>
-        </html>
-        """.strip()
-    )
+    head, tail = html_document_parts(toc.title)
+    return head + body_html + tail
 
 
 def generate_sections_from_toc(
@@ -140,11 +467,21 @@ def generate_sections_from_toc(
     model: str,
     temperature: float,
     max_tokens: int,
-    prompt_name: str
+    prompt_name: str,
+    checkpoint: Optional[DocumentCheckpoint] = None,
+    writer: Optional[IncrementalHTMLWriter] = None,
+    seeds: Optional[SeedTree] = None,
+    keep: Optional[Dict[str, Tuple[Section, InjectedIssue | None]]] = None,
+    cancel: Optional[threading.Event] = None
 ) -> Tuple[List[Section], List[InjectedIssue]]:
     """
     Generate structured document sections from a table of contents (TOC) using an LLM.
 
+    With `generation.sibling_batch` enabled, consecutive leaf subsections of a
+    parent are generated together in one call (see `sibling_groups`). The
+    issue plan still applies per section: a section missing from the batched
+    output, or lacking its planned issue, is generated alone.
+
     Args:
         tool (Tool): The software tool object for which the document is generated
         toc (TOC): Table of contents object with `sections` to generate content for.
@@ -153,49 +490,67 @@ def generate_sections_from_toc(
         temperature (float): Sampling temperature for the LLM.
         max_tokens (int): Maximum tokens to generate per section.
         prompt_name (str): Name of the prompt template to load.
+        checkpoint (DocumentCheckpoint | None): Checkpoint of the document. Sections
+            completed in an earlier attempt are reused, new ones are recorded.
+        writer (IncrementalHTMLWriter | None): Writer receiving every section as
+            soon as it is done.
+        seeds (SeedTree | None): Seed tree node of the document. Defaults to the
+            node of the tool and document type under `config.seed`.
+        keep (Dict[str, Tuple[Section, InjectedIssue | None]] | None): Existing
+            sections (and their issues) by TOC id, reused as they are. Only the
+            other sections are generated, see `regenerate_sections`.
+        cancel (threading.Event | None): Event stopping the generation before
+            the next section once it is set.
 
     Returns:
         Tuple[List[Section], List[InjectedIssue]]:
             - List[Section]: Generated sections with cleaned HTML content.
             - List[InjectedIssue]: List of issues injected into sections.
+
+    Raises:
+        GenerationCancelledError: If `cancel` is set before the last section is generated.
     """
 
     generated: List[Section] = []
     collected_issues: List[InjectedIssue] = []
 
     # plan issues at document level
-    config = load_configuration()
-    section_ids = collect_section_ids(toc)
-    issue_sections = get_issue_sections(
-        section_ids, 
-        config.issues.min_per_document, 
-        config.issues.max_per_document
-    )
+    config = get_config()
+    seeds = seeds or SeedTree(config.seed).document(tool.name, document_type)
+    issue_sections = plan_issue_sections(toc, seeds, checkpoint)
+    context = ContextBuilder.from_config(config)
+    prompt_template = get_prompt(prompt_name, "section")
+    length_model = open_length_model(config.generation.adaptive_max_tokens)
+
+    # consecutive leaf siblings generated together
+    groups: Dict[str, List[TOCSection]] = {}
+    if config.generation.sibling_batch.enabled:
+        groups = sibling_groups(toc, max_tokens, config.generation.sibling_batch.token_budget)
+        batch_template = get_prompt(config.prompts.section_batch, "section_batch")
+    batched: Dict[str, Tuple[Section, InjectedIssue | None]] = {}
+    requested: Set[str] = set()
+
+    def completed(section_id: str) -> Tuple[Section, InjectedIssue | None] | None:
+        """Return a kept or checkpointed section instead of generating it again."""
+        if keep and section_id in keep:
+            return keep[section_id]
+        return checkpoint.completed_section(section_id) if checkpoint else None
 
     # DEBUG
     # print("Issue sections:\n")
     # print(issue_sections)
 
-    def clean_html(html_str: str) -> str:
+    def generate(
+        section: TOCSection,
+        level: int,
+        parent_title: str | None
+    ) -> Tuple[Section, InjectedIssue | None]:
         """
-        Clean and fix HTML content by automatically closing unclosed tags.
-
-        Args:
-            html_str (str): A string containing HTML content that may be malformed or have unclosed tags.
+        Generate content for a single section using an LLM.
 
-        Returns:
-            str: A cleaned HTML string with properly closed tags.
-        """
-        soup = BeautifulSoup(html_str, "html.parser")
-        return str(soup)
-
-    def walk(section: TOCSection, level: int, parent_title: str | None):
-        """
-        Recursively generate content for a section and its subsections using an LLM.
-
-        For each TOC section and subsection:
         - Injects a subtle quality issue if needed.
         - Calls the LLM to generate HTML content
+        - Repairs a missing planned issue with `IssueRepair`, then regenerates if that fails.
         - Cleans and validates html content.
 
         Args:
@@ -203,27 +558,26 @@ def generate_sections_from_toc(
             level (int): The nesting level of the section for indentation and formatting.
             parent_title (str | None): The title of the parent section, if any.
 
+        Returns:
+            Tuple[Section, InjectedIssue | None]: The generated section and its
+                injected issue, if any.
+
+        Raises:
+            RetryBudgetExceededError: If a planned issue is still missing after
+                `retry.issue_attempts` generations.
         """
 
         has_issue = section.id in issue_sections
 
-        issue_instruction = (
-            "Include exactly ONE and only ONE of the following issue types in this section: "
-            "a minor typo, a minor internal contradiction, a single instance of inconsistent terminology, "
-            "or a minor ambiguity. Choose ONE type only. "
-            "The issue must be subtle, realistic, and limited to a single occurrence."
-            if has_issue
-            else
-            "Write the section as a fully correct, internally consistent legal text with precise terminology."
-        )
+        issue_instruction = build_issue_instruction(has_issue)
 
-        prompt = load_prompt(prompt_name).format(
+        prompt = prompt_template.render(
             tool_name=tool.name,
             purpose=tool.purpose,
             document_type=document_type,
             section_title=section.title,
             parent_title=parent_title or "None",
-            previous_sections=generated,
+            previous_sections=context.render(generated),
             issue_instruction=issue_instruction,
         )
 
@@ -231,60 +585,141 @@ def generate_sections_from_toc(
         # print("PROMPT:\n")
         # print(prompt)
 
+        section_tokens = section_max_tokens(length_model, document_type, section, level, max_tokens)
+        observe = length_observer(length_model, document_type, section, level)
+
+        context.record_prompt(prompt)
         result = call_llm(
             prompt=prompt,
             model=model,
             temperature=temperature,
-            max_tokens=max_tokens,
-            text_format=SectionLLMOutput
+            max_tokens=section_tokens,
+            text_format=SectionLLMOutput,
+            stream=config.generation.stream_sections,
+            on_usage=observe,
+            cache_max_tokens=max_tokens
         )
 
+        # inject a missing planned issue into the generated content
+        if has_issue and not result.issue and config.issues.repair.enabled:
+            repaired = IssueRepair(
+                config, document_type, section, result, prompt, temperature,
+                seeds.child("section", section.id).rng()
+            ).run()
+            if repaired is not None:
+                result = repaired
+
         # make sure injected issue is present
+        attempts = 1
         while not result.issue and has_issue:
+            if attempts >= config.retry.issue_attempts:
+                raise RetryBudgetExceededError(
+                    f"No issue injected into section '{section.id}' after {attempts} attempts",
+                    attempts
+                )
+            attempts += 1
             # DEBUG
             # print("\nEntered second LLM call - SECTIONS\n")
+            context.record_prompt(prompt)
             result = call_llm(
                 prompt=prompt,
                 model=model,
                 temperature=temperature,
-                max_tokens=max_tokens,
-                text_format=SectionLLMOutput
+                max_tokens=section_tokens,
+                text_format=SectionLLMOutput,
+                stream=config.generation.stream_sections,
+                on_usage=observe,
+                cache_max_tokens=max_tokens
             )
 
-        # if LLM injected issue to the wrong section set it to null
-        if result.issue and not has_issue:
-            # DEBUG
-            # print("\nLLM introduced issue to the WRONG section\n")
-            # print_injected_issues(result.issue, level)
-            result.issue = None
+        return section_from_output(section, level, parent_title, result, has_issue)
 
-        result = SectionLLMOutput.model_validate(result)
+    def generate_group(
+        sections: List[TOCSection],
+        level: int,
+        parent_title: str | None
+    ) -> Dict[str, Tuple[Section, InjectedIssue | None]]:
+        """
+        Generate a group of sibling sections with one LLM call.
 
-        # Clean HTML and update section
-        section_html = clean_html(result.content)
-        
-        print_section_console(
-            title=section.title,
-            content=section_html,
-            level=level,
-            parent_title=parent_title
+        Args:
+            sections (List[TOCSection]): The sections of the group, in TOC order.
+            level (int): The nesting level of the sections.
+            parent_title (str | None): The title of the common parent section.
+
+        Returns:
+            Dict[str, Tuple[Section, InjectedIssue | None]]: The sections the call
+                produced as planned; the others are generated alone by the caller.
+        """
+        prompt = batch_template.render(
+            tool_name=tool.name,
+            purpose=tool.purpose,
+            document_type=document_type,
+            parent_title=parent_title or "None",
+            previous_sections=context.render(generated),
+            sections=render_sibling_sections(sections, issue_sections),
         )
 
-        # Collect issues
-        collected_issues.append(result.issue)
+        context.record_prompt(prompt)
+        try:
+            output = call_llm(
+                prompt=prompt,
+                model=model,
+                temperature=temperature,
+                max_tokens=sum(
+                    section_max_tokens(length_model, document_type, section, level, max_tokens)
+                    for section in sections
+                ),
+                text_format=SectionBatchOutput,
+                cache_max_tokens=max_tokens * len(sections)
+            )
+            return sections_from_batch_output(sections, level, parent_title, output, issue_sections)
+        except LLM_ERRORS as e:
+            print(f"[Warning] Sibling batch of '{sections[0].id}' failed, generating the sections alone: {e}")
+            return {}
 
-        print_injected_issues(result.issue, level)
+    def walk(section: TOCSection, level: int, parent_title: str | None):
+        """
+        Recursively generate a section and its subsections in TOC order.
 
-        # Add to generated sections
-        generated.append(
-            Section(
-                id=section.id,
-                title=section.title,
-                level=level,
-                content_html=section_html,
-                parent_id=section.id if parent_title else None,
-            )
-        )
+        Kept sections and sections completed in an earlier attempt of the run
+        are reused instead of being generated again. Reaching the first
+        section of a sibling group generates the whole group in one call.
+
+        Args:
+            section: A Section object to generate content for.
+            level (int): The nesting level of the section for indentation and formatting.
+            parent_title (str | None): The title of the parent section, if any.
+        """
+        restored = completed(section.id)
+
+        if restored is not None:
+            new_section, issue = restored
+        else:
+            check_cancelled(cancel, f"section '{section.id}'")
+            if section.id in groups and section.id not in requested:
+                members = [
+                    member for member in groups[section.id]
+                    if completed(member.id) is None
+                ]
+                requested.update(member.id for member in groups[section.id])
+                if len(members) > 1:
+                    with telemetry_context(stage="section", section_id=section.id):
+                        batched.update(generate_group(members, level, parent_title))
+
+            if section.id in batched:
+                new_section, issue = batched.pop(section.id)
+            else:
+                with telemetry_context(stage="section", section_id=section.id):
+                    new_section, issue = generate(section, level, parent_title)
+            if checkpoint is not None:
+                checkpoint.record_section(new_section, issue)
+
+        # Collect issues and add to generated sections
+        collected_issues.append(issue)
+        generated.append(new_section)
+        if writer is not None:
+            writer.add(new_section)
 
         for child in section.subsections:
             walk(child, level + 1, section.title)
@@ -295,4 +730,6 @@ def generate_sections_from_toc(
     # clean the issue list from None
     collected_issues = [issue for issue in collected_issues if issue]
 
+    context.report(document_type)
+
     return generated, collected_issues
\ No newline at end of file
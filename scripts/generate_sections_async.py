@@ -0,0 +1,356 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+from software_whitelisting_assistant.scripts.classes import (
+    Tool, TOC, TOCSection, Section, SectionLLMOutput, InjectedIssue, SectionBatchOutput
+)
+from software_whitelisting_assistant.scripts.llm_client import LLM_ERRORS, call_llm_async
+from software_whitelisting_assistant.scripts.registry import get_config, get_prompt
+from software_whitelisting_assistant.scripts.checkpoint import DocumentCheckpoint
+from software_whitelisting_assistant.scripts.context_builder import ContextBuilder
+from software_whitelisting_assistant.scripts.html_writer import IncrementalHTMLWriter
+from software_whitelisting_assistant.scripts.retry import RetryBudgetExceededError
+from software_whitelisting_assistant.scripts.seeds import SeedTree
+from software_whitelisting_assistant.scripts.telemetry import telemetry_context
+from software_whitelisting_assistant.scripts.generate_sections import (
+    plan_issue_sections,
+    iter_toc_sections,
+    build_issue_instruction,
+    section_from_output,
+    sibling_groups,
+    render_sibling_sections,
+    sections_from_batch_output,
+    section_max_tokens,
+    length_observer,
+    check_cancelled,
+)
+from software_whitelisting_assistant.scripts.issue_repair import IssueRepair
+from software_whitelisting_assistant.scripts.length_model import open_length_model
+
+
+CONTEXT_POLICIES = ("full", "preceding_siblings", "parent", "none")
+
+
+def resolve_context_dependencies(toc: TOC, policy: str) -> Dict[str, List[str]]:
+    """
+    Resolve which previously generated sections each section depends on.
+
+    The dependency policy decides what is passed as `previous_sections`
+    and therefore which sections must finish before a section can start:
+    - full: every section preceding it in TOC order (fully serial)
+    - preceding_siblings: the parent and all preceding siblings
+    - parent: the parent section only
+    - none: no context, every section can run immediately
+
+    Args:
+        toc (TOC): The table of contents describing the document structure.
+        policy (str): One of CONTEXT_POLICIES.
+
+    Returns:
+        Dict[str, List[str]]: Mapping from section id to the ids of the sections
+            it depends on, in TOC order.
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    if policy not in CONTEXT_POLICIES:
+        raise ValueError(
+            f"Unknown context policy '{policy}', expected one of {CONTEXT_POLICIES}"
+        )
+
+    dependencies: Dict[str, List[str]] = {}
+    preceding: List[str] = []
+
+    def siblings_before(section: TOCSection, siblings: List[TOCSection]) -> List[str]:
+        ids = []
+        for sibling in siblings:
+            if sibling.id == section.id:
+                break
+            ids.append(sibling.id)
+        return ids
+
+    for section, _, parent in iter_toc_sections(toc):
+        parent_ids = [parent.id] if parent else []
+
+        if policy == "full":
+            dependencies[section.id] = list(preceding)
+        elif policy == "preceding_siblings":
+            siblings = parent.subsections if parent else toc.sections
+            dependencies[section.id] = parent_ids + siblings_before(section, siblings)
+        elif policy == "parent":
+            dependencies[section.id] = parent_ids
+        else:
+            dependencies[section.id] = []
+
+        preceding.append(section.id)
+
+    return dependencies
+
+
+async def generate_sections_from_toc_async(
+    tool: Tool,
+    toc: TOC,
+    document_type: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    prompt_name: str,
+    max_concurrency: int | None = None,
+    context_policy: str | None = None,
+    checkpoint: Optional[DocumentCheckpoint] = None,
+    writer: Optional[IncrementalHTMLWriter] = None,
+    seeds: Optional[SeedTree] = None,
+    cancel: Optional[threading.Event] = None
+) -> Tuple[List[Section], List[InjectedIssue]]:
+    """
+    Generate document sections from a TOC with concurrent LLM requests.
+
+    Produces the same output as `generate_sections_from_toc`, but sections
+    whose context dependencies are satisfied are requested concurrently,
+    bounded by a semaphore. A group of batched siblings is one request,
+    started once the dependencies of all of its sections are done.
+
+    Args:
+        tool (Tool): The software tool object for which the document is generated
+        toc (TOC): Table of contents object with `sections` to generate content for.
+        document_type (str): Type of document being generated (used in prompts).
+        model (str): Name of the LLM model to use for generation.
+        temperature (float): Sampling temperature for the LLM.
+        max_tokens (int): Maximum tokens to generate per section.
+        prompt_name (str): Name of the prompt template to load.
+        max_concurrency (int | None): Maximum number of in-flight section requests.
+            Defaults to `concurrency.sections` from the configuration.
+        context_policy (str | None): Dependency policy deciding `previous_sections`.
+            Defaults to `concurrency.context_policy` from the configuration.
+        checkpoint (DocumentCheckpoint | None): Checkpoint of the document. Sections
+            completed in an earlier attempt are reused, new ones are recorded.
+        writer (IncrementalHTMLWriter | None): Writer receiving every section as
+            soon as it is done; it writes them in TOC order.
+        seeds (SeedTree | None): Seed tree node of the document. Defaults to the
+            node of the tool and document type under `config.seed`.
+        cancel (threading.Event | None): Event stopping the generation once it is
+            set; requests not yet started are not sent.
+
+    Returns:
+        Tuple[List[Section], List[InjectedIssue]]:
+            - List[Section]: Generated sections with cleaned HTML content, in TOC order.
+            - List[InjectedIssue]: List of issues injected into sections, in TOC order.
+
+    Raises:
+        GenerationCancelledError: If `cancel` is set before the last request is sent.
+    """
+
+    # plan issues at document level
+    config = get_config()
+    seeds = seeds or SeedTree(config.seed).document(tool.name, document_type)
+    issue_sections = plan_issue_sections(toc, seeds, checkpoint)
+
+    max_concurrency = max_concurrency or config.concurrency.sections
+    context_policy = context_policy or config.concurrency.context_policy
+    dependencies = resolve_context_dependencies(toc, context_policy)
+    context = ContextBuilder.from_config(config)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    prompt_template = get_prompt(prompt_name, "section")
+    length_model = open_length_model(config.generation.adaptive_max_tokens)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    # consecutive leaf siblings generated together
+    groups: Dict[str, List[TOCSection]] = {}
+    if config.generation.sibling_batch.enabled:
+        groups = sibling_groups(toc, max_tokens, config.generation.sibling_batch.token_budget)
+        batch_template = get_prompt(config.prompts.section_batch, "section_batch")
+    group_tasks: Dict[str, asyncio.Task] = {}
+
+    def finish(new_section: Section, issue: InjectedIssue | None) -> Tuple[Section, InjectedIssue | None]:
+        if checkpoint is not None:
+            checkpoint.record_section(new_section, issue)
+        if writer is not None:
+            writer.add(new_section)
+        return new_section, issue
+
+    async def generate_group(
+        sections: List[TOCSection],
+        level: int,
+        parent: TOCSection | None
+    ) -> Dict[str, Tuple[Section, InjectedIssue | None]]:
+        """
+        Generate a group of sibling sections with one LLM request.
+
+        Args:
+            sections (List[TOCSection]): The sections of the group, in TOC order.
+            level (int): The nesting level of the sections.
+            parent (TOCSection | None): The common parent TOC section.
+
+        Returns:
+            Dict[str, Tuple[Section, InjectedIssue | None]]: The sections the request
+                produced as planned; the others are generated alone.
+        """
+        members = [
+            member for member in sections
+            if not (checkpoint and checkpoint.completed_section(member.id))
+        ]
+        if len(members) < 2:
+            return {}
+
+        member_ids = {member.id for member in sections}
+        dependency_ids: List[str] = []
+        for member in sections:
+            for dep_id in dependencies[member.id]:
+                if dep_id not in member_ids and dep_id not in dependency_ids:
+                    dependency_ids.append(dep_id)
+
+        previous_sections = [(await tasks[dep_id])[0] for dep_id in dependency_ids]
+        parent_title = parent.title if parent else None
+
+        prompt = batch_template.render(
+            tool_name=tool.name,
+            purpose=tool.purpose,
+            document_type=document_type,
+            parent_title=parent_title or "None",
+            previous_sections=context.render(previous_sections),
+            sections=render_sibling_sections(members, issue_sections),
+        )
+
+        async with semaphore:
+            check_cancelled(cancel, f"section '{members[0].id}'")
+            with telemetry_context(stage="section", section_id=members[0].id):
+                context.record_prompt(prompt)
+                try:
+                    output = await call_llm_async(
+                        prompt=prompt,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=sum(
+                            section_max_tokens(length_model, document_type, member, level, max_tokens)
+                            for member in members
+                        ),
+                        text_format=SectionBatchOutput,
+                        cache_max_tokens=max_tokens * len(members)
+                    )
+                    return sections_from_batch_output(members, level, parent_title, output, issue_sections)
+                except LLM_ERRORS as e:
+                    print(f"[Warning] Sibling batch of '{members[0].id}' failed, generating the sections alone: {e}")
+                    return {}
+
+    async def generate(
+        section: TOCSection,
+        level: int,
+        parent: TOCSection | None
+    ) -> Tuple[Section, InjectedIssue | None]:
+        """
+        Generate a single section once all of its dependencies are done.
+
+        Args:
+            section (TOCSection): The TOC section to generate content for.
+            level (int): The nesting level of the section.
+            parent (TOCSection | None): The parent TOC section, if any.
+
+        Returns:
+            Tuple[Section, InjectedIssue | None]: The generated section and its
+                injected issue, if any.
+
+        Raises:
+            RetryBudgetExceededError: If a planned issue is still missing after
+                `retry.issue_attempts` generations.
+        """
+        restored = checkpoint.completed_section(section.id) if checkpoint else None
+        if restored is not None:
+            if writer is not None:
+                writer.add(restored[0])
+            return restored
+
+        if section.id in group_tasks:
+            result = (await group_tasks[section.id]).get(section.id)
+            if result is not None:
+                return finish(*result)
+
+        previous_sections = [
+            (await tasks[dep_id])[0] for dep_id in dependencies[section.id]
+        ]
+        parent_title = parent.title if parent else None
+        has_issue = section.id in issue_sections
+
+        prompt = prompt_template.render(
+            tool_name=tool.name,
+            purpose=tool.purpose,
+            document_type=document_type,
+            section_title=section.title,
+            parent_title=parent_title or "None",
+            previous_sections=context.render(previous_sections),
+            issue_instruction=build_issue_instruction(has_issue),
+        )
+
+        section_tokens = section_max_tokens(length_model, document_type, section, level, max_tokens)
+        observe = length_observer(length_model, document_type, section, level)
+
+        async with semaphore:
+            check_cancelled(cancel, f"section '{section.id}'")
+            with telemetry_context(stage="section", section_id=section.id):
+                context.record_prompt(prompt)
+                result = await call_llm_async(
+                    prompt=prompt,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=section_tokens,
+                    text_format=SectionLLMOutput,
+                    stream=config.generation.stream_sections,
+                    on_usage=observe,
+                    cache_max_tokens=max_tokens
+                )
+
+                # inject a missing planned issue into the generated content
+                if has_issue and not result.issue and config.issues.repair.enabled:
+                    repaired = await IssueRepair(
+                        config, document_type, section, result, prompt, temperature,
+                        seeds.child("section", section.id).rng()
+                    ).run_async()
+                    if repaired is not None:
+                        result = repaired
+
+                # make sure injected issue is present
+                attempts = 1
+                while not result.issue and has_issue:
+                    if attempts >= config.retry.issue_attempts:
+                        raise RetryBudgetExceededError(
+                            f"No issue injected into section '{section.id}' after {attempts} attempts",
+                            attempts
+                        )
+                    attempts += 1
+                    context.record_prompt(prompt)
+                    result = await call_llm_async(
+                        prompt=prompt,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=section_tokens,
+                        text_format=SectionLLMOutput,
+                        stream=config.generation.stream_sections,
+                        on_usage=observe,
+                        cache_max_tokens=max_tokens
+                    )
+
+        return finish(*section_from_output(section, level, parent_title, result, has_issue))
+
+    # dependencies always precede a section in TOC order,
+    # so every awaited task exists before it is needed
+    for section, level, parent in iter_toc_sections(toc):
+        group = groups.get(section.id)
+        if group is not None and group[0] is section:
+            group_task = asyncio.create_task(generate_group(group, level, parent))
+            for member in group:
+                group_tasks[member.id] = group_task
+        tasks[section.id] = asyncio.create_task(generate(section, level, parent))
+
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in [*tasks.values(), *group_tasks.values()]:
+            task.cancel()
+        raise
+
+    generated = [section for section, _ in results]
+    collected_issues = [issue for _, issue in results if issue]
+
+    context.report(document_type)
+
+    return generated, collected_issues
@@ -1,7 +1,11 @@
+import json
+from typing import Dict, List
 from pydantic import ValidationError
-from software_whitelisting_assistant.scripts.classes import Tool, TOC
-from software_whitelisting_assistant.scripts.llm_client import call_llm
-from software_whitelisting_assistant.scripts.artifacts_store import load_prompt
+from software_whitelisting_assistant.scripts.classes import Tool, TOC, TOCBatch
+from software_whitelisting_assistant.scripts.llm_client import LLM_ERRORS, call_llm
+from software_whitelisting_assistant.scripts.registry import get_prompt
+from software_whitelisting_assistant.scripts.telemetry import telemetry_context
+from software_whitelisting_assistant.scripts.validate import TOCValidationError, validate_toc
 
 
 def generate_TOC(
@@ -32,7 +36,7 @@ def generate_TOC(
         If validation fails, the raw LLM response is returned instead.
         Callers should handle this case explicitly.
     """
-    prompt = load_prompt(prompt_name).format(
+    prompt = get_prompt(prompt_name, "toc").render(
         document_type=document_type,
         tool_name=tool.name,
         purpose=tool.purpose,
@@ -40,12 +44,13 @@ def generate_TOC(
         user_base=tool.user_base
     )
 
-    response_text = call_llm(
-        prompt=prompt, 
-        model=model, 
-        max_tokens=max_tokens,
-        text_format=TOC
-    )
+    with telemetry_context(stage="toc"):
+        response_text = call_llm(
+            prompt=prompt,
+            model=model,
+            max_tokens=max_tokens,
+            text_format=TOC
+        )
 
     try:
         toc = TOC.model_validate(response_text)
@@ -54,3 +59,75 @@ def generate_TOC(
         print("TOC validation failed:", e)
         return response_text
 
+
+def generate_TOCs(
+    tool: Tool,
+    document_types: List[str],
+    prompt_name: str,
+    single_prompt_name: str,
+    model: str,
+    max_tokens: int
+) -> Dict[str, TOC]:
+    """
+    Generate the TOCs of several documents of a tool with one LLM call.
+
+    The tool context is sent once for all document types. Every TOC is
+    validated on its own with `validate_toc`; an invalid TOC, or one missing
+    from the response, is regenerated alone with `generate_TOC`.
+
+    Args:
+        tool (Tool): The tool for which the TOCs are generated.
+        document_types (List[str]): Types of the documents.
+        prompt_name (str): Name of the batched prompt template.
+        single_prompt_name (str): Name of the prompt template used to regenerate single TOCs.
+        model (str): Name of the LLM model to use.
+        max_tokens (int): Maximum number of tokens allowed per TOC.
+
+    Returns:
+        Dict[str, TOC]: Validated TOC per document type, in the requested order.
+            A document type whose TOC is still invalid after regenerating it
+            alone is left out, so the caller can report it with the document.
+
+    Raises:
+        ValidationError: If the LLM output cannot be validated as a TOCBatch.
+    """
+    prompt = get_prompt(prompt_name, "toc_batch").render(
+        document_types=json.dumps(document_types, ensure_ascii=False),
+        tool_name=tool.name,
+        purpose=tool.purpose,
+        category=tool.category,
+        user_base=tool.user_base
+    )
+
+    with telemetry_context(stage="toc"):
+        batch = call_llm(
+            prompt=prompt,
+            model=model,
+            max_tokens=max_tokens * len(document_types),
+            text_format=TOCBatch
+        )
+
+    tocs: Dict[str, TOC] = {}
+    for item in TOCBatch.model_validate(batch).tocs:
+        if item.document_type not in document_types or item.document_type in tocs:
+            print(f"[TOC] Ignored unexpected '{item.document_type}' TOC in batch")
+            continue
+        try:
+            validate_toc(item.toc)
+        except TOCValidationError as e:
+            print(f"[TOC] Invalid '{item.document_type}' TOC in batch: {e}")
+            continue
+        tocs[item.document_type] = item.toc
+
+    for document_type in document_types:
+        if document_type in tocs:
+            continue
+        try:
+            toc = generate_TOC(tool, document_type, single_prompt_name, model, max_tokens)
+            validate_toc(toc)
+        except LLM_ERRORS + (TOCValidationError,) as e:
+            print(f"[TOC] Regenerating '{document_type}' alone failed: {e}")
+            continue
+        tocs[document_type] = toc
+
+    return {document_type: tocs[document_type] for document_type in document_types if document_type in tocs}
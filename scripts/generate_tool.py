@@ -1,6 +1,10 @@
-from software_whitelisting_assistant.scripts.classes import Tool
+from typing import List, Set
+from software_whitelisting_assistant.scripts.classes import Tool, ToolBatch
 from software_whitelisting_assistant.scripts.llm_client import call_llm
-from software_whitelisting_assistant.scripts.artifacts_store import load_prompt
+from software_whitelisting_assistant.scripts.registry import get_prompt
+from software_whitelisting_assistant.scripts.telemetry import telemetry_context
+from software_whitelisting_assistant.scripts.utils import normalize_name
+from software_whitelisting_assistant.scripts.validate import ToolValidationError, validate_tool
 
 def generate_tool(
     model: str, 
@@ -24,16 +28,87 @@ def generate_tool(
         ValidationError: If the LLM output cannot be validated as a Tool.
     """
 
-    prompt = load_prompt(prompt_name)
+    prompt = get_prompt(prompt_name, "tool").render()
 
-    tool = call_llm(
-        prompt=prompt,
-        model=model,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        text_format=Tool
-    )
+    with telemetry_context(stage="tool"):
+        tool = call_llm(
+            prompt=prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            text_format=Tool
+        )
 
     return Tool.model_validate(tool)
 
-    
\ No newline at end of file
+
+def generate_tools(
+    n: int,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    prompt_name: str,
+    single_prompt_name: str
+) -> List[Tool]:
+    """
+    Generate several Tool definitions with one structured LLM call.
+
+    Every tool is validated on its own. An incomplete tool, a tool repeating
+    the name of another one, and tools missing from the response are
+    regenerated one at a time with `generate_tool`, so a single bad item
+    never costs the whole batch.
+
+    Args:
+        n (int): Number of tools to generate.
+        model (str): Name of the LLM model to use.
+        temperature (float): Sampling temperature for generation.
+        max_tokens (int): Maximum number of tokens allowed per tool.
+        prompt_name (str): Name of the batched prompt template.
+        single_prompt_name (str): Name of the prompt template used to regenerate single tools.
+
+    Returns:
+        List[Tool]: `n` validated tools with distinct names.
+
+    Raises:
+        ValidationError: If the LLM output cannot be validated as a ToolBatch.
+        ToolValidationError: If `n` distinct valid tools could not be generated.
+    """
+
+    prompt = get_prompt(prompt_name, "tool_batch").render(count=n)
+
+    with telemetry_context(stage="tool"):
+        batch = call_llm(
+            prompt=prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens * n,
+            text_format=ToolBatch
+        )
+
+    tools: List[Tool] = []
+    names: Set[str] = set()
+
+    def accept(tool: Tool) -> bool:
+        try:
+            validate_tool(tool)
+        except ToolValidationError as e:
+            print(f"[Tool] Rejected '{tool.name}': {e}")
+            return False
+        if normalize_name(tool.name) in names:
+            print(f"[Tool] Rejected '{tool.name}': repeated name")
+            return False
+        names.add(normalize_name(tool.name))
+        tools.append(tool)
+        return True
+
+    for tool in ToolBatch.model_validate(batch).tools[:n]:
+        accept(tool)
+
+    retries = 0
+    while len(tools) < n:
+        retries += 1
+        if retries > 2 * n:
+            raise ToolValidationError(f"Could not generate {n} distinct tools, got {len(tools)}")
+        accept(generate_tool(model, temperature, max_tokens, single_prompt_name))
+
+    return tools
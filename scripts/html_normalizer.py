@@ -0,0 +1,216 @@
+import hashlib
+import html
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from software_whitelisting_assistant.scripts.classes import Section
+
+
+# Elements without content, written as <tag/>
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+
+# Block elements that may not appear inside <p>; an open <p> is closed before them
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "details", "div", "dl", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "main", "nav", "ol", "p", "pre", "section", "table", "ul",
+})
+
+# Elements whose content is written as is
+RAW_TEXT_TAGS = frozenset({"script", "style"})
+
+# Elements inside which whitespace-only text is kept as is
+PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "textarea"})
+
+_ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+
+
+@dataclass(frozen=True)
+class NormalizedHTML:
+    """
+    Result of normalizing an HTML fragment.
+
+    The normalized HTML is always balanced. `repairs` lists what had to be
+    changed, so `valid` tells whether the input was well-formed already.
+    """
+    html: str
+    paragraphs: int
+    repairs: Tuple[str, ...]
+
+    @property
+    def valid(self) -> bool:
+        return not self.repairs
+
+
+def _attribute_value(value: str) -> str:
+    value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', "&quot;") + '"'
+
+
+class _Normalizer(HTMLParser):
+    """
+    Streaming tag balancer.
+
+    Start tags are written as they come and tracked on a stack. An end tag
+    closes the elements opened after its start tag, a stray end tag is
+    dropped, a block element closes an open <p>, and elements still open at
+    the end are closed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.open_tags: List[str] = []
+        self.repairs: List[str] = []
+        self.paragraphs = 0
+
+    def _close_to(self, index: int) -> None:
+        while len(self.open_tags) > index:
+            self.out.append(f"</{self.open_tags.pop()}>")
+
+    def handle_starttag(self, tag, attrs, self_closing: bool = False):
+        if tag in BLOCK_TAGS and "p" in self.open_tags:
+            self.repairs.append(f"<{tag}> inside <p>")
+            self._close_to(len(self.open_tags) - 1 - self.open_tags[::-1].index("p"))
+
+        attributes = "".join(
+            f" {name}={_attribute_value(value or '')}" for name, value in dict(attrs).items()
+        )
+
+        if tag in VOID_TAGS:
+            self.out.append(f"<{tag}{attributes}/>")
+            return
+
+        self.out.append(f"<{tag}{attributes}>")
+        self.open_tags.append(tag)
+        if tag == "p":
+            self.paragraphs += 1
+        if self_closing:
+            self.handle_endtag(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag not in self.open_tags:
+            self.repairs.append(f"stray </{tag}>")
+            return
+
+        index = len(self.open_tags) - 1 - self.open_tags[::-1].index(tag)
+        for unclosed in self.open_tags[index + 1:]:
+            self.repairs.append(f"unclosed <{unclosed}>")
+        self._close_to(index)
+
+    def handle_data(self, data):
+        if self.open_tags and self.open_tags[-1] in RAW_TEXT_TAGS:
+            self.out.append(data)
+            return
+
+        # whitespace between tags is collapsed to a single character, as BeautifulSoup does
+        if not data.translate(_ASCII_SPACES) and PRESERVE_WHITESPACE_TAGS.isdisjoint(self.open_tags):
+            data = "\n" if "\n" in data else " "
+
+        self.out.append(html.escape(data, quote=False))
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.out.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.out.append(f"<![{data}]>")
+
+    def close(self):
+        super().close()
+        for unclosed in self.open_tags:
+            self.repairs.append(f"unclosed <{unclosed}>")
+        self._close_to(0)
+
+
+# Digests of the HTML produced by `normalize_html` in this process
+_normalized: "OrderedDict[bytes, None]" = OrderedDict()
+_normalized_lock = threading.Lock()
+_NORMALIZED_MAX_ENTRIES = 100_000
+
+
+def _digest(html_str: str) -> bytes:
+    return hashlib.blake2b(html_str.encode("utf-8"), digest_size=16).digest()
+
+
+def normalize_html(html_str: str) -> NormalizedHTML:
+    """
+    Balance the tags of an HTML fragment in a single pass.
+
+    Unclosed tags are closed, stray end tags are dropped and block elements
+    are not nested inside <p>. Character references are decoded, text is
+    re-escaped and whitespace-only text is collapsed, as BeautifulSoup does.
+
+    Args:
+        html_str (str): The HTML fragment, possibly malformed.
+
+    Returns:
+        NormalizedHTML: The balanced HTML, its paragraph count and the repairs made.
+    """
+    normalizer = _Normalizer()
+    normalizer.feed(html_str)
+    normalizer.close()
+
+    result = NormalizedHTML(
+        html="".join(normalizer.out),
+        paragraphs=normalizer.paragraphs,
+        repairs=tuple(normalizer.repairs)
+    )
+
+    digest = _digest(result.html)
+    with _normalized_lock:
+        _normalized[digest] = None
+        _normalized.move_to_end(digest)
+        while len(_normalized) > _NORMALIZED_MAX_ENTRIES:
+            _normalized.popitem(last=False)
+
+    return result
+
+
+def is_normalized(html_str: str) -> bool:
+    """
+    Tell whether a fragment is the output of `normalize_html` in this process.
+
+    Args:
+        html_str (str): The HTML fragment.
+
+    Returns:
+        bool: True if the fragment is known to be balanced.
+    """
+    with _normalized_lock:
+        return _digest(html_str) in _normalized
+
+
+def is_trusted_section(section: Optional[Section]) -> bool:
+    """
+    Tell whether a section renders to balanced HTML without parsing it.
+
+    That is the case when its content came from `normalize_html` and its
+    title contains no markup.
+
+    Args:
+        section (Section | None): The section.
+
+    Returns:
+        bool: True if the rendered section needs no validation.
+    """
+    return section is not None and "<" not in section.title and is_normalized(section.content_html)
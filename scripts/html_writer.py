@@ -0,0 +1,193 @@
+import html
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, Section
+from software_whitelisting_assistant.scripts.validate import IncrementalHTMLValidator
+
+
+_DOCUMENT_TEMPLATE = """
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+        <meta charset="utf-8" />
+        <title>{title}</title>
+        </head>
+        <body>
+        {body}
+        </body>
+        </html>
+        """.strip()
+
+SECTION_END_HTML = "</section>"
+
+
+def html_document_parts(title: str) -> Tuple[str, str]:
+    """
+    Return the markup preceding and following the body content of a document.
+
+    Args:
+        title (str): The document title.
+
+    Returns:
+        Tuple[str, str]: The head (up to and including <body>) and the tail.
+    """
+    head, tail = _DOCUMENT_TEMPLATE.split("{body}")
+    return head.format(title=html.escape(title)), tail
+
+
+def section_start_html(section: Section) -> str:
+    """
+    Render the opening <section> tag and heading of a section, followed by its content.
+
+    Args:
+        section (Section): The section to render.
+
+    Returns:
+        str: The section markup, without subsections and closing tag.
+    """
+    level_attr = f' data-level="{section.level}"' if getattr(section, "level", None) is not None else ""
+    return (
+        f'<section id="{html.escape(section.id, quote=True)}"{level_attr}>'
+        + f"<h{section.level+1}>{section.title}</h{section.level+1}>"
+        + section.content_html
+    )
+
+
+class IncrementalHTMLWriter:
+    """
+    Writes a document to disk section by section, in TOC order.
+
+    The head is written when the writer is created. Every added section is
+    written as soon as all sections preceding it in TOC order are written,
+    and a <section> is closed once its whole subtree is done. The result is
+    identical to `build_full_html` with the same `strict` flag: with `strict`
+    a section still missing on `close` raises KeyError, otherwise the missing
+    section and its subtree are skipped.
+
+    The document is written to `<path>.partial`, flushed after every section
+    so it can be tailed, validated while it is written and moved to `path`
+    on `close`. Writers that may run side by side for the same document,
+    like two queue workers holding successive leases of a job, pass a
+    distinct `partial_tag` and write `<path>.<partial_tag>.partial`.
+    """
+
+    def __init__(self, toc: TOC, path: Path, *, strict: bool = False, partial_tag: Optional[str] = None):
+        self.path = Path(path)
+        suffix = f".{partial_tag}.partial" if partial_tag else ".partial"
+        self.partial_path = self.path.with_name(self.path.name + suffix)
+        self.strict = strict
+        self.written = 0
+
+        # pre-order TOC nodes with their parent position and subtree end
+        self._nodes: List[TOCSection] = []
+        self._parents: List[Optional[int]] = []
+        self._ends: List[int] = []
+        self._index(toc.sections, None)
+
+        self._pending: Dict[str, Section] = {}
+        self._cursor = 0
+        self._open: List[int] = []
+        self._top_level_written = False
+        self._lock = threading.Lock()
+        self._validator = IncrementalHTMLValidator()
+
+        head, self._tail = html_document_parts(toc.title)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.partial_path.open("w", encoding="utf-8")
+        self._write(head)
+
+    def _index(self, sections: List[TOCSection], parent: Optional[int]) -> None:
+        for section in sections:
+            position = len(self._nodes)
+            self._nodes.append(section)
+            self._parents.append(parent)
+            self._ends.append(position)
+            self._index(section.subsections or [], position)
+            self._ends[position] = len(self._nodes)
+
+    def _write(self, chunk: str) -> None:
+        self._file.write(chunk)
+        self._validator.feed(chunk)
+
+    def _advance(self, finishing: bool = False) -> None:
+        """Write every section that can be written in TOC order."""
+        while self._cursor < len(self._nodes):
+            node = self._nodes[self._cursor]
+            section = self._pending.pop(node.id, None)
+
+            if section is None:
+                if not finishing:
+                    return
+                if self.strict:
+                    raise KeyError(f"No Section found for TOC id '{node.id}'")
+                # skip this node (and its subtree)
+                self._cursor = self._ends[self._cursor]
+                continue
+
+            # close the sections whose subtree ends before this node
+            parent = self._parents[self._cursor]
+            while self._open and self._open[-1] != parent:
+                self._open.pop()
+                self._write(SECTION_END_HTML)
+
+            if self._open:
+                self._write("\n")
+            elif self._top_level_written:
+                self._write("\n\n")
+            self._top_level_written = True
+
+            self._write(section_start_html(section))
+            self._open.append(self._cursor)
+            self._cursor += 1
+            self.written += 1
+
+    def add(self, section: Section) -> None:
+        """
+        Add a finished section, writing it and any sections waiting on it.
+
+        Args:
+            section (Section): The generated section.
+        """
+        with self._lock:
+            self._pending[section.id] = section
+            self._advance()
+            self._file.flush()
+
+    def close(self) -> Path:
+        """
+        Write the remaining sections and the tail, validate and publish the document.
+
+        Returns:
+            Path: The path of the written document.
+
+        Raises:
+            KeyError: If `strict` is set and a TOC section was never added.
+            HTMLValidationError: If the document fails validation.
+        """
+        with self._lock:
+            try:
+                self._advance(finishing=True)
+                while self._open:
+                    self._open.pop()
+                    self._write(SECTION_END_HTML)
+                self._write(self._tail)
+                self._validator.close()
+            except BaseException:
+                self._discard()
+                raise
+
+            self._file.close()
+            os.replace(self.partial_path, self.path)
+            return self.path
+
+    def abort(self) -> None:
+        """Stop writing and remove the partial document."""
+        with self._lock:
+            self._discard()
+
+    def _discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self.partial_path.unlink(missing_ok=True)
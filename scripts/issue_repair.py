@@ -0,0 +1,184 @@
+import random
+from typing import Any, Dict, Generator, Optional
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.classes import TOCSection, SectionLLMOutput, IssueRepairOutput
+from software_whitelisting_assistant.scripts.llm_client import LLM_ERRORS, call_llm, call_llm_async
+from software_whitelisting_assistant.scripts.registry import get_prompt
+from software_whitelisting_assistant.scripts.telemetry import LLMCallRecord, get_telemetry, telemetry_context
+from software_whitelisting_assistant.scripts.utils import estimate_tokens
+
+
+# Issue types of `generate_sections.build_issue_instruction`
+ISSUE_TYPES = (
+    "a minor typo",
+    "a minor internal contradiction",
+    "a single instance of inconsistent terminology",
+    "a minor ambiguity",
+)
+
+
+def cheapest_model(config: AppConfig) -> str:
+    """
+    Return the model used for issue repairs.
+
+    Args:
+        config (AppConfig): The configuration.
+
+    Returns:
+        str: `issues.repair.model` if set, otherwise the configured model with the
+            lowest output price in `pricing`; `models.section` without prices.
+    """
+    if config.issues.repair.model:
+        return config.issues.repair.model
+
+    models = dict.fromkeys([config.models.section, config.models.tool, config.models.toc])
+    priced = [model for model in models if model in config.pricing]
+    if not priced:
+        return config.models.section
+    return min(priced, key=lambda model: (config.pricing[model].output, config.pricing[model].input))
+
+
+class IssueRepair:
+    """
+    Repair call injecting a planned issue into an already generated section.
+
+    A planned issue section that comes back without an issue is sent back to
+    the cheapest model together with its content and an instruction to
+    inject exactly one issue of a type drawn from the section's random
+    generator, instead of being regenerated from scratch. The model returns
+    only the edited passage, which is applied to the content here, so a
+    repair costs a few output tokens instead of a whole section. Every
+    repair is counted in the run telemetry with the tokens it saved
+    against a full regeneration.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        document_type: str,
+        section: TOCSection,
+        output: SectionLLMOutput,
+        section_prompt: str,
+        temperature: float,
+        rng: random.Random
+    ):
+        self.config = config
+        self.model = cheapest_model(config)
+        self.section = section
+        self.output = output
+        self.temperature = temperature
+        self.prompt = get_prompt(config.prompts.issue_repair, "issue_repair").render(
+            document_type=document_type,
+            section_title=section.title,
+            issue_type=rng.choice(ISSUE_TYPES),
+            content=output.content,
+        )
+        # a regeneration would send the section prompt again and produce a section as long
+        self.regeneration_output_tokens = estimate_tokens(output.model_dump_json())
+        self.regeneration_tokens = estimate_tokens(section_prompt) + self.regeneration_output_tokens
+        self.calls = 0
+        self.repair_tokens = 0
+        self.repair_output_tokens = 0
+
+    def _observe(self, record: LLMCallRecord) -> None:
+        self.repair_tokens += record.input_tokens + record.output_tokens
+        self.repair_output_tokens += record.output_tokens
+
+    def _apply(self, result: IssueRepairOutput) -> Optional[SectionLLMOutput]:
+        """Apply the edit of a repair call; None if it has no issue or does not fit the content."""
+        if result.issue is None or not result.original or result.original == result.replacement:
+            return None
+        if result.original not in self.output.content:
+            return None
+        return SectionLLMOutput(
+            content=self.output.content.replace(result.original, result.replacement, 1),
+            issue=result.issue
+        )
+
+    def _report(self, result: Optional[SectionLLMOutput]) -> Optional[SectionLLMOutput]:
+        repaired = result is not None
+        get_telemetry().record_repair(
+            repaired,
+            self.calls,
+            (self.regeneration_tokens if repaired else 0) - self.repair_tokens,
+            (self.regeneration_output_tokens if repaired else 0) - self.repair_output_tokens
+        )
+        if repaired:
+            print(f"[Info] Injected the planned issue into '{self.section.id}' with a repair call ({self.model})")
+        else:
+            print(f"[Warning] Issue repair of '{self.section.id}' failed after {self.calls} calls, regenerating it")
+        return result
+
+    def _attempts(self) -> Generator[Dict[str, Any], Optional[IssueRepairOutput], Optional[SectionLLMOutput]]:
+        """
+        The repair calls, up to `issues.repair.max_attempts`.
+
+        Yields the arguments of every call and is sent its edit (None for a
+        failed call), so `run` and `run_async` only make the calls.
+
+        Returns:
+            SectionLLMOutput | None: The section with its issue, or None.
+        """
+        while self.calls < self.config.issues.repair.max_attempts:
+            self.calls += 1
+            edit = yield dict(
+                prompt=self.prompt,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.config.issues.repair.max_tokens,
+                text_format=IssueRepairOutput,
+                on_usage=self._observe
+            )
+            result = self._apply(edit) if edit is not None else None
+            if result is not None:
+                return self._report(result)
+        return self._report(None)
+
+    def _failed(self, error: Exception) -> None:
+        print(f"[Warning] Issue repair call for '{self.section.id}' failed: {error}")
+
+    def run(self) -> Optional[SectionLLMOutput]:
+        """
+        Make up to `issues.repair.max_attempts` repair calls.
+
+        A failed call (see `LLM_ERRORS`) counts as an unusable repair.
+
+        Returns:
+            SectionLLMOutput | None: The section with its issue, or None if no
+                call returned one; the caller then regenerates the section.
+        """
+        attempts = self._attempts()
+        with telemetry_context(stage="issue_repair"):
+            try:
+                kwargs = next(attempts)
+                while True:
+                    try:
+                        edit = call_llm(**kwargs)
+                    except LLM_ERRORS as e:
+                        self._failed(e)
+                        edit = None
+                    kwargs = attempts.send(edit)
+            except StopIteration as done:
+                return done.value
+
+    async def run_async(self) -> Optional[SectionLLMOutput]:
+        """
+        Async counterpart of `run`.
+
+        Returns:
+            SectionLLMOutput | None: The section with its issue, or None if no
+                call returned one; the caller then regenerates the section.
+        """
+        attempts = self._attempts()
+        with telemetry_context(stage="issue_repair"):
+            try:
+                kwargs = next(attempts)
+                while True:
+                    try:
+                        edit = await call_llm_async(**kwargs)
+                    except LLM_ERRORS as e:
+                        self._failed(e)
+                        edit = None
+                    kwargs = attempts.send(edit)
+            except StopIteration as done:
+                return done.value
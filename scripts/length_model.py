@@ -0,0 +1,270 @@
+import argparse
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple
+from software_whitelisting_assistant.config.classes import AdaptiveMaxTokensConfig
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+# Relative `adaptive_max_tokens.path` values are resolved against the package root
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+
+
+def percentile(samples, q: float) -> int:
+    """
+    Nearest-rank percentile of a collection of token counts.
+
+    Args:
+        samples: The token counts, not empty.
+        q (float): Percentile, in (0, 100].
+
+    Returns:
+        int: The smallest sample with at least `q` percent of the samples at or below it.
+    """
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class SectionLengthModel:
+    """
+    Persistent distribution of section output lengths, used to size `max_tokens`.
+
+    Output tokens of every section response are recorded under the document
+    type, section depth and normalized section title. The limit of a new
+    request is a high percentile of the matching samples times a headroom
+    factor. Titles seen fewer than `min_samples` times fall back to all
+    sections of the same document type and depth, and without enough samples
+    there either the configured limit is used.
+
+    Only completed responses are recorded. A response cut off at a limit
+    learned too low is re-issued with a larger budget, and the length of
+    that response raises the percentile instead.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        percentile: float = 95,
+        headroom: float = 1.2,
+        min_samples: int = 5,
+        max_samples: int = 200,
+        min_tokens: int = 128,
+        max_tokens: int = 4000
+    ):
+        self.path = Path(path)
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+
+        self._lock = threading.Lock()
+        # latest samples per (document type, level, title) and per (document type, level)
+        self._titles: Dict[Tuple[str, int, str], Deque[int]] = {}
+        self._levels: Dict[Tuple[str, int], Deque[int]] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_type TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS samples_key ON samples (document_type, level, title)"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT document_type, level, title, output_tokens FROM samples ORDER BY id"
+        ).fetchall()
+        for document_type, level, title, output_tokens in rows:
+            self._insert((document_type, level, title), output_tokens)
+
+    def _insert(self, key: Tuple[str, int, str], output_tokens: int) -> None:
+        self._titles.setdefault(key, deque(maxlen=self.max_samples)).append(output_tokens)
+        # the level pool is shared by many titles, so it keeps more samples
+        self._levels.setdefault(key[:2], deque(maxlen=self.max_samples * 10)).append(output_tokens)
+
+    @staticmethod
+    def key(document_type: str, level: int, title: str) -> Tuple[str, int, str]:
+        """
+        Key of a section in the model.
+
+        Args:
+            document_type (str): Type of the document.
+            level (int): Nesting level of the section, 1 for top-level sections.
+            title (str): Title of the section.
+
+        Returns:
+            Tuple[str, int, str]: Normalized document type, level and title.
+        """
+        return normalize_name(document_type), level, normalize_name(title)
+
+    def __len__(self) -> int:
+        return sum(len(samples) for samples in self._titles.values())
+
+    def max_tokens_for(self, document_type: str, level: int, title: str, default: int) -> int:
+        """
+        Output token limit of a section request.
+
+        Args:
+            document_type (str): Type of the document.
+            level (int): Nesting level of the section.
+            title (str): Title of the section.
+            default (int): Limit used while there are too few samples.
+
+        Returns:
+            int: The percentile of the matching samples times the headroom,
+                clamped to [min_tokens, max_tokens]; `default` without data.
+        """
+        key = self.key(document_type, level, title)
+        with self._lock:
+            samples = self._titles.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                samples = self._levels.get(key[:2])
+            if samples is None or len(samples) < self.min_samples:
+                return default
+            observed = percentile(samples, self.percentile)
+
+        limit = math.ceil(observed * self.headroom)
+        return max(self.min_tokens, min(self.max_tokens, limit))
+
+    def observe(self, document_type: str, level: int, title: str, output_tokens: int) -> None:
+        """
+        Record the output length of a section response.
+
+        Args:
+            document_type (str): Type of the document.
+            level (int): Nesting level of the section.
+            title (str): Title of the section.
+            output_tokens (int): Output tokens reported by the provider.
+        """
+        if output_tokens <= 0:
+            return
+
+        key = self.key(document_type, level, title)
+        with self._lock:
+            self._insert(key, output_tokens)
+            self._conn.execute(
+                "INSERT INTO samples (document_type, level, title, output_tokens, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, output_tokens, time.time())
+            )
+            # keep the newest `max_samples` rows per title
+            self._conn.execute(
+                """
+                DELETE FROM samples
+                WHERE document_type = ? AND level = ? AND title = ? AND id NOT IN (
+                    SELECT id FROM samples
+                    WHERE document_type = ? AND level = ? AND title = ?
+                    ORDER BY id DESC LIMIT ?
+                )
+                """,
+                (*key, *key, self.max_samples)
+            )
+            self._conn.commit()
+
+    def summary(self) -> Dict[Tuple[str, int], Dict[str, int]]:
+        """
+        Sample count and percentile of every (document type, level) pool.
+
+        Returns:
+            Dict[Tuple[str, int], Dict[str, int]]: Statistics per pool.
+        """
+        with self._lock:
+            return {
+                key: {
+                    "samples": len(samples),
+                    "median": percentile(samples, 50),
+                    "percentile": percentile(samples, self.percentile),
+                }
+                for key, samples in sorted(self._levels.items())
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Length models opened by this process, one per database path
+_models: Dict[Path, SectionLengthModel] = {}
+_models_lock = threading.Lock()
+
+
+def open_length_model(settings: AdaptiveMaxTokensConfig) -> Optional[SectionLengthModel]:
+    """
+    Return the section length model, opening it on first use.
+
+    Args:
+        settings (AdaptiveMaxTokensConfig): The `generation.adaptive_max_tokens` configuration.
+
+    Returns:
+        SectionLengthModel | None: The model, or None when adaptive limits are disabled.
+    """
+    if not settings.enabled:
+        return None
+
+    path = (PACKAGE_DIR / settings.path).resolve()
+    with _models_lock:
+        model = _models.get(path)
+        if model is None:
+            model = _models[path] = SectionLengthModel(
+                path,
+                percentile=settings.percentile,
+                headroom=settings.headroom,
+                min_samples=settings.min_samples,
+                max_samples=settings.max_samples,
+                min_tokens=settings.min_tokens,
+                max_tokens=settings.max_tokens
+            )
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the section output lengths learned so far.")
+    parser.add_argument("--path", type=Path, help="Length model database (default: from the configuration)")
+    args = parser.parse_args()
+
+    if args.path is not None:
+        model = SectionLengthModel(args.path)
+    else:
+        # imported here: loading the configuration is only needed without --path
+        from software_whitelisting_assistant.scripts.registry import get_config
+
+        settings = get_config().generation.adaptive_max_tokens
+        model = SectionLengthModel(
+            PACKAGE_DIR / settings.path,
+            percentile=settings.percentile,
+            min_samples=settings.min_samples,
+            max_samples=settings.max_samples
+        )
+
+    print(f"[Info] {len(model)} section samples in {model.path}")
+    for (document_type, level), stats in model.summary().items():
+        print(
+            f"  {document_type:<32} level {level}: {stats['samples']:>5} samples, "
+            f"median {stats['median']:>5}, p{model.percentile:g} {stats['percentile']:>5} tokens"
+        )
+    model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,647 @@
+import asyncio
+import hashlib
+import importlib.util
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+import openai
+from pydantic import BaseModel
+from software_whitelisting_assistant.config.classes import BackendConfig, MockBackendConfig
+from software_whitelisting_assistant.scripts.classes import (
+    Tool, TOC, TOCSection, SectionLLMOutput, InjectedIssue, ToolBatch, DocumentTOC, TOCBatch,
+    SectionBatchItem, SectionBatchOutput, IssueRepairOutput
+)
+from software_whitelisting_assistant.scripts.utils import estimate_tokens
+
+
+# Backends expose the subset of the OpenAI client used by `llm_client`:
+# `responses.create(...)`, `responses.parse(...)` and `responses.stream(...)`,
+# returning an object with `output_text`, `output_parsed` and `usage`.
+# `LLMBackend` adds how a backend is chosen per stage and per event loop.
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+# Marker of the issue instruction built by `generate_sections.build_issue_instruction`
+_ISSUE_MARKER = "ONE and only ONE"
+_SECTION_TITLE_RE = re.compile(r"^- Section title: (.*)$", re.MULTILINE)
+
+# Item counts of the batched tool and TOC prompts
+_TOOL_COUNT_RE = re.compile(r"exactly (\d+) tools")
+_DOCUMENT_TYPES_RE = re.compile(r"^Document types: (\[.*\])$", re.MULTILINE)
+
+# Prompt prefixes are cached in blocks of 128 tokens (about 4 characters each)
+_PREFIX_BLOCK_CHARS = 128 * 4
+
+# Section text of the issue repair prompt
+_REPAIR_CONTENT_RE = re.compile(r"^Section text:\n(.*?)\n\nReturn only", re.MULTILINE | re.DOTALL)
+
+# Entries of `generate_sections.render_sibling_sections`
+_SIBLING_RE = re.compile(r"^- id: (.*)\n  title: (.*)\n  issue instruction: (.*)$", re.MULTILINE)
+
+_WORDS = (
+    "licensee provider service data agreement party obligation term notice access "
+    "customer security processing account software confidential information use "
+    "applicable law right subscription fee support availability incident breach "
+    "audit control retention deletion request consent purpose limitation"
+).split()
+
+
+class CassetteMissError(Exception):
+    """Raised when a replayed request was not recorded in the cassette."""
+    pass
+
+
+@dataclass
+class TokenDetails:
+    cached_tokens: int = 0
+
+
+@dataclass
+class BackendUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    input_tokens_details: TokenDetails = field(default_factory=TokenDetails)
+
+
+@dataclass
+class IncompleteDetails:
+    reason: str
+
+
+@dataclass
+class BackendResponse:
+    """
+    Response of a non-OpenAI backend, shaped like the SDK response object.
+    """
+    output_text: str
+    output_parsed: Any = None
+    usage: BackendUsage = field(default_factory=BackendUsage)
+    status: str = "completed"
+    incomplete_details: Optional[IncompleteDetails] = None
+
+
+class _CompletedStream:
+    """Response stream of a backend that only produces complete responses."""
+
+    def __init__(self, response):
+        self._response = response
+
+    def __enter__(self) -> "_CompletedStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def get_final_response(self):
+        return self._response
+
+
+class _AsyncCompletedStream:
+    """Async response stream of a backend that only produces complete responses."""
+
+    def __init__(self, pending: Awaitable[Any]):
+        self._pending = pending
+        self._response = None
+
+    async def __aenter__(self) -> "_AsyncCompletedStream":
+        self._response = await self._pending
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def get_final_response(self):
+        return self._response
+
+
+class _Responses:
+    """`responses` namespace of a backend, forwarding to its `respond`."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, model: str, input: str, temperature=None, max_output_tokens: int = None):
+        return self._backend.respond(model, input, temperature, max_output_tokens, None)
+
+    def parse(self, model: str, input: str, temperature=None, max_output_tokens: int = None, text_format=None):
+        return self._backend.respond(model, input, temperature, max_output_tokens, text_format)
+
+    def stream(self, model: str, input: str, temperature=None, max_output_tokens: int = None, text_format=None):
+        return _CompletedStream(
+            self._backend.respond(model, input, temperature, max_output_tokens, text_format)
+        )
+
+
+class _AsyncResponses(_Responses):
+    """`responses` namespace of an async backend, forwarding to its `respond_async`."""
+
+    async def create(self, model: str, input: str, temperature=None, max_output_tokens: int = None):
+        return await self._backend.respond_async(model, input, temperature, max_output_tokens, None)
+
+    async def parse(self, model: str, input: str, temperature=None, max_output_tokens: int = None, text_format=None):
+        return await self._backend.respond_async(model, input, temperature, max_output_tokens, text_format)
+
+    def stream(self, model: str, input: str, temperature=None, max_output_tokens: int = None, text_format=None):
+        return _AsyncCompletedStream(
+            self._backend.respond_async(model, input, temperature, max_output_tokens, text_format)
+        )
+
+
+class AsyncBackend:
+    """
+    Async view of a backend, used where `llm_client` expects an `AsyncOpenAI` client.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.responses = _AsyncResponses(backend)
+
+
+class LLMBackend:
+    """
+    Interface of the backends serving LLM requests.
+
+    Sync requests of a stage (tool, toc, section) are sent through
+    `for_stage(stage).responses`, async requests through
+    `async_for_stage(stage).responses`. Backends without per-stage
+    settings serve every stage themselves.
+    """
+    responses: Any
+
+    def for_stage(self, stage: Optional[str]) -> Any:
+        """Return the object serving sync requests of a stage."""
+        return self
+
+    def async_for_stage(self, stage: Optional[str]) -> Any:
+        """Return the object serving async requests of a stage, in the running event loop."""
+        return AsyncBackend(self)
+
+
+# -----------------------------
+# OpenAI-compatible backend
+# -----------------------------
+# API key used for OpenAI-compatible servers that do not check it
+_UNUSED_API_KEY = "unused"
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Backend for the OpenAI API or any OpenAI-compatible server (`base_url`).
+
+    All threads share one sync client, and all tasks of an event loop one
+    async client, each on a single pooled HTTP client configured by
+    `backend.http`: connection and keep-alive limits, HTTP/2 (when the `h2`
+    package is installed) and timeouts, with the read timeout set per stage.
+    Per-stage views share the connection pool of their client.
+    """
+
+    def __init__(self, config: BackendConfig):
+        self.config = config
+        self.base_url = config.base_url or os.environ.get("BASE_URL")
+        self.api_key = os.environ.get(config.api_key_env) or (_UNUSED_API_KEY if config.base_url else None)
+
+        self.http2 = config.http.http2 and importlib.util.find_spec("h2") is not None
+        if config.http.http2 and not self.http2:
+            print("[Info] HTTP/2 needs the 'h2' package (pip install \"httpx[http2]\"), using HTTP/1.1")
+
+        # retries are handled by the shared retry policy, not by the SDK
+        self.client = openai.OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(**self._transport())
+        )
+        self.responses = self.client.responses
+
+        self._lock = threading.Lock()
+        self._stage_clients: Dict[Optional[str], Any] = {None: self.client}
+        # async clients are bound to the event loop they were created in
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[str], Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _timeout(self, stage: Optional[str] = None):
+        import httpx  # installed with openai; only needed by this backend
+
+        http = self.config.http
+        return httpx.Timeout(http.stage_timeouts_s.get(stage, http.timeout_s), connect=http.connect_timeout_s)
+
+    def _transport(self) -> Dict[str, Any]:
+        import httpx
+
+        http = self.config.http
+        return {
+            "limits": httpx.Limits(
+                max_connections=http.max_connections,
+                max_keepalive_connections=http.max_keepalive_connections,
+                keepalive_expiry=http.keepalive_expiry_s
+            ),
+            "timeout": self._timeout(),
+            "http2": self.http2,
+        }
+
+    def for_stage(self, stage: Optional[str]) -> openai.OpenAI:
+        if stage not in self.config.http.stage_timeouts_s:
+            return self.client
+        with self._lock:
+            client = self._stage_clients.get(stage)
+            if client is None:
+                client = self._stage_clients[stage] = self.client.with_options(timeout=self._timeout(stage))
+            return client
+
+    def async_client(self) -> openai.AsyncOpenAI:
+        """
+        Return the async client of the running event loop, creating it on first use.
+
+        Returns:
+            openai.AsyncOpenAI: The client shared by all tasks of the loop.
+        """
+        return self.async_for_stage(None)
+
+    def async_for_stage(self, stage: Optional[str]) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.get(loop)
+        if clients is None:
+            clients = self._async_clients[loop] = {
+                None: openai.AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=0,
+                    http_client=openai.DefaultAsyncHttpxClient(**self._transport())
+                )
+            }
+
+        if stage not in self.config.http.stage_timeouts_s:
+            return clients[None]
+        client = clients.get(stage)
+        if client is None:
+            client = clients[stage] = clients[None].with_options(timeout=self._timeout(stage))
+        return client
+
+
+# -----------------------------
+# Mock backend
+# -----------------------------
+class MockBackend(LLMBackend):
+    """
+    Offline backend returning schema-valid `Tool`, `TOC` and `SectionLLMOutput`
+    objects, and batches of tools and TOCs.
+
+    Every response waits for a latency drawn from the configured distribution,
+    and fails with a retryable timeout with probability `failure_rate`.
+    Section prompts that ask for an issue get one, except for a share of
+    `issue_miss_rate` of them. Outputs are reproducible
+    for a fixed `seed` as long as calls are made in the same order.
+
+    With `prefix_cache`, the usage reports cached input tokens the way provider
+    prefix caching does: the longest prefix, in whole blocks, that an earlier
+    prompt started with, once it reaches `prefix_cache_min_tokens`.
+
+    Outputs longer than `max_tokens` are cut off and marked incomplete, and
+    cut-off structured outputs fail to parse, as they do with the SDK.
+    """
+
+    def __init__(self, config: MockBackendConfig):
+        if config.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{config.latency_distribution}', "
+                f"expected one of {LATENCY_DISTRIBUTIONS}"
+            )
+        self.config = config
+        self.responses = _Responses(self)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._tool_ids = itertools.count(1)
+        self._prefixes: set = set()
+
+    def _latency(self) -> float:
+        mean, spread = self.config.latency_s, self.config.latency_spread_s
+        with self._lock:
+            if self.config.latency_distribution == "constant":
+                latency = mean
+            elif self.config.latency_distribution == "uniform":
+                latency = self._rng.uniform(mean - spread, mean + spread)
+            elif self.config.latency_distribution == "normal":
+                latency = self._rng.gauss(mean, spread)
+            else:
+                latency = mean * self._rng.lognormvariate(0, spread)
+        return max(0.0, latency)
+
+    def _fails(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.config.failure_rate
+
+    def _misses_issue(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.config.issue_miss_rate
+
+    def _words(self, count: int) -> str:
+        with self._lock:
+            return " ".join(self._rng.choice(_WORDS) for _ in range(count))
+
+    def _tool(self) -> Tool:
+        number = next(self._tool_ids)
+        return Tool(
+            name=f"Mock Tool {number}",
+            purpose=self._words(12),
+            category="Mock",
+            user_base="Mock users"
+        )
+
+    def _toc(self) -> TOC:
+        with self._lock:
+            subsections = [
+                self._rng.randint(0, self.config.toc_subsections)
+                for _ in range(self.config.toc_sections)
+            ]
+        return TOC(
+            id="mock_document",
+            title="Mock Document",
+            sections=[
+                TOCSection(
+                    id=f"s{i}",
+                    title=f"Section {i}",
+                    subsections=[
+                        TOCSection(id=f"s{i}_{j}", title=f"Section {i}.{j}")
+                        for j in range(1, count + 1)
+                    ]
+                )
+                for i, count in enumerate(subsections, start=1)
+            ]
+        )
+
+    def _section(self, prompt: str) -> SectionLLMOutput:
+        match = _SECTION_TITLE_RE.search(prompt)
+        title = match.group(1).strip() if match else "Unknown"
+        return self._section_output(title, _ISSUE_MARKER in prompt)
+
+    def _section_output(self, title: str, with_issue: bool) -> SectionLLMOutput:
+        content = "".join(
+            f"<p>{self._words(self.config.paragraph_words)}.</p>"
+            for _ in range(self.config.section_paragraphs)
+        )
+        if not with_issue or self._misses_issue():
+            return SectionLLMOutput(content=content)
+
+        return SectionLLMOutput(
+            content=content,
+            issue=InjectedIssue(
+                section_id=title.lower().replace(" ", "_"),
+                section_title=title,
+                description="Mock issue",
+                severity="low"
+            )
+        )
+
+    def _issue_repair(self, prompt: str) -> IssueRepairOutput:
+        title = _SECTION_TITLE_RE.search(prompt)
+        content = _REPAIR_CONTENT_RE.search(prompt)
+        words = re.sub(r"<[^>]+>", " ", content.group(1) if content else "").split()[:6]
+        original = " ".join(words)
+        if not original or self._misses_issue():
+            return IssueRepairOutput(original=original, replacement=original)
+
+        title = title.group(1).strip() if title else "Unknown"
+        # a doubled first letter as the typo
+        return IssueRepairOutput(
+            original=original,
+            replacement=original[:1] + original,
+            issue=InjectedIssue(
+                section_id=title.lower().replace(" ", "_"),
+                section_title=title,
+                description="Mock repaired issue",
+                severity="low"
+            )
+        )
+
+    def _sibling_sections(self, prompt: str) -> SectionBatchOutput:
+        items = []
+        for section_id, title, instruction in _SIBLING_RE.findall(prompt):
+            output = self._section_output(title.strip(), _ISSUE_MARKER in instruction)
+            items.append(SectionBatchItem(id=section_id.strip(), content=output.content, issue=output.issue))
+        return SectionBatchOutput(sections=items)
+
+    def _cached_tokens(self, prompt: str) -> int:
+        if not self.config.prefix_cache:
+            return 0
+
+        digest = hashlib.blake2b(digest_size=16)
+        cached = 0
+        with self._lock:
+            for end in range(_PREFIX_BLOCK_CHARS, len(prompt) + 1, _PREFIX_BLOCK_CHARS):
+                digest.update(prompt[end - _PREFIX_BLOCK_CHARS:end].encode("utf-8"))
+                key = digest.digest()
+                if key in self._prefixes:
+                    cached = end
+                else:
+                    self._prefixes.add(key)
+
+        tokens = estimate_tokens(prompt[:cached])
+        return tokens if tokens >= self.config.prefix_cache_min_tokens else 0
+
+    def _build(self, prompt: str, max_tokens: Optional[int], text_format: Optional[Type[BaseModel]]) -> BackendResponse:
+        if self._fails():
+            raise openai.APITimeoutError(request=None)
+
+        if text_format is Tool:
+            parsed = self._tool()
+        elif text_format is TOC:
+            parsed = self._toc()
+        elif text_format is ToolBatch:
+            match = _TOOL_COUNT_RE.search(prompt)
+            parsed = ToolBatch(tools=[self._tool() for _ in range(int(match.group(1)) if match else 1)])
+        elif text_format is TOCBatch:
+            match = _DOCUMENT_TYPES_RE.search(prompt)
+            parsed = TOCBatch(tocs=[
+                DocumentTOC(document_type=document_type, toc=self._toc())
+                for document_type in (json.loads(match.group(1)) if match else [])
+            ])
+        elif text_format is SectionLLMOutput:
+            parsed = self._section(prompt)
+        elif text_format is SectionBatchOutput:
+            parsed = self._sibling_sections(prompt)
+        elif text_format is IssueRepairOutput:
+            parsed = self._issue_repair(prompt)
+        elif text_format is None:
+            parsed = None
+        else:
+            raise ValueError(f"Mock backend cannot produce {text_format.__name__}")
+
+        text = parsed.model_dump_json() if parsed is not None else self._words(50)
+        usage = BackendUsage(
+            input_tokens=estimate_tokens(prompt),
+            output_tokens=estimate_tokens(text),
+            input_tokens_details=TokenDetails(self._cached_tokens(prompt))
+        )
+
+        if max_tokens is not None and usage.output_tokens > max_tokens:
+            # cut off at the limit, like the provider does
+            text = text[:max_tokens * 4]
+            usage.output_tokens = max_tokens
+            if parsed is not None:
+                # the SDK fails to parse the cut-off JSON
+                text_format.model_validate_json(text)
+            return BackendResponse(
+                output_text=text,
+                usage=usage,
+                status="incomplete",
+                incomplete_details=IncompleteDetails("max_output_tokens")
+            )
+
+        return BackendResponse(output_text=text, output_parsed=parsed, usage=usage)
+
+    def respond(self, model, prompt, temperature, max_tokens, text_format) -> BackendResponse:
+        time.sleep(self._latency())
+        return self._build(prompt, max_tokens, text_format)
+
+    async def respond_async(self, model, prompt, temperature, max_tokens, text_format) -> BackendResponse:
+        await asyncio.sleep(self._latency())
+        return self._build(prompt, max_tokens, text_format)
+
+
+
+# -----------------------------
+# Cassettes
+# -----------------------------
+def _cassette_key(model: str, prompt: str, temperature, max_tokens, text_format) -> str:
+    base = json.dumps(
+        [model, prompt, temperature, max_tokens, text_format.__name__ if text_format else None],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+class CassetteBackend(LLMBackend):
+    """
+    Records responses of another backend to a JSONL cassette, or replays them.
+
+    Identical requests are recorded in call order and replayed in the same
+    order, so repeated sampled requests (e.g. issue retries) replay faithfully.
+    In replay mode no other backend is needed and unrecorded requests raise
+    `CassetteMissError`. When recording, `inner` serves sync requests and
+    `async_inner()` returns the async client of the running event loop.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "replay",
+        inner=None,
+        async_inner: Optional[Callable[[], Any]] = None
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}', expected 'record' or 'replay'")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording a cassette requires a backend to record from")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.inner = inner
+        self.async_inner = async_inner
+        self.responses = _Responses(self)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._replayed: Dict[str, int] = {}
+
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _replay(self, key: str, text_format: Optional[Type[BaseModel]]) -> BackendResponse:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"Request {key[:12]} not recorded in {self.path}")
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+        # requests repeated more often than recorded reuse the last response
+        entry = entries[min(index, len(entries) - 1)]
+
+        parsed = None
+        if text_format is not None:
+            parsed = text_format.model_validate_json(entry["output_text"])
+        usage = entry.get("usage", {})
+        reason = entry.get("incomplete_reason")
+        return BackendResponse(
+            output_text=entry["output_text"],
+            output_parsed=parsed,
+            usage=BackendUsage(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                input_tokens_details=TokenDetails(usage.get("cached_tokens", 0))
+            ),
+            status="incomplete" if reason else "completed",
+            incomplete_details=IncompleteDetails(reason) if reason else None
+        )
+
+    def _record(self, key: str, model: str, response) -> None:
+        parsed = getattr(response, "output_parsed", None)
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        entry = {
+            "key": key,
+            "model": model,
+            "output_text": (
+                parsed.model_dump_json(exclude_none=True) if parsed is not None else response.output_text
+            ),
+            "usage": {
+                "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+                "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            },
+        }
+        incomplete = getattr(response, "incomplete_details", None)
+        if getattr(response, "status", None) == "incomplete" and incomplete is not None:
+            entry["incomplete_reason"] = incomplete.reason
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def respond(self, model, prompt, temperature, max_tokens, text_format):
+        key = _cassette_key(model, prompt, temperature, max_tokens, text_format)
+        if self.mode == "replay":
+            return self._replay(key, text_format)
+
+        if text_format is None:
+            response = self.inner.responses.create(
+                model=model, input=prompt, temperature=temperature, max_output_tokens=max_tokens
+            )
+        else:
+            response = self.inner.responses.parse(
+                model=model, input=prompt, temperature=temperature,
+                max_output_tokens=max_tokens, text_format=text_format
+            )
+        self._record(key, model, response)
+        return response
+
+    async def respond_async(self, model, prompt, temperature, max_tokens, text_format):
+        key = _cassette_key(model, prompt, temperature, max_tokens, text_format)
+        if self.mode == "replay":
+            return self._replay(key, text_format)
+
+        inner = self.async_inner()
+        if text_format is None:
+            response = await inner.responses.create(
+                model=model, input=prompt, temperature=temperature, max_output_tokens=max_tokens
+            )
+        else:
+            response = await inner.responses.parse(
+                model=model, input=prompt, temperature=temperature,
+                max_output_tokens=max_tokens, text_format=text_format
+            )
+        self._record(key, model, response)
+        return response
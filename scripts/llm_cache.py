@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+from pydantic import BaseModel
+
+
+CACHE_MODES = ("read_through", "write_through", "bypass")
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Entries are keyed on a hash of the model, rendered prompt, temperature,
+    max_tokens and structured output schema. Plain-text responses are stored
+    as text, structured responses as the JSON of the parsed model.
+
+    Modes:
+    - read_through: return cached responses, call the LLM and store on a miss
+    - write_through: always call the LLM and store (refresh) the response
+    - bypass: never read or write the cache
+
+    Sampled requests (temperature > 0) are expected to differ between calls,
+    so identical sampled requests are numbered in call order and the number is
+    part of the key. A rerun therefore maps its n-th identical request onto the
+    n-th cached response instead of collapsing them all into one.
+    Identical requests that are in flight at the same time share one LLM call.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "read_through",
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[float] = None
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._occurrences: Dict[str, int] = {}
+        self._schemas: Dict[type, str] = {}
+        self._conn: sqlite3.Connection | None = None
+
+        if self.mode != "bypass":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)"
+            )
+            self._conn.commit()
+            self.evict()
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+    def _schema(self, text_format: Optional[Type[BaseModel]]) -> str:
+        if text_format is None:
+            return ""
+        schema = self._schemas.get(text_format)
+        if schema is None:
+            schema = json.dumps(text_format.model_json_schema(), sort_keys=True)
+            self._schemas[text_format] = schema
+        return schema
+
+    def make_key(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        text_format: Optional[Type[BaseModel]]
+    ) -> str:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            model (str): Name of the LLM model.
+            prompt (str): The rendered prompt.
+            temperature (float | None): Sampling temperature.
+            max_tokens (int): Maximum number of output tokens.
+            text_format (Type[BaseModel] | None): Structured output model, if any.
+
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        base = json.dumps(
+            [model, prompt, temperature, max_tokens, self._schema(text_format)],
+            ensure_ascii=False
+        )
+        key = hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+        if temperature:
+            with self._lock:
+                sample = self._occurrences.get(key, 0)
+                self._occurrences[key] = sample + 1
+            key = hashlib.sha256(f"{key}:{sample}".encode("utf-8")).hexdigest()
+
+        return key
+
+    # -----------------------------
+    # Storage
+    # -----------------------------
+    def get(self, key: str, text_format: Optional[Type[BaseModel]]) -> Any:
+        """
+        Read a response from the cache.
+
+        Args:
+            key (str): The cache key.
+            text_format (Type[BaseModel] | None): Model used to rebuild structured output.
+
+        Returns:
+            Any: The cached text or parsed model, or None if there is no entry.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+
+        kind, payload = row
+        if kind == "parsed":
+            if text_format is None:
+                return None
+            return text_format.model_validate_json(payload)
+        return payload
+
+    def put(self, key: str, model: str, value: Any) -> None:
+        """
+        Store a response in the cache.
+
+        Args:
+            key (str): The cache key.
+            model (str): Name of the LLM model that produced the response.
+            value (Any): Plain output text or a parsed pydantic model.
+        """
+        if isinstance(value, BaseModel):
+            kind, payload = "parsed", value.model_dump_json(exclude_none=True)
+        else:
+            kind, payload = "text", value
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, kind, payload, now, now)
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def evict(self) -> int:
+        """
+        Remove entries older than `max_age_days` and the least recently used
+        entries above `max_entries`.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        if self._conn is None:
+            return 0
+
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+                ).rowcount
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters of this process.
+
+        Returns:
+            Dict[str, Any]: Mode, hits, misses, writes, coalesced calls and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # -----------------------------
+    # Lookup with in-flight coalescing
+    # -----------------------------
+    def _begin(self, key: str, text_format: Optional[Type[BaseModel]]):
+        """
+        Return (cached value, leader future, follower future) for a request.
+        Exactly one of them is set.
+        """
+        if self.mode == "read_through":
+            cached = self.get(key, text_format)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached, None, None
+
+        with self._lock:
+            self.misses += 1
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return None, None, pending
+            future: Future = Future()
+            self._inflight[key] = future
+            return None, future, None
+
+    def _finish(self, key: str, model: str, future: Future, value: Any = None, error: BaseException = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+            return
+        self.put(key, model, value)
+        future.set_result(value)
+
+    def get_or_call(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        text_format: Optional[Type[BaseModel]],
+        call: Callable[[], Any]
+    ) -> Any:
+        """
+        Return the cached response of a request, calling the LLM if needed.
+
+        Args:
+            model (str): Name of the LLM model.
+            prompt (str): The rendered prompt.
+            temperature (float | None): Sampling temperature.
+            max_tokens (int): Maximum number of output tokens.
+            text_format (Type[BaseModel] | None): Structured output model, if any.
+            call (Callable[[], Any]): Performs the actual LLM request.
+
+        Returns:
+            Any: Plain output text or the parsed structured output.
+        """
+        if self.mode == "bypass":
+            return call()
+
+        key = self.make_key(model, prompt, temperature, max_tokens, text_format)
+        cached, leader, follower = self._begin(key, text_format)
+        if cached is not None:
+            return cached
+        if follower is not None:
+            return follower.result()
+
+        try:
+            value = call()
+        except BaseException as e:
+            self._finish(key, model, leader, error=e)
+            raise
+        self._finish(key, model, leader, value)
+        return value
+
+    async def get_or_call_async(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        text_format: Optional[Type[BaseModel]],
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Async counterpart of `get_or_call`.
+
+        Args:
+            model (str): Name of the LLM model.
+            prompt (str): The rendered prompt.
+            temperature (float | None): Sampling temperature.
+            max_tokens (int): Maximum number of output tokens.
+            text_format (Type[BaseModel] | None): Structured output model, if any.
+            call (Callable[[], Awaitable[Any]]): Performs the actual LLM request.
+
+        Returns:
+            Any: Plain output text or the parsed structured output.
+        """
+        if self.mode == "bypass":
+            return await call()
+
+        key = self.make_key(model, prompt, temperature, max_tokens, text_format)
+        cached, leader, follower = self._begin(key, text_format)
+        if cached is not None:
+            return cached
+        if follower is not None:
+            return await asyncio.wrap_future(follower)
+
+        try:
+            value = await call()
+        except BaseException as e:
+            self._finish(key, model, leader, error=e)
+            raise
+        self._finish(key, model, leader, value)
+        return value
@@ -1,8 +1,27 @@
-import os
-from typing import TypeVar, Type, Optional
-from pydantic import BaseModel
+import asyncio
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Generator, Tuple, TypeVar, Type, Optional
+from pydantic import BaseModel, ValidationError
 import openai
 from dotenv import load_dotenv
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.config.classes import TruncationConfig
+from software_whitelisting_assistant.scripts.llm_backends import CassetteBackend, CassetteMissError, LLMBackend, MockBackend, OpenAIBackend
+from software_whitelisting_assistant.scripts.llm_cache import LLMCache
+from software_whitelisting_assistant.scripts.registry import get_config, get_prompt
+from software_whitelisting_assistant.scripts.retry import (
+    RetryBudgetExceededError,
+    RetryPolicy,
+    call_with_retries,
+    call_with_retries_async,
+    get_in_flight_limiter,
+    get_rate_limiter,
+)
+from software_whitelisting_assistant.scripts.telemetry import LLMCallRecord, current_labels, get_telemetry, telemetry_context
+from software_whitelisting_assistant.scripts.utils import estimate_tokens
 
 
 # Load environment variables from .env file
@@ -10,53 +29,674 @@ load_dotenv()
 
 # create generic object to be used as a type parameter in structured outputs
 T = TypeVar("T", bound=BaseModel)
+R = TypeVar("R")
+
+# OpenAI-compatible backends, created on first use so that offline
+# backends run without an API key; one per `backend` configuration
+_openai_backends: Dict[str, OpenAIBackend] = {}
+_openai_backends_lock = threading.Lock()
+
+
+def get_openai_backend(config: AppConfig) -> OpenAIBackend:
+    """
+    Return the shared OpenAI-compatible backend of a configuration.
+
+    Args:
+        config (AppConfig): The application configuration.
+
+    Returns:
+        OpenAIBackend: The backend, created on first use.
+    """
+    key = config.backend.model_dump_json(include={"base_url", "api_key_env", "http"})
+    with _openai_backends_lock:
+        backend = _openai_backends.get(key)
+        if backend is None:
+            backend = _openai_backends[key] = OpenAIBackend(config.backend)
+        return backend
+
+
+def get_client() -> openai.OpenAI:
+    """
+    Return the shared OpenAI client, creating it on first use.
+
+    Returns:
+        openai.OpenAI: The client of the configured OpenAI-compatible backend.
+    """
+    return get_openai_backend(get_config()).client
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """
+    Return the async OpenAI client for the currently running event loop.
+
+    Returns:
+        openai.AsyncOpenAI: A client created on first use within the loop.
+    """
+    return get_openai_backend(get_config()).async_client()
+
+
+def _package_path(path: str) -> Path:
+    """Resolve a configured path relative to the package root."""
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = Path(__file__).resolve().parents[1] / resolved
+    return resolved
+
+
+# Backend serving the requests, created on first use and
+# recreated when the `backend` configuration changes
+_backend = None
+_backend_key: str | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend(config: AppConfig) -> LLMBackend:
+    """
+    Return the backend serving LLM requests, as configured in `backend`.
+
+    - openai: an `OpenAIBackend` for the OpenAI API or an OpenAI-compatible
+      server (`backend.base_url`)
+    - mock: an offline `MockBackend`
+
+    With a `cassette` configured, responses of the backend are recorded
+    to it, or replayed from it without calling any backend.
+
+    Args:
+        config (AppConfig): The application configuration.
+
+    Returns:
+        LLMBackend: The backend.
+    """
+    global _backend, _backend_key
+    backend_config = config.backend
+    key = backend_config.model_dump_json()
+
+    with _backend_lock:
+        if _backend is None or key != _backend_key:
+            mock = MockBackend(backend_config.mock) if backend_config.name == "mock" else None
+            backend = mock or get_openai_backend(config)
+
+            if backend_config.cassette:
+                inner = backend
+                backend = CassetteBackend(
+                    path=_package_path(backend_config.cassette),
+                    mode=backend_config.cassette_mode,
+                    inner=inner,
+                    async_inner=lambda: inner.async_for_stage(None)
+                )
+
+            _backend, _backend_key = backend, key
+        return _backend
+
+
+def get_async_backend(config: AppConfig, stage: Optional[str] = None):
+    """
+    Async counterpart of `get_backend`, for the currently running event loop.
+
+    Args:
+        config (AppConfig): The application configuration.
+        stage (str | None): The stage sending the request, for per-stage settings.
+
+    Returns:
+        The async OpenAI client, or an object with the same `responses` interface.
+    """
+    return get_backend(config).async_for_stage(stage)
+
+
+# Event loop shared by all workers for async section generation, so that the
+# async client and its connection pool are reused across documents
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_async(coroutine: Awaitable[R]) -> R:
+    """
+    Run a coroutine on the process-wide event loop and wait for its result.
+
+    Used instead of `asyncio.run`, which would create a new event loop, and
+    with it a new async client and connection pool, for every document.
+    The telemetry labels of the calling thread apply inside the coroutine.
+
+    Args:
+        coroutine (Awaitable[R]): The coroutine to run.
+
+    Returns:
+        R: Its result.
+    """
+    labels = current_labels()
+
+    async def labelled() -> R:
+        with telemetry_context(**labels):
+            return await coroutine
+
+    future = asyncio.run_coroutine_threadsafe(labelled(), _shared_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
 
-# Create OpenAI chat client for interaction with models
-client = openai.OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-    base_url=os.environ.get("BASE_URL")
+
+# Response cache shared by all calls of the process, created on first use
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """
+    Return the process-wide LLM response cache configured in `config.yaml`.
+
+    Returns:
+        LLMCache: The response cache.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _open_cache(get_config().cache.mode)
+        return _cache
+
+
+def _open_cache(mode: str) -> LLMCache:
+    cache_config = get_config().cache
+    return LLMCache(
+        path=_package_path(cache_config.path),
+        mode=mode,
+        max_entries=cache_config.max_entries,
+        max_age_days=cache_config.max_age_days
+    )
+
+
+def set_cache_mode(mode: str) -> LLMCache:
+    """
+    Switch the process-wide LLM response cache to another mode.
+
+    Args:
+        mode (str): "read_through", "write_through" or "bypass".
+
+    Returns:
+        LLMCache: The new response cache.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or _cache.mode != mode:
+            _cache = _open_cache(mode)
+        return _cache
+
+
+class TruncatedResponseError(Exception):
+    """Raised when a response still stops at its output token limit after the configured recovery."""
+    pass
+
+
+class EmptyOutputError(ValueError):
+    """Raised when structured output was requested but none was returned."""
+    pass
+
+
+# Failures of an LLM call or of parsing its output. Fallbacks that generate
+# items one by one after a failed batch catch these, not programming errors.
+LLM_ERRORS = (
+    openai.OpenAIError,
+    RetryBudgetExceededError,
+    TruncatedResponseError,
+    EmptyOutputError,
+    CassetteMissError,
+    ValidationError,
 )
 
+
+def _is_truncated(response) -> bool:
+    """Whether a provider response stopped at its `max_output_tokens`."""
+    details = getattr(response, "incomplete_details", None)
+    return (
+        getattr(response, "status", None) == "incomplete"
+        and getattr(details, "reason", None) == "max_output_tokens"
+    )
+
+
+def _is_cut_off_json(error: ValidationError) -> bool:
+    """Whether structured output failed to parse because its JSON ends early."""
+    return any(
+        item["type"] == "json_invalid" and "EOF" in item["msg"]
+        for item in error.errors()
+    )
+
+
+def _reissue_budget(budget: int, reissues: int, truncation: TruncationConfig) -> int:
+    """
+    Output token budget of the next re-issue of a truncated structured request.
+
+    Args:
+        budget (int): Budget of the truncated request.
+        reissues (int): Re-issues made so far.
+        truncation (TruncationConfig): The `generation.truncation` configuration.
+
+    Returns:
+        int: The grown budget.
+
+    Raises:
+        TruncatedResponseError: If the re-issues are used up or the budget cannot grow.
+    """
+    grown = min(truncation.max_tokens, math.ceil(budget * truncation.growth))
+    if reissues >= truncation.max_reissues or grown <= budget:
+        raise TruncatedResponseError(
+            f"Structured output still truncated at max_tokens={budget} after {reissues} re-issues"
+        )
+    return grown
+
+
+def _record_usage(
+    model: str,
+    response,
+    latency_s: float,
+    retries: int = 0,
+    recovery: Optional[str] = None
+) -> LLMCallRecord:
+    """
+    Record token usage and latency of a provider response in the run telemetry.
+
+    Args:
+        model (str): Name of the LLM model.
+        response: The provider response object.
+        latency_s (float): Wall time of the request in seconds, including retries.
+        retries (int): Number of retried attempts.
+        recovery (str | None): "continuation" or "reissue" if the request
+            recovers an earlier truncated response.
+
+    Returns:
+        LLMCallRecord: The stored record.
+    """
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return get_telemetry().record(
+        model,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        latency_s=latency_s,
+        retries=retries,
+        truncated=_is_truncated(response),
+        recovery=recovery
+    )
+
+
+def _record_cut_off(
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    latency_s: float,
+    recovery: Optional[str] = None
+) -> LLMCallRecord:
+    """
+    Record a structured request whose output was cut off before it could be parsed.
+
+    The SDK raises instead of returning the response, so the usage is
+    estimated: the prompt tokens and the whole output budget.
+
+    Args:
+        model (str): Name of the LLM model.
+        prompt (str): The rendered prompt.
+        max_tokens (int): The output token budget of the request.
+        latency_s (float): Wall time of the request in seconds.
+        recovery (str | None): "reissue" if the request recovers an earlier truncated response.
+
+    Returns:
+        LLMCallRecord: The stored record.
+    """
+    return get_telemetry().record(
+        model,
+        input_tokens=estimate_tokens(prompt),
+        output_tokens=max_tokens,
+        latency_s=latency_s,
+        truncated=True,
+        recovery=recovery
+    )
+
+
 def call_llm(
     prompt: str,
     model: str,
     max_tokens: int,
     temperature: float = None,
     text_format: Optional[Type[T]] = None,
+    stream: bool = False,
+    on_usage: Optional[Callable[[LLMCallRecord], None]] = None,
+    cache_max_tokens: Optional[int] = None,
 ):
-    # DEBUG
-    # print(inspect.signature(client.responses.create))
+    """
+    Call the LLM, going through the response cache.
 
-    if text_format is None:
-        # Plain text generation (for sections)
-        response = client.responses.create(
-            model=model,
-            input=prompt,
-            temperature=temperature,
-            max_output_tokens=max_tokens
-        )
-        return response.output_text
+    Every call is recorded in the run telemetry, labelled with the
+    active `telemetry_context`.
+
+    A response that stops at `max_tokens` is recovered according to
+    `generation.truncation`: plain text is continued where it stopped,
+    structured output is requested again with a larger budget.
+
+    Args:
+        prompt (str): The rendered prompt.
+        model (str): Name of the LLM model to use.
+        max_tokens (int): Maximum number of output tokens.
+        temperature (float, optional): Sampling temperature.
+        text_format (Type[T], optional): Pydantic model for structured output.
+        stream (bool): Receive the response as a stream of events.
+        on_usage (Callable[[LLMCallRecord], None], optional): Called with the
+            telemetry record of every provider response, including truncated
+            ones (`record.truncated`); not called on a cache hit.
+        cache_max_tokens (int, optional): Output token limit used in the cache key
+            instead of `max_tokens`, for limits that change between runs, such as
+            learned section limits. The response is the same either way.
 
-    # Structured output generation (for tools and toc)
-    response = client.responses.parse(
+    Returns:
+        str | T: Plain output text, or the parsed structured output.
+
+    Raises:
+        EmptyOutputError: If structured output was requested but none was returned.
+        RetryBudgetExceededError: If transient provider errors persist past the retry budget.
+        TruncatedResponseError: If the response is still truncated after the configured recovery.
+    """
+    start = time.perf_counter()
+    requested = False
+
+    def request():
+        nonlocal requested
+        requested = True
+        return _request(prompt, model, max_tokens, temperature, text_format, stream, on_usage)
+
+    value = get_cache().get_or_call(
         model=model,
-        input=prompt,
+        prompt=prompt,
         temperature=temperature,
-        max_output_tokens=max_tokens,
-        text_format=text_format
+        max_tokens=cache_max_tokens if cache_max_tokens is not None else max_tokens,
+        text_format=text_format,
+        call=request
     )
 
-    # # Token usage testing
-    # usage = response.usage
-    # print("\nInput tokens:", usage.input_tokens)
-    # print("Output tokens:", usage.output_tokens)
-    # print("Total tokens:", usage.total_tokens)
-    # print("\n")
+    if not requested:
+        get_telemetry().record(model, cache_hit=True, latency_s=time.perf_counter() - start)
+
+    return value
+
+
+def _request_kwargs(
+    model: str,
+    text: str,
+    temperature: Optional[float],
+    budget: int,
+    text_format: Optional[Type[T]]
+) -> Dict:
+    """Arguments of a Responses API request, shared by `create`, `parse` and `stream`."""
+    kwargs = dict(model=model, input=text, temperature=temperature, max_output_tokens=budget)
+    if text_format is not None:
+        kwargs["text_format"] = text_format
+    return kwargs
+
+
+def _finish_attempt(
+    model: str,
+    text: str,
+    budget: int,
+    text_format: Optional[Type[T]],
+    start: float,
+    recovery: Optional[str],
+    on_usage: Optional[Callable[[LLMCallRecord], None]],
+    response=None,
+    retries: int = 0,
+    error: Optional[ValidationError] = None
+):
+    """
+    Record one provider request in the telemetry and pass the record to `on_usage`.
+
+    Args:
+        model (str): Name of the LLM model.
+        text (str): The prompt the request sent.
+        budget (int): The output token budget of the request.
+        text_format (Type[T] | None): Pydantic model of structured output, if any.
+        start (float): `time.perf_counter()` before the request.
+        recovery (str | None): "continuation" or "reissue" for recovery requests.
+        on_usage (Callable[[LLMCallRecord], None] | None): Observer of the record.
+        response: The provider response, if the request returned one.
+        retries (int): Number of retried attempts.
+        error (ValidationError | None): The parse error of structured output.
+
+    Returns:
+        The response, or None for structured output cut off mid-JSON.
+
+    Raises:
+        ValidationError: If `error` is not a cut off structured output.
+    """
+    latency_s = time.perf_counter() - start
+    if error is not None:
+        if text_format is None or not _is_cut_off_json(error):
+            raise error
+        record = _record_cut_off(model, text, budget, latency_s, recovery)
+    else:
+        record = _record_usage(model, response, latency_s, retries, recovery)
+    if on_usage is not None:
+        on_usage(record)
+    return response
+
+
+def _request_steps(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    text_format: Optional[Type[T]],
+    config: AppConfig
+) -> Generator[Tuple[str, int, Optional[str]], object, object]:
+    """
+    The provider requests of one LLM call, including the recovery of truncated responses.
+
+    Yields the (text, max_tokens, recovery) of every request and is sent its
+    response (None for structured output cut off mid-JSON), so the sync and
+    async clients share every decision and only send the requests.
+
+    Args:
+        prompt (str): The rendered prompt.
+        model (str): Name of the LLM model.
+        max_tokens (int): Output token budget of the first request.
+        text_format (Type[T] | None): Pydantic model for structured output.
+        config (AppConfig): The application configuration.
+
+    Returns:
+        str | T: Plain output text, or the parsed structured output.
+
+    Raises:
+        EmptyOutputError: If structured output was requested but none was returned.
+        TruncatedResponseError: If the response is still truncated after the configured recovery.
+    """
+    truncation = config.generation.truncation
+    response = yield prompt, max_tokens, None
 
     if text_format is not None:
+        budget, reissues = max_tokens, 0
+        while response is None or _is_truncated(response):
+            budget = _reissue_budget(budget, reissues, truncation)
+            reissues += 1
+            print(f"[Truncation] Structured output of {model} hit its limit, re-issuing with max_tokens={budget}")
+            response = yield prompt, budget, "reissue"
+
         if response.output_parsed is None:
-            raise ValueError("Expected structured output but got none")
+            raise EmptyOutputError("Expected structured output but got none")
         return response.output_parsed
 
-    return response.output_text
+    output_text = response.output_text
+    continuations = 0
+    continuation = get_prompt(config.prompts.continuation, "continuation")
+    while _is_truncated(response):
+        if continuations >= truncation.max_continuations:
+            raise TruncatedResponseError(
+                f"Output of {model} still truncated after {continuations} continuations"
+            )
+        continuations += 1
+        print(f"[Truncation] Output of {model} hit max_tokens={max_tokens}, continuing ({continuations})")
+        response = yield continuation.render(prompt=prompt, partial_output=output_text), max_tokens, "continuation"
+        output_text += response.output_text
+
+    return output_text
+
+
+def _request(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float = None,
+    text_format: Optional[Type[T]] = None,
+    stream: bool = False,
+    on_usage: Optional[Callable[[LLMCallRecord], None]] = None,
+):
+    # DEBUG
+    # print(inspect.signature(client.responses.create))
+
+    config = get_config()
+    backend = get_backend(config).for_stage(current_labels().get("stage"))
+    limiter = get_rate_limiter(config, model)
+    in_flight = get_in_flight_limiter(config)
+    policy = RetryPolicy.from_config(config)
+
+    def send(text: str, budget: int):
+        if limiter is not None:
+            limiter.acquire(estimate_tokens(text) + budget)
+
+        kwargs = _request_kwargs(model, text, temperature, budget, text_format)
+        with in_flight.slot():
+            if stream:
+                with backend.responses.stream(**kwargs) as response_stream:
+                    return response_stream.get_final_response()
+            if text_format is None:
+                # Plain text generation
+                return backend.responses.create(**kwargs)
+            # Structured output generation (for tools, TOCs and sections)
+            return backend.responses.parse(**kwargs)
+
+    def attempt(text: str, budget: int, recovery: Optional[str]):
+        start = time.perf_counter()
+        try:
+            response, retries = call_with_retries(
+                lambda: send(text, budget), policy, f"LLM call to {model}"
+            )
+        except ValidationError as e:
+            return _finish_attempt(model, text, budget, text_format, start, recovery, on_usage, error=e)
+        return _finish_attempt(model, text, budget, text_format, start, recovery, on_usage, response, retries)
+
+    steps = _request_steps(prompt, model, max_tokens, text_format, config)
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(attempt(*step))
+    except StopIteration as done:
+        return done.value
+
+
+async def call_llm_async(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float = None,
+    text_format: Optional[Type[T]] = None,
+    stream: bool = False,
+    on_usage: Optional[Callable[[LLMCallRecord], None]] = None,
+    cache_max_tokens: Optional[int] = None,
+):
+    """
+    Async counterpart of `call_llm`, used by the concurrent section engine.
+
+    Args:
+        prompt (str): The rendered prompt.
+        model (str): Name of the LLM model to use.
+        max_tokens (int): Maximum number of output tokens.
+        temperature (float, optional): Sampling temperature.
+        text_format (Type[T], optional): Pydantic model for structured output.
+        stream (bool): Receive the response as a stream of events.
+        on_usage (Callable[[LLMCallRecord], None], optional): Called with the
+            telemetry record of every provider response, including truncated
+            ones (`record.truncated`); not called on a cache hit.
+        cache_max_tokens (int, optional): Output token limit used in the cache key
+            instead of `max_tokens`, for limits that change between runs, such as
+            learned section limits. The response is the same either way.
+
+    Returns:
+        str | T: Plain output text, or the parsed structured output.
+
+    Raises:
+        EmptyOutputError: If structured output was requested but none was returned.
+        RetryBudgetExceededError: If transient provider errors persist past the retry budget.
+        TruncatedResponseError: If the response is still truncated after the configured recovery.
+    """
+    start = time.perf_counter()
+    requested = False
+
+    async def request():
+        nonlocal requested
+        requested = True
+        return await _request_async(prompt, model, max_tokens, temperature, text_format, stream, on_usage)
+
+    value = await get_cache().get_or_call_async(
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=cache_max_tokens if cache_max_tokens is not None else max_tokens,
+        text_format=text_format,
+        call=request
+    )
+
+    if not requested:
+        get_telemetry().record(model, cache_hit=True, latency_s=time.perf_counter() - start)
+
+    return value
+
+
+async def _request_async(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float = None,
+    text_format: Optional[Type[T]] = None,
+    stream: bool = False,
+    on_usage: Optional[Callable[[LLMCallRecord], None]] = None,
+):
+    config = get_config()
+    async_client = get_async_backend(config, current_labels().get("stage"))
+    limiter = get_rate_limiter(config, model)
+    in_flight = get_in_flight_limiter(config)
+    policy = RetryPolicy.from_config(config)
+
+    async def send(text: str, budget: int):
+        if limiter is not None:
+            await limiter.acquire_async(estimate_tokens(text) + budget)
+
+        kwargs = _request_kwargs(model, text, temperature, budget, text_format)
+        async with in_flight.slot_async():
+            if stream:
+                async with async_client.responses.stream(**kwargs) as response_stream:
+                    return await response_stream.get_final_response()
+            if text_format is None:
+                return await async_client.responses.create(**kwargs)
+            return await async_client.responses.parse(**kwargs)
+
+    async def attempt(text: str, budget: int, recovery: Optional[str]):
+        start = time.perf_counter()
+        try:
+            response, retries = await call_with_retries_async(
+                lambda: send(text, budget), policy, f"LLM call to {model}"
+            )
+        except ValidationError as e:
+            return _finish_attempt(model, text, budget, text_format, start, recovery, on_usage, error=e)
+        return _finish_attempt(model, text, budget, text_format, start, recovery, on_usage, response, retries)
 
+    steps = _request_steps(prompt, model, max_tokens, text_format, config)
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(await attempt(*step))
+    except StopIteration as done:
+        return done.value
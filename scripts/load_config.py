@@ -1,12 +1,27 @@
+import os
 import yaml
 from pathlib import Path
 from software_whitelisting_assistant.config import AppConfig
 
 
+def config_path() -> Path:
+    """
+    Return the path of the configuration file.
+
+    Returns:
+        Path: `config/config.yaml`, unless the `CONFIG_PATH` environment
+            variable points to another file.
+    """
+    return Path(os.environ.get("CONFIG_PATH") or Path(__file__).parent.parent / "config" / "config.yaml")
+
+
 def load_configuration() -> AppConfig:
     """
     Load application configuration from a YAML file and validate it.
 
+    Reads the file on every call; use `registry.get_config` for the
+    configuration shared by the process.
+
     Returns:
         AppConfig: The validated application configuration.
 
@@ -15,7 +30,7 @@ def load_configuration() -> AppConfig:
         ValueError: If the file is not a `.yaml` or `.yml` file.
     """
     
-    path = Path(__file__).parent.parent / "config" / "config.yaml"
+    path = config_path()
 
     if not path.exists():
         raise FileNotFoundError(f"Config file not found: {path}")
@@ -0,0 +1,282 @@
+import hashlib
+import string
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Tuple
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts.artifacts_store import PROMPTS_DIR, load_prompt
+from software_whitelisting_assistant.scripts.load_config import config_path, load_configuration
+
+
+# Placeholders each stage passes to `str.format` when rendering its prompt.
+# The tool prompt is sent as is, so its braces are not placeholders.
+STAGE_FIELDS: Dict[str, Optional[FrozenSet[str]]] = {
+    "tool": None,
+    "toc": frozenset({"document_type", "tool_name", "purpose", "category", "user_base"}),
+    "section": frozenset({
+        "tool_name", "purpose", "document_type", "section_title",
+        "parent_title", "previous_sections", "issue_instruction",
+    }),
+    "tool_batch": frozenset({"count"}),
+    "toc_batch": frozenset({"document_types", "tool_name", "purpose", "category", "user_base"}),
+    "section_batch": frozenset({
+        "tool_name", "purpose", "document_type", "parent_title", "previous_sections", "sections",
+    }),
+    "continuation": frozenset({"prompt", "partial_output"}),
+    "issue_repair": frozenset({"document_type", "section_title", "issue_type", "content"}),
+}
+
+
+class PromptTemplateError(ValueError):
+    """Raised when a prompt template does not fit the stage it is used for."""
+    pass
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt template parsed once, with the placeholders it references.
+
+    The content hash identifies the exact template text and is stable across
+    processes, so it can be used in cache keys and metadata.
+    """
+    name: str
+    stage: str
+    text: str
+    fields: FrozenSet[str]
+    content_hash: str
+    mtime: float
+
+    @classmethod
+    def parse(cls, name: str, stage: str) -> "PromptTemplate":
+        """
+        Load a template and check its placeholders against the fields of a stage.
+
+        Args:
+            name (str): File name of the template in PROMPTS_DIR.
+            stage (str): The stage using the template (tool, toc, section or a batched variant).
+
+        Returns:
+            PromptTemplate: The parsed template.
+
+        Raises:
+            PromptTemplateError: If the template references a placeholder
+                the stage does not supply, or is not a valid format string.
+        """
+        if stage not in STAGE_FIELDS:
+            raise ValueError(f"Unknown prompt stage '{stage}', expected one of {tuple(STAGE_FIELDS)}")
+
+        path = PROMPTS_DIR / name
+        mtime = path.stat().st_mtime if path.exists() else 0.0
+        text = load_prompt(name)
+        supplied = STAGE_FIELDS[stage]
+
+        fields: FrozenSet[str] = frozenset()
+        if supplied is not None:
+            try:
+                fields = frozenset(
+                    field_name.split(".")[0].split("[")[0]
+                    for _, field_name, _, _ in string.Formatter().parse(text)
+                    if field_name is not None
+                )
+            except ValueError as e:
+                raise PromptTemplateError(f"Prompt '{name}' is not a valid template: {e}") from e
+
+            unknown = fields - supplied
+            if unknown:
+                raise PromptTemplateError(
+                    f"Prompt '{name}' references {sorted(unknown)}, which the {stage} stage "
+                    f"does not supply (available: {sorted(supplied)})"
+                )
+
+        return cls(
+            name=name,
+            stage=stage,
+            text=text,
+            fields=fields,
+            content_hash=hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+            mtime=mtime
+        )
+
+    def render(self, **values: str) -> str:
+        """
+        Fill the placeholders of the template.
+
+        Args:
+            **values: Values of the fields supplied by the stage.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        if not self.fields:
+            return self.text
+        return self.text.format(**values)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    config: AppConfig
+    config_mtime: float
+    prompts: Mapping[Tuple[str, str], PromptTemplate]
+
+
+class Registry:
+    """
+    Process-wide, read-only view of the configuration and prompt templates.
+
+    The configuration is read and validated once, and the configured prompts
+    are parsed and checked when the registry is created, so template errors
+    surface before any LLM call. Other templates are parsed on first use.
+
+    With `registry.hot_reload` enabled, the modification times of the config
+    file and of a requested prompt are checked on every access, and changed
+    files are reloaded. Updates replace the whole snapshot, so readers never
+    see a partially reloaded state.
+
+    A pinned configuration, e.g. the snapshot of a resumed run, is served
+    instead of the config file and is never reloaded.
+    """
+
+    def __init__(self, path: Path):
+        self.config_path = path
+        self._lock = threading.Lock()
+        self._pinned = False
+        self._snapshot = self._load_config()
+        for stage in STAGE_FIELDS:
+            self.prompt(getattr(self._snapshot.config.prompts, stage), stage)
+
+    def _load_config(self, prompts: Mapping[Tuple[str, str], PromptTemplate] = MappingProxyType({})) -> _Snapshot:
+        return _Snapshot(
+            config=load_configuration(),
+            config_mtime=self.config_path.stat().st_mtime,
+            prompts=prompts
+        )
+
+    @property
+    def config(self) -> AppConfig:
+        """The validated application configuration."""
+        snapshot = self._snapshot
+        if (
+            snapshot.config.registry.hot_reload
+            and not self._pinned
+            and self.config_path.stat().st_mtime != snapshot.config_mtime
+        ):
+            with self._lock:
+                if self.config_path.stat().st_mtime != self._snapshot.config_mtime:
+                    print(f"[Info] Reloading configuration from {self.config_path}")
+                    self._snapshot = self._load_config(self._snapshot.prompts)
+                snapshot = self._snapshot
+        return snapshot.config
+
+    def pin(self, config: AppConfig) -> None:
+        """
+        Serve a configuration instead of the config file.
+
+        Args:
+            config (AppConfig): The configuration, e.g. the snapshot of a resumed run.
+
+        Raises:
+            PromptTemplateError: If a prompt of the configuration does not fit its stage.
+        """
+        with self._lock:
+            self._snapshot = _Snapshot(
+                config=config,
+                config_mtime=self._snapshot.config_mtime,
+                prompts=self._snapshot.prompts
+            )
+            self._pinned = True
+        for stage in STAGE_FIELDS:
+            self.prompt(getattr(config.prompts, stage), stage)
+
+    def prompt(self, name: str, stage: str) -> PromptTemplate:
+        """
+        Return a parsed prompt template, checked against the fields of a stage.
+
+        Args:
+            name (str): File name of the template in PROMPTS_DIR.
+            stage (str): The stage using the template (tool, toc, section or a batched variant).
+
+        Returns:
+            PromptTemplate: The parsed template.
+
+        Raises:
+            PromptTemplateError: If the template does not fit the stage.
+        """
+        snapshot = self._snapshot
+        template = snapshot.prompts.get((name, stage))
+
+        if template is not None and snapshot.config.registry.hot_reload:
+            path = PROMPTS_DIR / name
+            if path.exists() and path.stat().st_mtime != template.mtime:
+                print(f"[Info] Reloading prompt {name}")
+                template = None
+
+        if template is None:
+            template = PromptTemplate.parse(name, stage)
+            with self._lock:
+                prompts = dict(self._snapshot.prompts)
+                prompts[(name, stage)] = template
+                self._snapshot = _Snapshot(
+                    config=self._snapshot.config,
+                    config_mtime=self._snapshot.config_mtime,
+                    prompts=MappingProxyType(prompts)
+                )
+
+        return template
+
+
+_registry: Registry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """
+    Return the registry of the configuration file currently in use.
+
+    Returns:
+        Registry: The registry, created on first use or when `CONFIG_PATH` changes.
+    """
+    global _registry
+    path = config_path()
+    registry = _registry
+    if registry is not None and registry.config_path == path:
+        return registry
+
+    with _registry_lock:
+        if _registry is None or _registry.config_path != path:
+            _registry = Registry(path)
+        return _registry
+
+
+def get_config() -> AppConfig:
+    """Return the application configuration held by the registry."""
+    return get_registry().config
+
+
+def use_config(config: AppConfig) -> None:
+    """
+    Make every `get_config` call of the process return `config`.
+
+    Used by resumed runs and queue workers, so that all stages use the
+    configuration snapshot of the run instead of the current config file.
+
+    Args:
+        config (AppConfig): The configuration to serve.
+    """
+    get_registry().pin(config)
+
+
+def get_prompt(name: str, stage: str) -> PromptTemplate:
+    """
+    Return a prompt template held by the registry.
+
+    Args:
+        name (str): File name of the template in PROMPTS_DIR.
+        stage (str): The stage using the template (tool, toc, section or a batched variant).
+
+    Returns:
+        PromptTemplate: The parsed template.
+    """
+    return get_registry().prompt(name, stage)
@@ -0,0 +1,401 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple
+import openai
+from software_whitelisting_assistant.config import AppConfig
+
+
+class RetryBudgetExceededError(Exception):
+    """Raised when an operation still fails after its retry budget is used up."""
+
+    def __init__(self, message: str, attempts: int, last_error: Optional[BaseException] = None):
+        super().__init__(message)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+# Jitter uses its own generator so retries never shift the seeded global `random`
+_jitter = random.Random()
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Bounded exponential backoff with jitter.
+
+    The n-th retry waits `base_delay * 2 ** (n - 1)` seconds, capped at `max_delay`
+    and stretched by a random factor of up to `jitter`. A `Retry-After` sent by the
+    provider takes precedence over the computed delay.
+    """
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    jitter: float = 0.5
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "RetryPolicy":
+        return cls(
+            max_attempts=config.retry.max_attempts,
+            base_delay=config.retry.base_delay,
+            max_delay=config.retry.max_delay,
+            jitter=config.retry.jitter
+        )
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Compute the wait before the next attempt.
+
+        Args:
+            attempt (int): Number of the attempt that just failed (starting at 1).
+            retry_after (float | None): Delay requested by the provider, if any.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 + _jitter.uniform(0, self.jitter))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a provider error is transient (throttling, timeout, 5xx).
+
+    Args:
+        error (BaseException): The raised error.
+
+    Returns:
+        bool: True if the request should be retried.
+    """
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Read the `Retry-After` (or `retry-after-ms`) header of a provider error.
+
+    Args:
+        error (BaseException): The raised error.
+
+    Returns:
+        float | None: Requested delay in seconds, or None if not present.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _TokenBucket:
+    """
+    Bucket refilled continuously at `per_minute / 60` units per second.
+
+    Reservations may drive the level negative; the caller then waits until
+    the deficit has been refilled, which keeps waiting callers in order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """
+    Per-model limiter for requests per minute (RPM) and tokens per minute (TPM).
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self._requests = _TokenBucket(rpm) if rpm else None
+        self._tokens = _TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens))
+            return wait
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until a request of `tokens` estimated tokens may be sent.
+
+        Args:
+            tokens (int): Estimated input plus maximum output tokens.
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int) -> None:
+        """
+        Async counterpart of `acquire`.
+
+        Args:
+            tokens (int): Estimated input plus maximum output tokens.
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(config: AppConfig, model: str) -> Optional[RateLimiter]:
+    """
+    Return the shared rate limiter of a model, if limits are configured for it.
+
+    Args:
+        config (AppConfig): The application configuration.
+        model (str): Name of the LLM model.
+
+    Returns:
+        RateLimiter | None: The limiter, or None if the model is unlimited.
+    """
+    limits = config.rate_limits.get(model)
+    if limits is None or not (limits.rpm or limits.tpm):
+        return None
+
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = RateLimiter(rpm=limits.rpm, tpm=limits.tpm)
+            _limiters[model] = limiter
+        return limiter
+
+
+class _Waiter:
+    """A caller waiting for an in-flight slot; `granted` once a released slot is handed to it."""
+
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+
+class InFlightLimiter:
+    """
+    Process-wide limit on the LLM requests in flight at once.
+
+    Shared by the worker threads of `call_llm` and the tasks of
+    `call_llm_async` on the shared event loop, so the requests of all
+    concurrent documents and sections stay within one limit. A released
+    slot is handed to the longest waiting caller, whichever side it is on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def _take(self) -> bool:
+        # called with the lock held
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        with self._lock:
+            if self._take():
+                return
+            event = threading.Event()
+            self._waiters.append(_Waiter(event.set))
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        """Async counterpart of `acquire`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve() -> None:
+            if not future.done():
+                future.set_result(None)
+
+        with self._lock:
+            if self._take():
+                return
+            waiter = _Waiter(lambda: loop.call_soon_threadsafe(resolve))
+            self._waiters.append(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                # the slot was handed over before the cancellation arrived
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it to the longest waiting caller."""
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of a request."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        """Async counterpart of `slot`."""
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_in_flight_limiter: Optional[InFlightLimiter] = None
+_in_flight_lock = threading.Lock()
+
+
+def get_in_flight_limiter(config: AppConfig) -> InFlightLimiter:
+    """
+    Return the process-wide in-flight limiter.
+
+    The limit is `concurrency.max_in_flight`, or the connection pool size
+    (`backend.http.max_connections`) if it is not set. A changed limit
+    (after a config reload) takes effect for new requests.
+
+    Args:
+        config (AppConfig): The application configuration.
+
+    Returns:
+        InFlightLimiter: The shared limiter.
+    """
+    global _in_flight_limiter
+    limit = config.concurrency.max_in_flight or config.backend.http.max_connections
+    with _in_flight_lock:
+        if _in_flight_limiter is None or _in_flight_limiter.limit != limit:
+            _in_flight_limiter = InFlightLimiter(limit)
+        return _in_flight_limiter
+
+
+def call_with_retries(
+    call: Callable[[], Any],
+    policy: RetryPolicy,
+    description: str
+) -> Tuple[Any, int]:
+    """
+    Run a provider call, retrying transient errors according to the policy.
+
+    Args:
+        call (Callable[[], Any]): The provider call.
+        policy (RetryPolicy): The retry policy.
+        description (str): What is being called, used in error messages.
+
+    Returns:
+        Tuple[Any, int]: The call result and the number of retries it took.
+
+    Raises:
+        RetryBudgetExceededError: If the call still fails after `max_attempts`.
+    """
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            return call(), attempt - 1
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if attempt == policy.max_attempts:
+                raise RetryBudgetExceededError(
+                    f"{description} failed after {attempt} attempts: {e}", attempt, e
+                ) from e
+            delay = policy.delay(attempt, retry_after_seconds(e))
+            print(f"[Retry] {description}: {type(e).__name__}, retrying in {delay:.1f}s "
+                  f"({attempt}/{policy.max_attempts})")
+            time.sleep(delay)
+
+
+async def call_with_retries_async(
+    call: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    description: str
+) -> Tuple[Any, int]:
+    """
+    Async counterpart of `call_with_retries`.
+
+    Args:
+        call (Callable[[], Awaitable[Any]]): The provider call.
+        policy (RetryPolicy): The retry policy.
+        description (str): What is being called, used in error messages.
+
+    Returns:
+        Tuple[Any, int]: The call result and the number of retries it took.
+
+    Raises:
+        RetryBudgetExceededError: If the call still fails after `max_attempts`.
+    """
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            return await call(), attempt - 1
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if attempt == policy.max_attempts:
+                raise RetryBudgetExceededError(
+                    f"{description} failed after {attempt} attempts: {e}", attempt, e
+                ) from e
+            delay = policy.delay(attempt, retry_after_seconds(e))
+            print(f"[Retry] {description}: {type(e).__name__}, retrying in {delay:.1f}s "
+                  f"({attempt}/{policy.max_attempts})")
+            await asyncio.sleep(delay)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import random
+from typing import List, Tuple, Union
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+class SeedTree:
+    """
+    Deterministic seeds derived hierarchically from `config.seed`.
+
+    Every node is identified by the path of names leading to it from the run
+    seed, and its seed is a hash of that path. The choices made for a node
+    depend only on the run seed and its own path, not on anything generated
+    before it, so documents can be generated in any order, concurrently, on
+    other machines, or regenerated alone, and still make the same choices.
+
+    The pipeline uses the nodes:
+    - plan/<tool index>: document types of a tool
+    - tool/<tool>/document/<document type>: issue plan of a document
+    - tool/<tool>/document/<document type>/section/<section id>: choices within a section
+    """
+
+    def __init__(self, seed: int, path: Tuple[str, ...] = ()):
+        self.root_seed = seed
+        self.path = path
+
+    def child(self, *names: Union[str, int]) -> "SeedTree":
+        """
+        Return the node below this one.
+
+        Args:
+            *names: Names of the path steps, e.g. ("section", "intro").
+
+        Returns:
+            SeedTree: The child node.
+        """
+        return SeedTree(self.root_seed, self.path + tuple(str(name) for name in names))
+
+    def document(self, tool_name: str, document_type: str) -> "SeedTree":
+        """
+        Return the node of a document.
+
+        Args:
+            tool_name (str): Name of the tool.
+            document_type (str): Type of the document.
+
+        Returns:
+            SeedTree: The node, keyed on the normalized tool name and document type.
+        """
+        return self.child("tool", normalize_name(tool_name), "document", normalize_name(document_type))
+
+    @property
+    def seed(self) -> int:
+        digest = hashlib.blake2b(
+            json.dumps([self.root_seed, *self.path]).encode("utf-8"), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+    def rng(self) -> random.Random:
+        """Return a new random generator seeded with the seed of this node."""
+        return random.Random(self.seed)
+
+    def __repr__(self) -> str:
+        return f"SeedTree({self.root_seed}, {'/'.join(self.path) or '<run>'})"
+
+
+def plan_document_types(seeds: SeedTree, document_types: List[str], per_tool: int, tool_count: int) -> List[List[str]]:
+    """
+    Pick the distinct document types of every tool of a run.
+
+    Args:
+        seeds (SeedTree): Seed tree of the run.
+        document_types (List[str]): The configured document types.
+        per_tool (int): Number of document types per tool.
+        tool_count (int): Number of tools.
+
+    Returns:
+        List[List[str]]: Document types per tool index.
+    """
+    return [
+        seeds.child("plan", i).rng().sample(document_types, k=per_tool)
+        for i in range(tool_count)
+    ]
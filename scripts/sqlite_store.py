@@ -0,0 +1,439 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from software_whitelisting_assistant.scripts.classes import Tool, TOC, Section
+
+
+# Document columns holding each artifact
+DOCUMENT_COLUMNS = ("toc", "html", "sections", "metadata")
+
+
+@dataclass(frozen=True)
+class StoredDocument:
+    """A document read from the store. Artifacts that were never saved are None."""
+    tool_key: str
+    document_name: str
+    document_type: Optional[str]
+    toc: Optional[TOC]
+    html: Optional[str]
+    sections: Optional[List[Section]]
+    metadata: Optional[Dict[str, Any]]
+
+
+class SQLiteArtifactStore:
+    """
+    Generated tools and documents in a single SQLite database.
+
+    Holds the same artifacts as the `data/<tool>/` directory layout: one row
+    per tool, and one row per document with its TOC, HTML, sections and
+    metadata. Tools are keyed by their folder name, documents by tool and
+    normalized document type.
+
+    Every save commits on its own, unless it runs inside `transaction()`,
+    which commits all saves of the block at once. Iterators read through
+    their own connection and stream rows in batches, so they can run while
+    documents are being written.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tools (
+                tool_key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tools_category ON tools (category);
+
+            CREATE TABLE IF NOT EXISTS documents (
+                tool_key TEXT NOT NULL,
+                document_name TEXT NOT NULL,
+                document_type TEXT,
+                toc TEXT,
+                html TEXT,
+                sections TEXT,
+                metadata TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (tool_key, document_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_name ON documents (document_name);
+            CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (document_type);
+            """
+        )
+        self._conn.commit()
+
+    @contextmanager
+    def transaction(self) -> Iterator["SQLiteArtifactStore"]:
+        """
+        Commit all saves made inside the block in one transaction.
+
+        Other threads wait while a transaction is open. An exception rolls
+        back the whole block. Transactions can be nested; the outermost one commits.
+        """
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._depth == 1:
+                    self._conn.rollback()
+                raise
+            else:
+                if self._depth == 1:
+                    self._conn.commit()
+            finally:
+                self._depth -= 1
+
+    def _execute(self, sql: str, parameters: Tuple) -> None:
+        with self._lock:
+            self._conn.execute(sql, parameters)
+            if self._depth == 0:
+                self._conn.commit()
+
+    def _fetch(self, sql: str, parameters: Tuple) -> Optional[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchone()
+
+    # -----------------------------
+    # Tools
+    # -----------------------------
+    def save_tool(self, tool_key: str, tool: Tool) -> None:
+        """
+        Save (or replace) a tool.
+
+        Args:
+            tool_key (str): Folder name of the tool.
+            tool (Tool): The tool.
+        """
+        self._execute(
+            """
+            INSERT INTO tools (tool_key, name, category, payload, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (tool_key) DO UPDATE SET
+                name = excluded.name, category = excluded.category,
+                payload = excluded.payload, updated_at = excluded.updated_at
+            """,
+            (tool_key, tool.name, tool.category, tool.model_dump_json(), time.time())
+        )
+
+    def load_tool(self, tool_key: str) -> Tool:
+        """
+        Load a tool.
+
+        Args:
+            tool_key (str): Folder name of the tool.
+
+        Returns:
+            Tool: The loaded tool.
+
+        Raises:
+            FileNotFoundError: If the tool is not in the store.
+        """
+        row = self._fetch("SELECT payload FROM tools WHERE tool_key = ?", (tool_key,))
+        if row is None:
+            raise FileNotFoundError(f"Tool not found: {tool_key} in {self.path}")
+        return Tool.model_validate_json(row[0])
+
+    # -----------------------------
+    # Documents
+    # -----------------------------
+    def _save_document_column(
+        self,
+        tool_key: str,
+        document_name: str,
+        column: str,
+        value: str,
+        document_type: Optional[str] = None
+    ) -> None:
+        if column not in DOCUMENT_COLUMNS:
+            raise ValueError(f"Unknown document column '{column}'")
+        self._execute(
+            f"""
+            INSERT INTO documents (tool_key, document_name, document_type, {column}, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (tool_key, document_name) DO UPDATE SET
+                {column} = excluded.{column},
+                document_type = COALESCE(excluded.document_type, documents.document_type),
+                updated_at = excluded.updated_at
+            """,
+            (tool_key, document_name, document_type, value, time.time())
+        )
+
+    def _load_document_column(self, tool_key: str, document_name: str, column: str) -> str:
+        if column not in DOCUMENT_COLUMNS:
+            raise ValueError(f"Unknown document column '{column}'")
+        row = self._fetch(
+            f"SELECT {column} FROM documents WHERE tool_key = ? AND document_name = ?",
+            (tool_key, document_name)
+        )
+        if row is None or row[0] is None:
+            raise FileNotFoundError(f"No {column} for {tool_key}/{document_name} in {self.path}")
+        return row[0]
+
+    def save_toc(self, tool_key: str, document_name: str, toc: TOC) -> None:
+        self._save_document_column(tool_key, document_name, "toc", toc.model_dump_json())
+
+    def load_toc(self, tool_key: str, document_name: str) -> TOC:
+        return TOC.model_validate_json(self._load_document_column(tool_key, document_name, "toc"))
+
+    def save_html(self, tool_key: str, document_name: str, html: str) -> None:
+        self._save_document_column(tool_key, document_name, "html", html)
+
+    def load_html(self, tool_key: str, document_name: str) -> str:
+        return self._load_document_column(tool_key, document_name, "html")
+
+    def save_sections(self, tool_key: str, document_name: str, sections: List[Section]) -> None:
+        self._save_document_column(
+            tool_key, document_name, "sections",
+            json.dumps([section.model_dump(mode="json") for section in sections])
+        )
+
+    def load_sections(self, tool_key: str, document_name: str) -> List[Section]:
+        raw = json.loads(self._load_document_column(tool_key, document_name, "sections"))
+        return [Section.model_validate(section) for section in raw]
+
+    def save_metadata(self, tool_key: str, document_name: str, metadata: Dict[str, Any]) -> None:
+        self._save_document_column(
+            tool_key, document_name, "metadata", json.dumps(metadata),
+            document_type=metadata.get("document", {}).get("type")
+        )
+
+    def load_metadata(self, tool_key: str, document_name: str) -> Dict[str, Any]:
+        return json.loads(self._load_document_column(tool_key, document_name, "metadata"))
+
+    # -----------------------------
+    # Streaming
+    # -----------------------------
+    def _iterate(self, sql: str, parameters: Tuple, batch_size: int) -> Iterator[Tuple]:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(sql, parameters)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            conn.close()
+
+    def iter_tools(self, batch_size: int = 500) -> Iterator[Tuple[str, Tool]]:
+        """
+        Stream all tools, ordered by key.
+
+        Yields:
+            Tuple[str, Tool]: The tool key and the tool.
+        """
+        for tool_key, payload in self._iterate(
+            "SELECT tool_key, payload FROM tools ORDER BY tool_key", (), batch_size
+        ):
+            yield tool_key, Tool.model_validate_json(payload)
+
+    def iter_documents(
+        self,
+        tool_key: Optional[str] = None,
+        document_type: Optional[str] = None,
+        *,
+        with_html: bool = True,
+        batch_size: int = 100
+    ) -> Iterator[StoredDocument]:
+        """
+        Stream documents, ordered by tool and document name.
+
+        Args:
+            tool_key (str | None): Only documents of this tool.
+            document_type (str | None): Only documents of this type.
+            with_html (bool): Also read the HTML (the largest column).
+            batch_size (int): Rows fetched at a time.
+
+        Yields:
+            StoredDocument: The documents.
+        """
+        conditions, parameters = [], []
+        if tool_key is not None:
+            conditions.append("tool_key = ?")
+            parameters.append(tool_key)
+        if document_type is not None:
+            conditions.append("document_type = ?")
+            parameters.append(document_type)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        html_column = "html" if with_html else "NULL"
+
+        for key, name, doc_type, toc, html, sections, metadata in self._iterate(
+            f"""
+            SELECT tool_key, document_name, document_type, toc, {html_column}, sections, metadata
+            FROM documents {where} ORDER BY tool_key, document_name
+            """,
+            tuple(parameters),
+            batch_size
+        ):
+            yield StoredDocument(
+                tool_key=key,
+                document_name=name,
+                document_type=doc_type,
+                toc=TOC.model_validate_json(toc) if toc else None,
+                html=html,
+                sections=[Section.model_validate(s) for s in json.loads(sections)] if sections else None,
+                metadata=json.loads(metadata) if metadata else None
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Stores opened by the process, one per database file
+_stores: Dict[Path, SQLiteArtifactStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path: Path) -> SQLiteArtifactStore:
+    """
+    Return the process-wide store of a database file, opening it on first use.
+
+    Args:
+        path (Path): Path of the SQLite database.
+
+    Returns:
+        SQLiteArtifactStore: The store.
+    """
+    path = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SQLiteArtifactStore(path)
+        return store
+
+
+# -----------------------------
+# Conversion from / to the directory layout
+# -----------------------------
+def import_directory(data_dir: Path, store: SQLiteArtifactStore) -> Dict[str, int]:
+    """
+    Copy a `data/<tool>/` directory tree into the store, one transaction per tool.
+
+    Args:
+        data_dir (Path): Root folder of the dataset.
+        store (SQLiteArtifactStore): The target store.
+
+    Returns:
+        Dict[str, int]: Number of imported tools and documents.
+    """
+    tools = documents = 0
+    for tool_dir in sorted(path for path in Path(data_dir).iterdir() if path.is_dir()):
+        tool_key = tool_dir.name
+        tool_path = tool_dir / f"{tool_key}.json"
+        if not tool_path.exists():
+            continue
+
+        with store.transaction():
+            store.save_tool(tool_key, Tool.model_validate_json(tool_path.read_text(encoding="utf-8")))
+            tools += 1
+
+            for toc_path in sorted(tool_dir.glob("toc_*.json")):
+                document_name = toc_path.stem[len("toc_"):]
+                store.save_toc(tool_key, document_name, TOC.model_validate_json(toc_path.read_text(encoding="utf-8")))
+                documents += 1
+
+                html_path = tool_dir / f"{document_name}.html"
+                if html_path.exists():
+                    store.save_html(tool_key, document_name, html_path.read_text(encoding="utf-8"))
+
+                sections_path = tool_dir / f"sections_{document_name}.json"
+                if sections_path.exists():
+                    store.save_sections(tool_key, document_name, [
+                        Section.model_validate(raw)
+                        for raw in json.loads(sections_path.read_text(encoding="utf-8"))
+                    ])
+
+                metadata_path = tool_dir / f"{document_name}_metadata.json"
+                if metadata_path.exists():
+                    store.save_metadata(tool_key, document_name, json.loads(metadata_path.read_text(encoding="utf-8")))
+
+    return {"tools": tools, "documents": documents}
+
+
+def export_directory(store: SQLiteArtifactStore, data_dir: Path) -> Dict[str, int]:
+    """
+    Write the contents of the store as a `data/<tool>/` directory tree.
+
+    Args:
+        store (SQLiteArtifactStore): The source store.
+        data_dir (Path): Root folder of the dataset.
+
+    Returns:
+        Dict[str, int]: Number of exported tools and documents.
+    """
+    tools = documents = 0
+    for tool_key, tool in store.iter_tools():
+        tool_dir = Path(data_dir) / tool_key
+        tool_dir.mkdir(parents=True, exist_ok=True)
+        (tool_dir / f"{tool_key}.json").write_text(tool.model_dump_json(indent=2), encoding="utf-8")
+        tools += 1
+
+    for document in store.iter_documents():
+        tool_dir = Path(data_dir) / document.tool_key
+        tool_dir.mkdir(parents=True, exist_ok=True)
+        name = document.document_name
+        documents += 1
+
+        if document.toc is not None:
+            (tool_dir / f"toc_{name}.json").write_text(document.toc.model_dump_json(indent=2), encoding="utf-8")
+        if document.html is not None:
+            (tool_dir / f"{name}.html").write_text(document.html, encoding="utf-8")
+        if document.sections is not None:
+            (tool_dir / f"sections_{name}.json").write_text(
+                json.dumps([section.model_dump(mode="json") for section in document.sections], indent=2),
+                encoding="utf-8"
+            )
+        if document.metadata is not None:
+            (tool_dir / f"{name}_metadata.json").write_text(json.dumps(document.metadata, indent=2), encoding="utf-8")
+
+    return {"tools": tools, "documents": documents}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert a generated dataset between the directory layout and a SQLite store."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    to_sqlite = subparsers.add_parser("import", help="Copy a data/<tool>/ tree into a SQLite store")
+    to_sqlite.add_argument("data_dir", type=Path)
+    to_sqlite.add_argument("store", type=Path)
+
+    to_files = subparsers.add_parser("export", help="Write a SQLite store as a data/<tool>/ tree")
+    to_files.add_argument("store", type=Path)
+    to_files.add_argument("data_dir", type=Path)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    store = open_store(args.store)
+
+    if args.command == "import":
+        counts = import_directory(args.data_dir, store)
+        print(f"[Info] Imported {counts['tools']} tools and {counts['documents']} documents into {args.store}")
+    else:
+        counts = export_directory(store, args.data_dir)
+        print(f"[Info] Exported {counts['tools']} tools and {counts['documents']} documents to {args.data_dir}")
+
+
+if __name__ == "__main__":
+    main()
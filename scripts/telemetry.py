@@ -0,0 +1,295 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Labels (stage, tool, document type, section id) of the LLM calls made
+# in the current thread or task. asyncio tasks inherit a copy on creation.
+_labels: ContextVar[Dict[str, Any]] = ContextVar("llm_call_labels", default={})
+
+
+@dataclass
+class LLMCallRecord:
+    """
+    Telemetry of a single `call_llm` invocation.
+    """
+    stage: Optional[str]
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    latency_s: float = 0.0
+    retries: int = 0
+    cache_hit: bool = False
+    # the response stopped at its output token limit
+    truncated: bool = False
+    # "continuation" or "reissue" for requests recovering a truncated response
+    recovery: Optional[str] = None
+    tool: Optional[str] = None
+    document_type: Optional[str] = None
+    section_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+@contextmanager
+def telemetry_context(**labels: Any) -> Iterator[None]:
+    """
+    Attach labels to every LLM call made inside the block.
+
+    Args:
+        **labels: Any of stage, tool, document_type and section_id.
+    """
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> Dict[str, Any]:
+    """Return the labels active for the current thread or task."""
+    return dict(_labels.get())
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _totals(records: List[LLMCallRecord]) -> Dict[str, Any]:
+    input_tokens = sum(r.input_tokens for r in records)
+    cached_tokens = sum(r.cached_tokens for r in records)
+    return {
+        "calls": len(records),
+        "cache_hits": sum(1 for r in records if r.cache_hit),
+        "retries": sum(r.retries for r in records),
+        "input_tokens": input_tokens,
+        "output_tokens": sum(r.output_tokens for r in records),
+        "cached_tokens": cached_tokens,
+        # share of the input tokens served from the provider's prompt prefix cache
+        "cached_ratio": round(cached_tokens / input_tokens, 3) if input_tokens else 0.0,
+        "truncations": sum(1 for r in records if r.truncated),
+        "continuations": sum(1 for r in records if r.recovery == "continuation"),
+        "reissues": sum(1 for r in records if r.recovery == "reissue"),
+        "latency_s": round(sum(r.latency_s for r in records), 3),
+    }
+
+
+def _repair_totals(entries: List[Dict[str, int]]) -> Dict[str, Any]:
+    sections = sum(e["sections"] for e in entries)
+    repaired = sum(e["repaired"] for e in entries)
+    return {
+        "sections": sections,
+        "repaired": repaired,
+        "calls": sum(e["calls"] for e in entries),
+        "success_rate": round(repaired / sections, 3) if sections else 0.0,
+        "tokens_saved": sum(e["tokens_saved"] for e in entries),
+        "output_tokens_saved": sum(e["output_tokens_saved"] for e in entries),
+    }
+
+
+class TelemetryCollector:
+    """
+    Thread-safe collector of LLM call records with per-run aggregation.
+    """
+
+    def __init__(self):
+        self._records: List[LLMCallRecord] = []
+        self._stage_times: Dict[str, Dict[str, float]] = {}
+        # issue repairs per (tool, document type)
+        self._repairs: Dict[tuple, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, **values: Any) -> LLMCallRecord:
+        """
+        Store a call record labelled with the current telemetry context.
+
+        Args:
+            model (str): Name of the LLM model.
+            **values: Token counts, latency, retries and cache flag of the call.
+
+        Returns:
+            LLMCallRecord: The stored record.
+        """
+        labels = current_labels()
+        record = LLMCallRecord(
+            stage=labels.get("stage"),
+            model=model,
+            tool=labels.get("tool"),
+            document_type=labels.get("document_type"),
+            section_id=labels.get("section_id"),
+            **values
+        )
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def record_repair(self, repaired: bool, calls: int, tokens_saved: int, output_tokens_saved: int) -> None:
+        """
+        Count the issue repair of a section, labelled with the current telemetry context.
+
+        Args:
+            repaired (bool): Whether the planned issue was injected by a repair call.
+            calls (int): Number of repair calls made for the section.
+            tokens_saved (int): Estimated tokens of the avoided regeneration minus the
+                tokens of the repair calls; negative when the repair failed.
+            output_tokens_saved (int): The same for output tokens only.
+        """
+        labels = current_labels()
+        key = (labels.get("tool"), labels.get("document_type"))
+        with self._lock:
+            totals = self._repairs.setdefault(
+                key, {"sections": 0, "repaired": 0, "calls": 0, "tokens_saved": 0, "output_tokens_saved": 0}
+            )
+            totals["sections"] += 1
+            totals["repaired"] += int(repaired)
+            totals["calls"] += calls
+            totals["tokens_saved"] += tokens_saved
+            totals["output_tokens_saved"] += output_tokens_saved
+
+    @property
+    def records(self) -> List[LLMCallRecord]:
+        with self._lock:
+            return list(self._records)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """
+        Add the wall time and the CPU time of the current thread spent in the block
+        to the totals of a pipeline stage.
+
+        Args:
+            stage (str): Name of the stage (tool, toc, section, assemble).
+        """
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            with self._lock:
+                totals = self._stage_times.setdefault(stage, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                totals["count"] += 1
+                totals["wall_s"] += wall
+                totals["cpu_s"] += cpu
+
+    def stage_times(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the accumulated wall and CPU time per pipeline stage.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Count, wall_s and cpu_s per stage.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "count": totals["count"],
+                    "wall_s": round(totals["wall_s"], 3),
+                    "cpu_s": round(totals["cpu_s"], 3),
+                }
+                for stage, totals in sorted(self._stage_times.items())
+            }
+
+    def document_totals(self, tool: str, document_type: str) -> Dict[str, Any]:
+        """
+        Aggregate the calls made for a single document.
+
+        Args:
+            tool (str): Name of the tool.
+            document_type (str): The document type.
+
+        Returns:
+            Dict[str, Any]: Totals overall and per stage.
+        """
+        records = [
+            r for r in self.records
+            if r.tool == tool and r.document_type == document_type
+        ]
+        stages = sorted({r.stage for r in records if r.stage})
+        with self._lock:
+            repairs = [totals for key, totals in self._repairs.items() if key == (tool, document_type)]
+        return {
+            **_totals(records),
+            "by_stage": {
+                stage: _totals([r for r in records if r.stage == stage])
+                for stage in stages
+            },
+            "issue_repairs": _repair_totals(repairs),
+        }
+
+    def build_report(self) -> Dict[str, Any]:
+        """
+        Aggregate all records into a run report.
+
+        Returns:
+            Dict[str, Any]: Totals, issue repairs, latency percentiles per model (provider
+                calls only), totals per stage and per document, and time spent per stage.
+        """
+        records = self.records
+
+        models: Dict[str, Any] = {}
+        for model in sorted({r.model for r in records}):
+            model_records = [r for r in records if r.model == model]
+            latencies = [r.latency_s for r in model_records if not r.cache_hit]
+            models[model] = _totals(model_records)
+            if latencies:
+                models[model]["latency_p50_s"] = round(_percentile(latencies, 50), 3)
+                models[model]["latency_p95_s"] = round(_percentile(latencies, 95), 3)
+                models[model]["latency_p99_s"] = round(_percentile(latencies, 99), 3)
+
+        stages = sorted({r.stage for r in records if r.stage})
+        documents = sorted({
+            (r.tool, r.document_type) for r in records if r.tool and r.document_type
+        })
+
+        with self._lock:
+            repairs = list(self._repairs.values())
+
+        return {
+            "totals": _totals(records),
+            "issue_repairs": _repair_totals(repairs),
+            "models": models,
+            "stages": {
+                stage: _totals([r for r in records if r.stage == stage])
+                for stage in stages
+            },
+            "documents": [
+                {"tool": tool, "document_type": document_type,
+                 **self.document_totals(tool, document_type)}
+                for tool, document_type in documents
+            ],
+            "stage_times": self.stage_times(),
+        }
+
+    def write_report(self, path: Path, include_records: bool = False) -> Dict[str, Any]:
+        """
+        Write the run report as JSON.
+
+        Args:
+            path (Path): Target file.
+            include_records (bool): Also include every individual call record.
+
+        Returns:
+            Dict[str, Any]: The written report.
+        """
+        report = self.build_report()
+        if include_records:
+            report["records"] = [asdict(r) for r in self.records]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return report
+
+
+_collector = TelemetryCollector()
+
+
+def get_telemetry() -> TelemetryCollector:
+    """Return the process-wide telemetry collector."""
+    return _collector
@@ -0,0 +1,424 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.config.classes import ToolDedupConfig
+from software_whitelisting_assistant.scripts.classes import Tool
+from software_whitelisting_assistant.scripts.generate_tool import generate_tool
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+# Mersenne prime used by the MinHash permutations (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+
+# Seed of the permutations; fixed, so stored signatures stay comparable
+_PERMUTATION_SEED = 1
+
+
+class DuplicateToolError(Exception):
+    """Raised when every generation attempt produced a near-duplicate of an existing tool."""
+    pass
+
+
+@dataclass(frozen=True)
+class ToolMatch:
+    """An existing tool found similar to a new one."""
+    tool_key: str
+    name: str
+    similarity: float
+
+
+def tool_text(tool: Tool) -> str:
+    """
+    Normalized text of a tool compared for near-duplicates (name and purpose).
+
+    Args:
+        tool (Tool): The tool.
+
+    Returns:
+        str: Lower-case alphanumeric words separated by single spaces.
+    """
+    return re.sub(r"[^a-z0-9]+", " ", f"{tool.name} {tool.purpose}".lower()).strip()
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Split a signature into bands for locality-sensitive hashing.
+
+    Two signatures become candidates when all rows of one band agree, which
+    happens mostly above the similarity (1 / bands) ** (1 / rows). The split
+    with the highest such similarity not above `threshold` is chosen, so
+    pairs at the threshold are rarely missed.
+
+    Args:
+        num_perm (int): Signature length.
+        threshold (float): Similarity from which tools are near-duplicates.
+
+    Returns:
+        Tuple[int, int]: Number of bands and rows per band.
+    """
+    splits = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    below = [split for split in splits if (1 / split[0]) ** (1 / split[1]) <= threshold]
+    if not below:
+        return splits[-1]
+    return max(below, key=lambda split: (1 / split[0]) ** (1 / split[1]))
+
+
+class MinHasher:
+    """MinHash signatures of character shingles."""
+
+    def __init__(self, num_perm: int, shingle_size: int):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(_PERMUTATION_SEED)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def shingles(self, text: str) -> Set[int]:
+        """Hashes of the overlapping `shingle_size` character substrings of a text."""
+        size = self.shingle_size
+        pieces = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        return {
+            int.from_bytes(hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest(), "little")
+            for piece in pieces
+        }
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): The normalized text.
+
+        Returns:
+            Tuple[int, ...]: One minimum per permutation.
+        """
+        hashes = self.shingles(text)
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._permutations)
+
+
+class ToolIndex:
+    """
+    Persistent MinHash-LSH index over generated tools, to detect near-duplicates.
+
+    A tool is compared on the character shingles of its name and purpose.
+    Signatures are stored in SQLite and kept in memory in LSH buckets, so a
+    lookup only compares the few tools sharing a bucket with the new one.
+    A tool whose folder name already exists is a duplicate, as it would
+    overwrite the existing tool's files, unless it has the same name and
+    purpose as a tool indexed by an earlier run: then it is that tool again,
+    e.g. replayed from the response cache on a rerun, and is accepted.
+    """
+
+    def __init__(self, path: Path, *, threshold: float, num_perm: int, shingle_size: int):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        self._lock = threading.Lock()
+        self._names: Dict[str, str] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        # tools claimed by this process; a second claim of one of them is a collision
+        self._claimed: Set[str] = set()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tools (
+                tool_key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                purpose TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                added_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._load()
+
+    def _load(self) -> None:
+        settings = json.dumps([self.hasher.num_perm, self.hasher.shingle_size])
+        row = self._conn.execute("SELECT value FROM settings WHERE key = 'signature'").fetchone()
+        rows = self._conn.execute("SELECT tool_key, name, purpose, signature FROM tools").fetchall()
+
+        if row is not None and row[0] != settings:
+            # signature settings changed: recompute all signatures from the stored texts
+            print(f"[Info] Recomputing {len(rows)} tool signatures in {self.path}")
+            rows = [
+                (key, name, purpose, self._pack(self.hasher.signature(tool_text(Tool(name=name, purpose=purpose, category="", user_base="")))))
+                for key, name, purpose, _ in rows
+            ]
+            self._conn.executemany("UPDATE tools SET signature = ? WHERE tool_key = ?", [(sig, key) for key, _, _, sig in rows])
+
+        self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('signature', ?)", (settings,))
+        self._conn.commit()
+
+        for key, name, _, signature in rows:
+            self._insert(key, name, self._unpack(signature))
+
+    @staticmethod
+    def _pack(signature: Tuple[int, ...]) -> bytes:
+        return array("Q", signature).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Tuple[int, ...]:
+        values = array("Q")
+        values.frombytes(blob)
+        return tuple(values)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _insert(self, tool_key: str, name: str, signature: Tuple[int, ...]) -> None:
+        previous = self._signatures.get(tool_key)
+        if previous is not None:
+            for band_key in self._band_keys(previous):
+                self._buckets.get(band_key, set()).discard(tool_key)
+
+        self._names[tool_key] = name
+        self._signatures[tool_key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(tool_key)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _find(self, tool_key: str, signature: Tuple[int, ...]) -> Optional[ToolMatch]:
+        if tool_key in self._names:
+            if tool_key not in self._claimed and self._signatures[tool_key] == signature:
+                # same name and purpose as a tool of an earlier run: the same tool
+                return None
+            return ToolMatch(tool_key=tool_key, name=self._names[tool_key], similarity=1.0)
+
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+
+        best: Optional[ToolMatch] = None
+        for candidate in candidates:
+            other = self._signatures[candidate]
+            similarity = sum(a == b for a, b in zip(signature, other)) / len(signature)
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = ToolMatch(tool_key=candidate, name=self._names[candidate], similarity=similarity)
+        return best
+
+    def find(self, tool: Tool) -> Optional[ToolMatch]:
+        """
+        Find the most similar indexed tool at or above the threshold.
+
+        Args:
+            tool (Tool): The new tool.
+
+        Returns:
+            ToolMatch | None: The closest near-duplicate, if any.
+        """
+        signature = self.hasher.signature(tool_text(tool))
+        with self._lock:
+            return self._find(normalize_name(tool.name), signature)
+
+    def add(self, tool: Tool, claimed: bool = False) -> None:
+        """
+        Add (or update) a tool without checking it.
+
+        Args:
+            tool (Tool): The tool.
+            claimed (bool): The tool belongs to the current run, e.g. replayed
+                from its journal, so a later claim of its name is a collision.
+        """
+        tool_key = normalize_name(tool.name)
+        signature = self.hasher.signature(tool_text(tool))
+        with self._lock:
+            self._store(tool_key, tool, signature)
+            if claimed:
+                self._claimed.add(tool_key)
+
+    def claim(self, tool: Tool) -> Optional[ToolMatch]:
+        """
+        Add a tool unless it is a near-duplicate of an indexed tool.
+
+        Checking and adding happen atomically, so tools generated concurrently
+        are also compared with each other.
+
+        Args:
+            tool (Tool): The new tool.
+
+        Returns:
+            ToolMatch | None: The near-duplicate found, or None if the tool was added.
+        """
+        tool_key = normalize_name(tool.name)
+        signature = self.hasher.signature(tool_text(tool))
+        with self._lock:
+            match = self._find(tool_key, signature)
+            if match is None:
+                self._store(tool_key, tool, signature)
+                self._claimed.add(tool_key)
+            return match
+
+    def _store(self, tool_key: str, tool: Tool, signature: Tuple[int, ...]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tools (tool_key, name, purpose, signature, added_at) VALUES (?, ?, ?, ?, ?)",
+            (tool_key, tool.name, tool.purpose, self._pack(signature), time.time())
+        )
+        self._conn.commit()
+        self._insert(tool_key, tool.name, signature)
+
+    def sync(self, tools: Iterable[Tool]) -> int:
+        """
+        Add the tools that are not indexed yet, e.g. tools of an existing dataset.
+
+        Args:
+            tools (Iterable[Tool]): The tools.
+
+        Returns:
+            int: Number of added tools.
+        """
+        added = 0
+        for tool in tools:
+            if normalize_name(tool.name) not in self._names:
+                self.add(tool)
+                added += 1
+        return added
+
+
+def iter_dataset_tools(output_folder: Path) -> Iterator[Tool]:
+    """
+    Read the tools saved in a dataset, from the SQLite store or the directory layout.
+
+    Args:
+        output_folder (Path): Root folder of the dataset.
+
+    Yields:
+        Tool: The saved tools.
+    """
+    from software_whitelisting_assistant.scripts.artifacts_store import sqlite_store
+
+    store = sqlite_store(output_folder)
+    if store is not None:
+        for _, tool in store.iter_tools():
+            yield tool
+        return
+
+    for tool_dir in sorted(path for path in Path(output_folder).iterdir() if path.is_dir()):
+        tool_path = tool_dir / f"{tool_dir.name}.json"
+        if tool_path.exists():
+            yield Tool.model_validate_json(tool_path.read_text(encoding="utf-8"))
+
+
+# Indexes opened by the process, one per database file
+_indexes: Dict[Path, ToolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_tool_index(output_folder: Path, dedup: ToolDedupConfig) -> ToolIndex:
+    """
+    Return the tool index of a dataset, opening it on first use.
+
+    A new index is filled with the tools already saved in the dataset.
+
+    Args:
+        output_folder (Path): Root folder of the dataset.
+        dedup (ToolDedupConfig): Near-duplicate detection settings.
+
+    Returns:
+        ToolIndex: The index.
+    """
+    path = (Path(output_folder) / dedup.index_path).resolve()
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = ToolIndex(
+                path,
+                threshold=dedup.threshold,
+                num_perm=dedup.num_perm,
+                shingle_size=dedup.shingle_size
+            )
+            if not len(index) and Path(output_folder).exists():
+                added = index.sync(iter_dataset_tools(output_folder))
+                if added:
+                    print(f"[Info] Indexed {added} existing tools for near-duplicate detection")
+        return index
+
+
+def generate_distinct_tool(config: AppConfig, tool_index: Optional[ToolIndex]) -> Tool:
+    """
+    Generate a tool, regenerating it while it is a near-duplicate of an indexed tool.
+
+    Args:
+        config (AppConfig): The application configuration.
+        tool_index (ToolIndex | None): Index of the existing tools; None skips the check.
+
+    Returns:
+        Tool: A tool that is now part of the index.
+
+    Raises:
+        DuplicateToolError: If all `tools.dedup.max_attempts` attempts were near-duplicates.
+    """
+    max_attempts = config.tools.dedup.max_attempts if tool_index is not None else 1
+
+    for attempt in range(1, max_attempts + 1):
+        tool = generate_tool(
+            model=config.models.tool,
+            temperature=config.generation.temperature.tool,
+            max_tokens=config.generation.max_tokens.tool,
+            prompt_name=config.prompts.tool
+        )
+        if tool_index is None:
+            return tool
+
+        match = tool_index.claim(tool)
+        if match is None:
+            return tool
+        print(
+            f"[Tool] '{tool.name}' is a near-duplicate of '{match.name}' "
+            f"(similarity {match.similarity:.2f}), attempt {attempt}/{max_attempts}"
+        )
+
+    raise DuplicateToolError(
+        f"No distinct tool after {max_attempts} attempts, last one: '{tool.name}' ~ '{match.name}'"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or fill the near-duplicate tool index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("sync", help="Add the tools saved in the dataset to the index")
+    check = subparsers.add_parser("check", help="Find the closest indexed tool for a name and purpose")
+    check.add_argument("name")
+    check.add_argument("purpose")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    from software_whitelisting_assistant.scripts.artifacts_store import dataset_dir
+    from software_whitelisting_assistant.scripts.registry import get_config
+
+    args = parse_args(argv)
+    output_folder = dataset_dir()
+    index = open_tool_index(output_folder, get_config().tools.dedup)
+
+    if args.command == "sync":
+        added = index.sync(iter_dataset_tools(output_folder))
+        print(f"[Info] Added {added} tools, {len(index)} tools indexed in {index.path}")
+    else:
+        match = index.find(Tool(name=args.name, purpose=args.purpose, category="", user_base=""))
+        print(f"Near-duplicate of '{match.name}' ({match.similarity:.2f})" if match else "No near-duplicate")
+
+
+if __name__ == "__main__":
+    main()
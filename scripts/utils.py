@@ -1,3 +1,4 @@
+import math
 import re
 from software_whitelisting_assistant.scripts.classes import InjectedIssue
 
@@ -20,6 +21,19 @@ def normalize_name(name: str) -> str:
     return name
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text (about 4 characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return math.ceil(len(text) / 4)
+
+
 def print_injected_issues(
     issue: InjectedIssue,
     level: int
@@ -1,7 +1,28 @@
+import re
 from html.parser import HTMLParser
 from typing import Set, List
-from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, InjectedIssue
-from software_whitelisting_assistant.scripts.load_config import load_configuration
+from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, InjectedIssue, Tool
+from software_whitelisting_assistant.scripts.registry import get_config
+
+
+class ToolValidationError(Exception):
+    """Raised when a generated tool is incomplete."""
+    pass
+
+
+def validate_tool(tool: Tool) -> None:
+    """
+    Validate that every field of a generated tool is filled in.
+
+    Args:
+        tool (Tool): The tool to validate.
+
+    Raises:
+        ToolValidationError: If a field is empty.
+    """
+    for field in ("name", "purpose", "category", "user_base"):
+        if not getattr(tool, field).strip():
+            raise ToolValidationError(f"Tool field '{field}' is empty")
 
 
 class TOCValidationError(Exception):
@@ -91,33 +112,103 @@ class _HTMLValidator(HTMLParser):
             )
 
 
-def validate_html(html: str) -> None:
+_HEADING_PATTERN = re.compile(r"<h[123][\s/>]")
+
+
+def validate_html(html: str, *, trusted: bool = False) -> None:
     """
     Perform basic structural validation on a generated HTML document.
 
     Args:
         html (str): The HTML content to validate.
+        trusted (bool): The document is known to be balanced, e.g. because it
+            was assembled from sections cleaned by `normalize_html`. Only the
+            checks that do not need the tag structure are run, without parsing.
 
     Raises:
         HTMLValidationError: If any validation rule is violated.
     """
 
-    if not html.strip():
-        raise HTMLValidationError("HTML document is empty")
+    if trusted:
+        if not html.strip():
+            raise HTMLValidationError("HTML document is empty")
+        if "<body" not in html:
+            raise HTMLValidationError("Missing <body> tag")
+        if not _HEADING_PATTERN.search(html):
+            raise HTMLValidationError("HTML contains no headings")
+        return
+
+    validator = IncrementalHTMLValidator()
+    validator.feed(html)
+    validator.close()
 
+
+def validate_html_fragment(fragment: str) -> None:
+    """
+    Check that an HTML fragment is balanced on its own.
+
+    A document built from balanced fragments inside a balanced skeleton
+    passes the tag checks of `validate_html`, so fragments validated once
+    do not have to be parsed again as part of the document.
+
+    Args:
+        fragment (str): The HTML fragment to validate.
+
+    Raises:
+        HTMLValidationError: On a mismatched, unexpected or unclosed tag.
+    """
     parser = _HTMLValidator()
-    parser.feed(html)
+    parser.feed(fragment)
+    parser.close()
 
     if parser.open_tags:
-        raise HTMLValidationError(
-            f"Unclosed tags remain: {parser.open_tags}"
-        )
+        raise HTMLValidationError(f"Unclosed tags remain: {parser.open_tags}")
+
+
+class IncrementalHTMLValidator:
+    """
+    Applies the checks of `validate_html` to a document fed in chunks,
+    so a document written incrementally never has to be held in memory.
+    """
+
+    def __init__(self):
+        self._parser = _HTMLValidator()
+        self._empty = True
+
+    def feed(self, chunk: str) -> None:
+        """
+        Parse the next chunk of the document.
+
+        Args:
+            chunk (str): The next part of the HTML document.
+
+        Raises:
+            HTMLValidationError: On a mismatched or unexpected closing tag.
+        """
+        if chunk.strip():
+            self._empty = False
+        self._parser.feed(chunk)
+
+    def close(self) -> None:
+        """
+        Run the checks that need the complete document.
+
+        Raises:
+            HTMLValidationError: If any validation rule is violated.
+        """
+        if self._empty:
+            raise HTMLValidationError("HTML document is empty")
+
+        if self._parser.open_tags:
+            raise HTMLValidationError(
+                f"Unclosed tags remain: {self._parser.open_tags}"
+            )
 
-    if not parser.has_body:
-        raise HTMLValidationError("Missing <body> tag")
+        if not self._parser.has_body:
+            raise HTMLValidationError("Missing <body> tag")
 
-    if not parser.has_heading:
-        raise HTMLValidationError("HTML contains no headings")
+        if not self._parser.has_heading:
+            raise HTMLValidationError("HTML contains no headings")
 
 
 class InjectedIssueValidationError(Exception):
@@ -137,7 +228,7 @@ def validate_injected_issues(injected_issues: List[InjectedIssue]):
         InjectedIssueValidationError: If any validation rule is violated.
     """
     # Load configuration
-    config = load_configuration()
+    config = get_config()
 
     if len(injected_issues) < config.issues.min_per_document or \
        len(injected_issues) > config.issues.max_per_document:
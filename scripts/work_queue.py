@@ -0,0 +1,543 @@
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.config.classes import WorkQueueConfig
+from software_whitelisting_assistant.scripts.artifacts_store import load_tool, load_toc, dataset_dir
+from software_whitelisting_assistant.scripts.checkpoint import RunJournal
+from software_whitelisting_assistant.scripts.generate_dataset import create_tool, create_tools, create_tocs, prepare_tool_dir, generate_document
+from software_whitelisting_assistant.scripts.registry import get_config, use_config
+from software_whitelisting_assistant.scripts.seeds import SeedTree, plan_document_types
+from software_whitelisting_assistant.scripts.telemetry import get_telemetry
+from software_whitelisting_assistant.scripts.tool_dedup import open_tool_index
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+QUEUE_NAME = "queue.sqlite"
+
+# Job states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class Job:
+    """
+    A (tool, document type) job leased to a worker.
+    """
+    id: int
+    tool: str
+    document_type: str
+    attempt: int
+    worker: str
+
+
+class WorkQueue:
+    """
+    Durable queue of document jobs shared by any number of worker processes.
+
+    Jobs live in a SQLite database next to the run manifest. A worker claims
+    a job by taking a lease on it, which it renews with heartbeats while the
+    document is generated. A job whose lease expired, because its worker
+    crashed, hung or lost its host, is claimed again by the next worker
+    asking for work, until it has been leased `max_attempts` times.
+    Claims run in an IMMEDIATE transaction, so two workers never hold the
+    same live lease, also across hosts sharing the filesystem.
+
+    Lease expiry is compared against the clock of the claiming host, so the
+    hosts' clocks must agree to well within `lease_s`.
+    """
+
+    def __init__(self, path: Path, settings: WorkQueueConfig):
+        self.path = Path(path)
+        self.settings = settings
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # transactions are opened explicitly, so a claim can lock the database before reading
+        self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        # WAL needs shared memory between the processes, which network filesystems do not provide
+        self._conn.execute(f"PRAGMA journal_mode={'WAL' if settings.wal else 'DELETE'}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tool TEXT NOT NULL,
+                document_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                error TEXT,
+                updated REAL NOT NULL,
+                UNIQUE (tool, document_type)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+
+    def enqueue(self, jobs: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add document jobs; jobs already in the queue are left as they are.
+
+        Args:
+            jobs (Iterable[Tuple[str, str]]): (tool key, document type) pairs.
+
+        Returns:
+            int: Number of new jobs.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                added = 0
+                for tool, document_type in jobs:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (tool, document_type, status, updated) VALUES (?, ?, ?, ?)",
+                        (tool, document_type, PENDING, now)
+                    )
+                    added += cursor.rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Lease the next pending job, or a job whose lease expired.
+
+        Expired jobs that were already leased `max_attempts` times are marked
+        failed instead of being handed out again.
+
+        Args:
+            worker (str): Id of the claiming worker.
+
+        Returns:
+            Job | None: The leased job, or None if no job is available right now.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, "
+                    "error = COALESCE(error, 'lease expired'), updated = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                    (FAILED, now, LEASED, now, self.settings.max_attempts)
+                )
+                row = self._conn.execute(
+                    "SELECT id, tool, document_type, attempts FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY attempts, id LIMIT 1",
+                    (PENDING, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                job_id, tool, document_type, attempts = row
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, worker = ?, lease_expires = ?, updated = ? WHERE id = ?",
+                    (LEASED, attempts + 1, worker, now + self.settings.lease_s, now, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(job_id, tool, document_type, attempts + 1, worker)
+
+    def _update_lease(self, job: Job, sql: str, params: tuple) -> bool:
+        # only the current lease holder may change a leased job
+        with self._lock:
+            cursor = self._conn.execute(
+                f"{sql} WHERE id = ? AND worker = ? AND attempts = ? AND status = ?",
+                (*params, job.id, job.worker, job.attempt, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job: Job) -> bool:
+        """
+        Extend the lease of a job by `lease_s`.
+
+        Args:
+            job (Job): The leased job.
+
+        Returns:
+            bool: False if the lease was lost, i.e. expired and claimed by another worker.
+        """
+        now = time.time()
+        return self._update_lease(
+            job, "UPDATE jobs SET lease_expires = ?, updated = ?", (now + self.settings.lease_s, now)
+        )
+
+    def complete(self, job: Job) -> bool:
+        """
+        Mark a leased job as done.
+
+        Args:
+            job (Job): The leased job.
+
+        Returns:
+            bool: False if the lease was lost before the job finished.
+        """
+        return self._update_lease(
+            job, "UPDATE jobs SET status = ?, lease_expires = NULL, error = NULL, updated = ?", (DONE, time.time())
+        )
+
+    def release(self, job: Job, error: str) -> bool:
+        """
+        Give a failed job back to the queue, or mark it failed after `max_attempts` leases.
+
+        Args:
+            job (Job): The leased job.
+            error (str): Description of the failure.
+
+        Returns:
+            bool: False if the lease was lost before the job failed.
+        """
+        status = FAILED if job.attempt >= self.settings.max_attempts else PENDING
+        return self._update_lease(
+            job,
+            "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ?",
+            (status, error, time.time())
+        )
+
+    def progress(self) -> Dict[str, int]:
+        """
+        Number of jobs per state.
+
+        Returns:
+            Dict[str, int]: Counts of pending, leased, done and failed jobs, and the total.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        counts["total"] = sum(count for status, count in rows)
+        return counts
+
+    def failures(self) -> List[Tuple[str, str, str]]:
+        """
+        The failed jobs.
+
+        Returns:
+            List[Tuple[str, str, str]]: (tool, document type, error) of every failed job.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT tool, document_type, error FROM jobs WHERE status = ? ORDER BY id", (FAILED,)
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """
+    Context manager renewing the lease of a job every `heartbeat_s` in a background thread.
+    """
+
+    def __init__(self, queue: WorkQueue, job: Job):
+        self.queue = queue
+        self.job = job
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job.id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.queue.settings.heartbeat_s):
+            try:
+                renewed = self.queue.heartbeat(self.job)
+            except sqlite3.Error as e:
+                # a busy database must not kill the heartbeat, the lease outlasts a few misses
+                print(f"[Warning] Heartbeat of {self.job.tool} / {self.job.document_type} failed: {e}")
+                continue
+            if not renewed:
+                print(f"[Warning] Lease of {self.job.tool} / {self.job.document_type} was lost")
+                self.lost.set()
+                return
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def open_queue(run_dir: Path, settings: WorkQueueConfig) -> WorkQueue:
+    """
+    Open the work queue of a run.
+
+    Args:
+        run_dir (Path): Directory of the run, holding its manifest.
+        settings (WorkQueueConfig): The `work_queue` configuration.
+
+    Returns:
+        WorkQueue: The queue.
+    """
+    return WorkQueue(run_dir / QUEUE_NAME, settings)
+
+
+def worker_id() -> str:
+    """Default id of a worker process: host name and process id."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue_run(config: AppConfig, output_folder: Path, journal: RunJournal, queue: WorkQueue) -> int:
+    """
+    Generate the tools of a run and enqueue one job per document.
+
+    Tools are generated here, where the near-duplicate index sees all of
+    them, and saved to the dataset, where workers load them. TOCs are
+    generated here as well when `generation.tocs_per_call` batches them.
+    A tool that fails is reported and its documents are not enqueued.
+
+    Args:
+        config (AppConfig): The configuration of the run.
+        output_folder (Path): Root folder of the generated dataset.
+        journal (RunJournal): Checkpoint journal of the run.
+        queue (WorkQueue): The queue of the run.
+
+    Returns:
+        int: Number of jobs added.
+    """
+    doc_types_per_tool = journal.state.doc_types_per_tool
+    if doc_types_per_tool is None:
+        doc_types_per_tool = plan_document_types(
+            SeedTree(config.seed), config.documents.types, config.documents.per_tool, config.tools.count
+        )
+        journal.record_plan(doc_types_per_tool)
+
+    tool_index = open_tool_index(output_folder, config.tools.dedup) if config.tools.dedup.enabled else None
+    create_tools(config, journal, tool_index)
+
+    jobs: List[Tuple[str, str]] = []
+    for i in range(config.tools.count):
+        try:
+            tool = create_tool(config, journal, i, tool_index)
+        except Exception as e:
+            print(f"[Error] Tool {i+1} failed: {e}")
+            continue
+        tool_dir = prepare_tool_dir(tool, output_folder)
+        create_tocs(config, tool, tool_dir, doc_types_per_tool[i], journal)
+        jobs.extend((normalize_name(tool.name), document_type) for document_type in doc_types_per_tool[i])
+
+    return queue.enqueue(jobs)
+
+
+def report_progress(queue: WorkQueue, poll_s: float) -> Dict[str, int]:
+    """
+    Print the progress of a queue every `poll_s` seconds until no job is pending or leased.
+
+    Args:
+        queue (WorkQueue): The queue.
+        poll_s (float): Seconds between reports.
+
+    Returns:
+        Dict[str, int]: The final job counts.
+    """
+    start = time.perf_counter()
+    while True:
+        counts = queue.progress()
+        elapsed = time.perf_counter() - start
+        print(
+            f"[Queue] {counts[DONE]}/{counts['total']} done, {counts[LEASED]} leased, "
+            f"{counts[PENDING]} pending, {counts[FAILED]} failed ({elapsed:.0f}s)"
+        )
+        if counts[PENDING] == 0 and counts[LEASED] == 0:
+            return counts
+        time.sleep(poll_s)
+
+
+def process_job(config: AppConfig, output_folder: Path, queue: WorkQueue, job: Job) -> None:
+    """
+    Generate the document of a leased job and record the outcome in the queue.
+
+    The document draws its random choices from its node of the seed tree
+    and reuses a TOC saved by an earlier attempt or the coordinator, so a
+    job re-run after a lost lease makes the same choices. A worker that
+    loses its lease abandons the document before its next section and
+    leaves it to the new lease holder. Every attempt writes its own
+    `.partial` file, so the two never touch each other's output.
+
+    Args:
+        config (AppConfig): The configuration of the run.
+        output_folder (Path): Root folder of the generated dataset.
+        queue (WorkQueue): The queue of the run.
+        job (Job): The leased job.
+    """
+    print(f"[Queue] {job.worker} generating {job.tool} / {job.document_type} (attempt {job.attempt})")
+    with LeaseKeeper(queue, job) as lease:
+        try:
+            tool = load_tool(job.tool, output_folder)
+            try:
+                toc = load_toc(job.tool, normalize_name(job.document_type), output_folder)
+            except FileNotFoundError:
+                toc = None
+            generate_document(
+                config, tool, output_folder / job.tool, job.document_type, toc=toc,
+                cancel=lease.lost, partial_tag=f"{job.worker}.{job.attempt}"
+            )
+        except Exception as e:
+            if lease.lost.is_set():
+                print(f"[Warning] {job.tool} / {job.document_type} abandoned after its lease was lost: {e}")
+                return
+            print(f"[Error] {job.tool} / {job.document_type} failed: {e}")
+            queue.release(job, str(e))
+            return
+
+    if not queue.complete(job):
+        # the job expired and was claimed by another worker, which rewrites the same document
+        print(f"[Warning] {job.tool} / {job.document_type} finished after its lease was lost")
+        return
+    print(f"[Done] {job.tool} / {job.document_type}")
+
+
+def run_worker(config: AppConfig, output_folder: Path, queue: WorkQueue, worker: str, threads: int) -> int:
+    """
+    Drain a queue with `threads` worker threads.
+
+    Idle threads wait while other workers hold leases, since an expired
+    lease makes their job available again, and exit once every job is done
+    or failed.
+
+    Args:
+        config (AppConfig): The configuration of the run.
+        output_folder (Path): Root folder of the generated dataset.
+        queue (WorkQueue): The queue of the run.
+        worker (str): Id of the worker process.
+        threads (int): Number of jobs processed at once.
+
+    Returns:
+        int: Number of jobs processed by this worker.
+    """
+    processed = 0
+    processed_lock = threading.Lock()
+
+    def drain(thread: int) -> None:
+        nonlocal processed
+        name = f"{worker}/{thread}"
+        while True:
+            job = queue.claim(name)
+            if job is None:
+                counts = queue.progress()
+                if counts[PENDING] == 0 and counts[LEASED] == 0:
+                    return
+                time.sleep(config.work_queue.poll_s)
+                continue
+            process_job(config, output_folder, queue, job)
+            with processed_lock:
+                processed += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(drain, thread) for thread in range(threads)]:
+            future.result()
+
+    return processed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate the dataset with worker processes draining a shared work queue."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser("coordinator", help="Generate the tools, enqueue the documents and report progress.")
+    coordinator.add_argument("--resume", metavar="RUN_ID", help="Enqueue into an existing run instead of starting one.")
+    coordinator.add_argument("--no-wait", action="store_true", help="Exit after enqueueing instead of reporting progress.")
+
+    worker = commands.add_parser("worker", help="Process jobs until the queue is drained.")
+    worker.add_argument("--run", default="latest", metavar="RUN_ID", help="Run to work on (default: latest).")
+    worker.add_argument("--threads", type=int, help="Jobs processed at once (default: concurrency.documents).")
+    worker.add_argument("--worker-id", help="Id of this worker (default: host name and process id).")
+
+    status = commands.add_parser("status", help="Print the job counts of a run.")
+    status.add_argument("--run", default="latest", metavar="RUN_ID", help="Run to report on (default: latest).")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    output_folder = dataset_dir()
+    output_folder.mkdir(parents=True, exist_ok=True)
+    runs_dir = output_folder / ".runs"
+
+    if args.command == "coordinator":
+        if args.resume:
+            journal = RunJournal.open(runs_dir, args.resume)
+        else:
+            journal = RunJournal.create(runs_dir, get_config())
+        config = journal.config
+        use_config(config)
+        queue = open_queue(journal.run_dir, config.work_queue)
+        try:
+            added = enqueue_run(config, output_folder, journal, queue)
+        finally:
+            journal.close()
+        print(f"[Queue] Run {journal.run_id}: {added} new jobs in {queue.path}")
+        print(
+            "[Info] Start workers with: python -m software_whitelisting_assistant.scripts.work_queue "
+            f"worker --run {journal.run_id}"
+        )
+        if args.no_wait:
+            queue.close()
+            return
+
+        counts = report_progress(queue, config.work_queue.poll_s)
+        failures = queue.failures()
+        queue.close()
+        if failures:
+            journal.mark_status("failed")
+            print(f"\n[Warning] {len(failures)} document(s) failed:")
+            for tool, document_type, error in failures:
+                print(f"  - {tool} / {document_type}: {error}")
+            return
+        journal.mark_status("complete")
+        print(f"\nDataset generation complete ✔ ({counts[DONE]} documents)")
+        return
+
+    # workers and status only read the manifest; the journal is written by the coordinator
+    journal = RunJournal.open(runs_dir, args.run)
+    journal.close()
+    config = journal.config
+    use_config(config)
+    queue = open_queue(journal.run_dir, config.work_queue)
+
+    if args.command == "status":
+        print(f"[Queue] Run {journal.run_id}: {queue.progress()}")
+        for tool, document_type, error in queue.failures():
+            print(f"  - {tool} / {document_type}: {error}")
+        queue.close()
+        return
+
+    worker = args.worker_id or worker_id()
+    threads = args.threads or config.concurrency.documents
+    print(f"[Queue] Worker {worker} on run {journal.run_id} with {threads} threads")
+    try:
+        processed = run_worker(config, output_folder, queue, worker, threads)
+    finally:
+        queue.close()
+
+    report_path = journal.run_dir / "workers" / f"{normalize_name(worker)}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report = get_telemetry().write_report(report_path)
+    print(f"[Info] Worker {worker} processed {processed} jobs, LLM usage: {report['totals']} (report: {report_path})")
+
+
+if __name__ == "__main__":
+    main()
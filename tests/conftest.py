@@ -0,0 +1,28 @@
+from pathlib import Path
+import pytest
+import yaml
+from software_whitelisting_assistant.config import AppConfig
+from software_whitelisting_assistant.scripts import benchmark
+from software_whitelisting_assistant.scripts.llm_client import set_cache_mode
+
+
+@pytest.fixture
+def mock_config(tmp_path: Path, monkeypatch) -> AppConfig:
+    """
+    Configuration of a small offline run in `tmp_path`, active through `CONFIG_PATH`.
+
+    One tool with two documents, generated by the mock backend without latency.
+    """
+    args = benchmark.parse_args(["--tools", "1", "--documents-per-tool", "2", "--latency", "0"])
+    config = benchmark.benchmark_config(args, tmp_path / "data")
+    raw = config.model_dump(mode="json")
+    raw["concurrency"]["documents"] = 1
+    raw["generation"]["tools_per_call"] = 1
+    raw["generation"]["tocs_per_call"] = 1
+
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(raw), encoding="utf-8")
+    monkeypatch.setenv("CONFIG_PATH", str(path))
+    # the process-wide response cache may have been opened by another test
+    set_cache_mode("bypass")
+    return AppConfig.model_validate(raw)
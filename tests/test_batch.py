@@ -0,0 +1,32 @@
+import json
+import openai
+from software_whitelisting_assistant.scripts.artifacts_store import dataset_dir, load_sections
+from software_whitelisting_assistant.scripts.batch import PLAN_NAME, ingest_batch, render_batch, submit_batch, wait_for_batch
+from software_whitelisting_assistant.scripts.batch_stub_server import BatchStubServer
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+def test_batch_phases_save_the_documents_to_the_data_dir(mock_config, tmp_path):
+    output_folder = dataset_dir()
+    assert output_folder == tmp_path / "data"
+    batch_dir = output_folder / ".batches" / "run"
+
+    render_batch(mock_config, batch_dir, output_folder)
+    plan = json.loads((batch_dir / PLAN_NAME).read_text(encoding="utf-8"))
+    assert plan["output_folder"] == str(output_folder)
+
+    with BatchStubServer() as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="test")
+        submit_batch(batch_dir, client)
+        wait_for_batch(batch_dir, client, poll_interval=0)
+
+    failures = ingest_batch(batch_dir)
+
+    assert failures == []
+    assert len(plan["documents"]) == 2
+    for document in plan["documents"]:
+        tool_dir = output_folder / document["tool_dir"]
+        doc_name = normalize_name(document["document_type"])
+        assert (tool_dir / f"{doc_name}.html").exists()
+        sections = load_sections(tool_dir.name, doc_name, output_folder)
+        assert [section.id for section in sections] == [section["id"] for section in document["sections"]]
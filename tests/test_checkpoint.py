@@ -0,0 +1,76 @@
+import json
+from software_whitelisting_assistant.scripts import generate_dataset, registry
+from software_whitelisting_assistant.scripts.checkpoint import JOURNAL_NAME, RunJournal
+from software_whitelisting_assistant.scripts.classes import Section, TOC, TOCSection, Tool
+from software_whitelisting_assistant.scripts.telemetry import get_telemetry
+
+
+TOOL = Tool(name="Pixel Weave", purpose="Image editing", category="Design", user_base="Teams")
+TOC_ = TOC(id="privacy", title="Privacy Policy", sections=[TOCSection(id="intro", title="Introduction")])
+
+
+def test_journal_replays_completed_work(tmp_path, mock_config):
+    journal = RunJournal.create(tmp_path / "runs", mock_config)
+    journal.record_plan([["Privacy Policy"]])
+    journal.record_tool(0, TOOL)
+    document = journal.document(TOOL.name, "Privacy Policy")
+    document.record_toc(TOC_)
+    document.record_issue_plan({"intro"})
+    document.record_section(
+        Section(id="intro", title="Introduction", level=1, parent_id=None, content_html="<p>Hi</p>"), None
+    )
+    journal.close()
+
+    resumed = RunJournal.open(tmp_path / "runs")
+    document = resumed.document(TOOL.name, "Privacy Policy")
+    assert resumed.state.doc_types_per_tool == [["Privacy Policy"]]
+    assert resumed.state.tools[0] == TOOL
+    assert document.toc == TOC_
+    assert document.issue_plan == {"intro"}
+    assert document.completed_section("intro")[0].content_html == "<p>Hi</p>"
+    assert not document.done
+    assert resumed.config == mock_config
+    resumed.close()
+
+
+def test_journal_ignores_partially_written_last_line(tmp_path, mock_config):
+    journal = RunJournal.create(tmp_path / "runs", mock_config)
+    journal.record_tool(0, TOOL)
+    journal.close()
+    with (journal.run_dir / JOURNAL_NAME).open("a", encoding="utf-8") as f:
+        f.write('{"event": "tool", "index": 1, "to')
+
+    resumed = RunJournal.open(tmp_path / "runs")
+    assert list(resumed.state.tools) == [0]
+    resumed.close()
+
+
+def test_resume_generates_only_missing_sections_with_the_run_config(tmp_path, mock_config, monkeypatch):
+    generate_dataset.main([])
+
+    # simulate a crash: the documents did not finish and their last two sections were lost
+    run_dir = next((tmp_path / "data" / ".runs").iterdir())
+    journal_path = run_dir / JOURNAL_NAME
+    records = [json.loads(line) for line in journal_path.read_text(encoding="utf-8").splitlines()]
+    records = [record for record in records if record["event"] != "document"]
+    section_indices = [i for i, record in enumerate(records) if record["event"] == "section"]
+    lost = section_indices[-2:]
+    records = [record for i, record in enumerate(records) if i not in lost]
+    journal_path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+    # the config file changes between the crash and the resume
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        config_path.read_text(encoding="utf-8").replace(mock_config.models.section, "changed-model"),
+        encoding="utf-8"
+    )
+    # the resumed process reads the config file again
+    monkeypatch.setattr(registry, "_registry", None)
+
+    calls_before = get_telemetry().build_report()["totals"]["calls"]
+    generate_dataset.main(["--resume", run_dir.name])
+    calls = get_telemetry().build_report()["totals"]["calls"] - calls_before
+
+    assert calls == len(lost)
+    assert registry.get_config().models.section == mock_config.models.section
+    assert json.loads((run_dir / "manifest.json").read_text(encoding="utf-8"))["status"] == "complete"
@@ -0,0 +1,84 @@
+import json
+from software_whitelisting_assistant.scripts import generate_dataset
+from software_whitelisting_assistant.scripts.artifacts_store import load_metadata, load_sections, load_toc, load_tool
+from software_whitelisting_assistant.scripts.classes import Section, TOC, TOCSection
+from software_whitelisting_assistant.scripts.fragment_cache import DocumentFragments, FragmentCache
+from software_whitelisting_assistant.scripts.generate_sections import build_full_html, plan_issue_sections
+from software_whitelisting_assistant.scripts.seeds import SeedTree
+from software_whitelisting_assistant.scripts.telemetry import get_telemetry
+from software_whitelisting_assistant.scripts.utils import normalize_name
+
+
+TOC_ = TOC(id="privacy", title="Privacy Policy", sections=[
+    TOCSection(id="1", title="Introduction", subsections=[
+        TOCSection(id="1.1", title="Scope"),
+        TOCSection(id="1.2", title="Definitions"),
+    ]),
+    TOCSection(id="2", title="Data"),
+])
+
+
+def section(section_id: str, content: str) -> Section:
+    node = {"1": ("Introduction", 1), "1.1": ("Scope", 2), "1.2": ("Definitions", 2), "2": ("Data", 1)}
+    title, level = node[section_id]
+    return Section(id=section_id, title=title, level=level, parent_id=None, content_html=f"<p>{content}</p>")
+
+
+def test_replace_matches_full_assembly():
+    sections = [section(section_id, "old") for section_id in ("1", "1.1", "1.2", "2")]
+    document = DocumentFragments(TOC_, sections, cache=FragmentCache())
+    assert document.html == build_full_html(TOC_, sections)
+
+    html = document.replace(section("1.2", "new"))
+
+    expected = sections[:2] + [section("1.2", "new")] + sections[3:]
+    assert html == build_full_html(TOC_, expected)
+    assert document.sections == expected
+
+
+def issues_by_section(output_folder, tool_dir, doc_name, planned):
+    """The saved injected issues keyed by the section they were planned for, in TOC order."""
+    injected = load_metadata(tool_dir.name, doc_name, output_folder)["issues"]["injected"]
+    assert len(injected) == len(planned)
+    return dict(zip(planned, injected))
+
+
+def test_regenerate_sections_keeps_the_other_sections(mock_config):
+    generate_dataset.main([])
+
+    output_folder = generate_dataset.dataset_dir()
+    tool_dir = next(path for path in output_folder.iterdir() if path.is_dir() and not path.name.startswith("."))
+    tool = load_tool(tool_dir.name, output_folder)
+    document_type = next(
+        document_type for document_type in mock_config.documents.types
+        if (tool_dir / f"toc_{normalize_name(document_type)}.json").exists()
+    )
+    doc_name = normalize_name(document_type)
+    before = load_sections(tool_dir.name, doc_name, output_folder)
+    issue_sections = plan_issue_sections(
+        load_toc(tool_dir.name, doc_name, output_folder),
+        SeedTree(mock_config.seed).document(tool.name, document_type)
+    )
+    planned = [s.id for s in before if s.id in issue_sections]
+    # regenerate a section with a planned issue, whose saved issue is marked as stale
+    target = planned[-1]
+    metadata_path = tool_dir / f"{doc_name}_metadata.json"
+    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    metadata["issues"]["injected"][-1]["description"] = "Stale issue"
+    metadata_path.write_text(json.dumps(metadata), encoding="utf-8")
+    issues_before = issues_by_section(output_folder, tool_dir, doc_name, planned)
+
+    calls_before = get_telemetry().build_report()["totals"]["calls"]
+    generate_dataset.regenerate_document(mock_config, output_folder, tool.name, document_type, section_ids=[target])
+    calls = get_telemetry().build_report()["totals"]["calls"] - calls_before
+
+    after = load_sections(tool_dir.name, doc_name, output_folder)
+    assert calls >= 1
+    assert [s.id for s in after] == [s.id for s in before]
+    assert [s for s in after if s.id != target] == [s for s in before if s.id != target]
+    html = (tool_dir / f"{doc_name}.html").read_text(encoding="utf-8")
+    assert html == build_full_html(load_toc(tool_dir.name, doc_name, output_folder), after)
+    # the issues of the kept sections stay, the regenerated section has a new one
+    issues_after = issues_by_section(output_folder, tool_dir, doc_name, planned)
+    assert {k: v for k, v in issues_after.items() if k != target} == {k: v for k, v in issues_before.items() if k != target}
+    assert issues_after[target]["description"] != "Stale issue"
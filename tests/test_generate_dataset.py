@@ -0,0 +1,57 @@
+import pytest
+from software_whitelisting_assistant.scripts import generate_dataset
+from software_whitelisting_assistant.scripts.checkpoint import RunJournal
+from software_whitelisting_assistant.scripts.classes import Tool
+from software_whitelisting_assistant.scripts.retry import RetryBudgetExceededError
+
+
+def batched(config):
+    """The config with two tools generated by one call."""
+    raw = config.model_dump()
+    raw["tools"]["count"] = 2
+    raw["generation"]["tools_per_call"] = 2
+    return type(config).model_validate(raw)
+
+
+def test_failed_tool_batch_falls_back_to_single_tools(tmp_path, mock_config, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RetryBudgetExceededError("LLM call failed", 1)
+
+    monkeypatch.setattr(generate_dataset, "generate_tools", fail)
+    config = batched(mock_config)
+    journal = RunJournal.create(tmp_path / "runs", config)
+
+    generate_dataset.create_tools(config, journal)
+
+    assert journal.state.tools == {}
+    journal.close()
+
+
+def test_programming_error_in_tool_batch_propagates(tmp_path, mock_config, monkeypatch):
+    def broken(*args, **kwargs):
+        raise TypeError("unexpected keyword argument")
+
+    monkeypatch.setattr(generate_dataset, "generate_tools", broken)
+    config = batched(mock_config)
+    journal = RunJournal.create(tmp_path / "runs", config)
+
+    with pytest.raises(TypeError):
+        generate_dataset.create_tools(config, journal)
+    journal.close()
+
+
+def test_failed_toc_batch_leaves_the_tocs_to_their_documents(tmp_path, mock_config, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RetryBudgetExceededError("LLM call failed", 1)
+
+    monkeypatch.setattr(generate_dataset, "generate_TOCs", fail)
+    raw = mock_config.model_dump()
+    raw["generation"]["tocs_per_call"] = 2
+    config = type(mock_config).model_validate(raw)
+    journal = RunJournal.create(tmp_path / "runs", config)
+    tool = Tool(name="Pixel Weave", purpose="Image editing", category="Design", user_base="Studios")
+
+    generate_dataset.create_tocs(config, tool, tmp_path / "pixel_weave", ["Privacy Policy", "EULA"], journal)
+
+    assert [journal.document(tool.name, document_type).toc for document_type in ("Privacy Policy", "EULA")] == [None, None]
+    journal.close()
@@ -0,0 +1,61 @@
+import pytest
+from software_whitelisting_assistant.scripts import generate_sections
+from software_whitelisting_assistant.scripts.classes import SectionBatchOutput, TOC, TOCSection, Tool
+from software_whitelisting_assistant.scripts.retry import RetryBudgetExceededError
+
+
+TOOL = Tool(name="Pixel Weave", purpose="Image editing", category="Design", user_base="Studios")
+
+TOC_ = TOC(id="privacy", title="Privacy Policy", sections=[
+    TOCSection(id="1", title="Introduction", subsections=[
+        TOCSection(id="1.1", title="Scope"),
+        TOCSection(id="1.2", title="Definitions"),
+        TOCSection(id="1.3", title="Contact"),
+    ]),
+    TOCSection(id="2", title="Data"),
+    TOCSection(id="3", title="Sharing"),
+])
+
+
+@pytest.fixture
+def generate(mock_config, monkeypatch):
+    """Generate `TOC_` with sibling batching on, failing every batched call with `error`."""
+    raw = mock_config.model_dump()
+    raw["generation"]["sibling_batch"] = {"enabled": True, "token_budget": 100_000}
+    config = type(mock_config).model_validate(raw)
+    monkeypatch.setattr(generate_sections, "get_config", lambda: config)
+
+    def run(error: Exception):
+        batches = []
+        call_llm = generate_sections.call_llm
+
+        def failing_batch(**kwargs):
+            if kwargs.get("text_format") is SectionBatchOutput:
+                batches.append(kwargs["prompt"])
+                raise error
+            return call_llm(**kwargs)
+
+        monkeypatch.setattr(generate_sections, "call_llm", failing_batch)
+        sections, _ = generate_sections.generate_sections_from_toc(
+            tool=TOOL,
+            toc=TOC_,
+            document_type="Privacy Policy",
+            model=config.models.section,
+            temperature=config.generation.temperature.section,
+            max_tokens=config.generation.max_tokens.section,
+            prompt_name=config.prompts.section,
+        )
+        return sections, batches
+    return run
+
+
+def test_failed_sibling_batch_generates_the_sections_alone(generate):
+    sections, batches = generate(RetryBudgetExceededError("LLM call failed", 1))
+
+    assert len(batches) == 1
+    assert [section.id for section in sections] == ["1", "1.1", "1.2", "1.3", "2", "3"]
+
+
+def test_programming_error_in_sibling_batch_propagates(generate):
+    with pytest.raises(TypeError):
+        generate(TypeError("unexpected keyword argument"))
@@ -0,0 +1,28 @@
+import pytest
+from software_whitelisting_assistant.scripts.classes import Section
+from software_whitelisting_assistant.scripts.html_normalizer import is_trusted_section, normalize_html
+
+
+@pytest.mark.parametrize("fragment, expected, repairs", [
+    ("<p>open", "<p>open</p>", ("unclosed <p>",)),
+    ("<p>a</b></p>", "<p>a</p>", ("stray </b>",)),
+    ("<p>intro<ul><li>x</li></ul>", "<p>intro</p><ul><li>x</li></ul>", ("<ul> inside <p>",)),
+    ("<p>a &amp; b<br></p>", "<p>a &amp; b<br/></p>", ()),
+])
+def test_normalizer_balances_fragments(fragment, expected, repairs):
+    result = normalize_html(fragment)
+
+    assert result.html == expected
+    assert result.repairs == repairs
+    assert result.valid == (not repairs)
+    # the output is a fixed point
+    assert normalize_html(result.html).html == result.html
+
+
+def test_only_normalized_sections_are_trusted():
+    content = normalize_html("<p>Hello").html
+    section = Section(id="intro", title="Introduction", level=1, parent_id=None, content_html=content)
+
+    assert is_trusted_section(section)
+    assert not is_trusted_section(section.model_copy(update={"content_html": "<p>Hello"}))
+    assert not is_trusted_section(section.model_copy(update={"title": "<b>Introduction"}))
@@ -0,0 +1,46 @@
+import random
+import pytest
+from software_whitelisting_assistant.scripts import issue_repair
+from software_whitelisting_assistant.scripts.classes import InjectedIssue, IssueRepairOutput, SectionLLMOutput, TOCSection
+from software_whitelisting_assistant.scripts.issue_repair import IssueRepair
+from software_whitelisting_assistant.scripts.retry import RetryBudgetExceededError
+
+
+SECTION = TOCSection(id="intro", title="Introduction")
+ISSUE = InjectedIssue(section_id="intro", section_title="Introduction", description="Typo", severity="low")
+
+
+def repair(config) -> IssueRepair:
+    output = SectionLLMOutput(content="<p>The service is fast.</p>")
+    return IssueRepair(config, "Privacy Policy", SECTION, output, "section prompt", 0.7, random.Random(0))
+
+
+def test_failed_call_counts_as_an_unusable_repair(mock_config, monkeypatch):
+    responses = [
+        RetryBudgetExceededError("LLM call failed", 1),
+        IssueRepairOutput(original="fast", replacement="fsat", issue=ISSUE),
+    ]
+
+    def call_llm(**kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(issue_repair, "call_llm", call_llm)
+    task = repair(mock_config)
+
+    result = task.run()
+
+    assert result == SectionLLMOutput(content="<p>The service is fsat.</p>", issue=ISSUE)
+    assert task.calls == 2
+
+
+def test_programming_error_in_repair_call_propagates(mock_config, monkeypatch):
+    def call_llm(**kwargs):
+        raise TypeError("unexpected keyword argument")
+
+    monkeypatch.setattr(issue_repair, "call_llm", call_llm)
+
+    with pytest.raises(TypeError):
+        repair(mock_config).run()
@@ -0,0 +1,85 @@
+from pydantic import BaseModel
+from software_whitelisting_assistant.scripts import llm_client
+from software_whitelisting_assistant.scripts.classes import TOCSection
+from software_whitelisting_assistant.scripts.generate_sections import length_observer
+from software_whitelisting_assistant.scripts.length_model import SectionLengthModel
+from software_whitelisting_assistant.scripts.llm_cache import LLMCache
+from software_whitelisting_assistant.scripts.telemetry import LLMCallRecord
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def test_key_depends_on_request_fields(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite")
+    key = cache.make_key("model", "prompt", None, 100, None)
+
+    assert key == cache.make_key("model", "prompt", None, 100, None)
+    assert key != cache.make_key("model", "prompt", None, 200, None)
+    assert key != cache.make_key("model", "other prompt", None, 100, None)
+    assert key != cache.make_key("model", "prompt", None, 100, Answer)
+
+
+def test_sampled_requests_are_numbered_per_process(tmp_path):
+    first_run = LLMCache(tmp_path / "cache.sqlite")
+    keys = [first_run.make_key("model", "prompt", 0.7, 100, None) for _ in range(3)]
+    assert len(set(keys)) == 3
+
+    # a rerun numbers its identical requests from 0 again and finds the same entries
+    rerun = LLMCache(tmp_path / "cache.sqlite")
+    assert [rerun.make_key("model", "prompt", 0.7, 100, None) for _ in range(3)] == keys
+
+
+def test_rerun_reads_cached_responses(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    calls = []
+
+    def call():
+        calls.append(1)
+        return Answer(text=f"answer {len(calls)}")
+
+    first = [LLMCache(path).get_or_call("model", "prompt", 0.7, 100, Answer, call)]
+    rerun = LLMCache(path).get_or_call("model", "prompt", 0.7, 100, Answer, call)
+
+    assert rerun == first[0]
+    assert len(calls) == 1
+
+
+def test_write_through_refreshes_entries(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    LLMCache(path).get_or_call("model", "prompt", None, 100, None, lambda: "old")
+
+    assert LLMCache(path, mode="write_through").get_or_call("model", "prompt", None, 100, None, lambda: "new") == "new"
+    assert LLMCache(path).get_or_call("model", "prompt", None, 100, None, lambda: "unused") == "new"
+
+
+def test_learned_max_tokens_are_not_part_of_the_key(tmp_path, monkeypatch):
+    requests = []
+
+    def fake_request(prompt, model, max_tokens, *args):
+        requests.append(max_tokens)
+        return f"response {len(requests)}"
+
+    monkeypatch.setattr(llm_client, "_request", fake_request)
+
+    monkeypatch.setattr(llm_client, "get_cache", lambda: LLMCache(tmp_path / "cache.sqlite"))
+    first = llm_client.call_llm("prompt", "model", max_tokens=640, temperature=0.7, cache_max_tokens=1000)
+    # the next run learned another limit for the same section
+    monkeypatch.setattr(llm_client, "get_cache", lambda: LLMCache(tmp_path / "cache.sqlite"))
+    rerun = llm_client.call_llm("prompt", "model", max_tokens=520, temperature=0.7, cache_max_tokens=1000)
+
+    assert rerun == first
+    assert requests == [640]
+
+
+def test_length_observer_skips_truncated_responses(tmp_path):
+    model = SectionLengthModel(tmp_path / "lengths.sqlite", min_samples=1)
+    section = TOCSection(id="intro", title="Introduction", subsections=[])
+    observe = length_observer(model, "Privacy Policy", section, 1)
+
+    observe(LLMCallRecord(stage="section", model="model", output_tokens=400, truncated=True))
+    observe(LLMCallRecord(stage="section", model="model", output_tokens=300))
+
+    assert len(model) == 1
+    assert model.max_tokens_for("Privacy Policy", 1, "Introduction", default=1000) == 360
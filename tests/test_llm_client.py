@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from pydantic import BaseModel
+from software_whitelisting_assistant.scripts import llm_client
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def response(text: str, truncated: bool, parsed: BaseModel = None):
+    return SimpleNamespace(
+        status="incomplete" if truncated else "completed",
+        incomplete_details=SimpleNamespace(reason="max_output_tokens") if truncated else None,
+        output_text=text,
+        output_parsed=parsed,
+        usage=SimpleNamespace(input_tokens=10, output_tokens=5, input_tokens_details=None),
+    )
+
+
+class FakeBackend:
+    """Serves the queued responses to the sync and async clients and records the budgets."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.budgets = []
+
+    def _next(self, max_output_tokens, **kwargs):
+        self.budgets.append(max_output_tokens)
+        return self.responses.pop(0)
+
+    def create(self, **kwargs):
+        return self._next(**kwargs)
+
+    parse = create
+
+    def for_stage(self, stage):
+        return SimpleNamespace(responses=self)
+
+    def async_for_stage(self, stage):
+        async def call(**kwargs):
+            return self._next(**kwargs)
+        return SimpleNamespace(responses=SimpleNamespace(create=call, parse=call))
+
+
+@pytest.fixture(params=["sync", "async"])
+def request_llm(request, mock_config, monkeypatch):
+    """`call_llm`, or `call_llm_async` run to completion, on a fake backend."""
+    def run(backend: FakeBackend, **kwargs):
+        monkeypatch.setattr(llm_client, "get_backend", lambda config: backend)
+        if request.param == "sync":
+            return llm_client.call_llm(**kwargs)
+        return asyncio.run(llm_client.call_llm_async(**kwargs))
+    return run
+
+
+def test_truncated_text_is_continued(request_llm):
+    backend = FakeBackend(response("Hello, ", truncated=True), response("world", truncated=False))
+
+    text = request_llm(backend, prompt="Greet", model="model", max_tokens=5)
+
+    assert text == "Hello, world"
+    assert backend.budgets == [5, 5]
+
+
+def test_truncated_structured_output_is_reissued_with_a_larger_budget(request_llm):
+    backend = FakeBackend(
+        response("", truncated=True),
+        response("", truncated=False, parsed=Answer(text="done")),
+    )
+
+    answer = request_llm(backend, prompt="Answer", model="model", max_tokens=100, text_format=Answer)
+
+    assert answer == Answer(text="done")
+    assert backend.budgets == [100, 200]
+
+
+def test_truncation_past_the_budget_raises(request_llm):
+    backend = FakeBackend(*(response("", truncated=True) for _ in range(3)))
+
+    with pytest.raises(llm_client.TruncatedResponseError):
+        request_llm(backend, prompt="Answer", model="model", max_tokens=100, text_format=Answer)
+    assert backend.budgets == [100, 200, 400]
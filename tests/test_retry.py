@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from software_whitelisting_assistant.scripts.retry import InFlightLimiter
+
+
+def test_in_flight_limit_is_shared_by_threads_and_tasks():
+    limiter = InFlightLimiter(3)
+    lock = threading.Lock()
+    in_flight, peak = 0, 0
+
+    def enter():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+
+    def leave():
+        nonlocal in_flight
+        with lock:
+            in_flight -= 1
+
+    def sync_request():
+        with limiter.slot():
+            enter()
+            time.sleep(0.01)
+            leave()
+
+    async def async_request():
+        async with limiter.slot_async():
+            enter()
+            await asyncio.sleep(0.01)
+            leave()
+
+    async def tasks():
+        await asyncio.gather(*(async_request() for _ in range(10)))
+
+    threads = [threading.Thread(target=sync_request) for _ in range(10)]
+    threads.append(threading.Thread(target=lambda: asyncio.run(tasks())))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert peak == 3
+    assert in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    limiter = InFlightLimiter(1)
+
+    async def scenario():
+        limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        # the slot is handed to the waiter, which is cancelled before it resumes
+        limiter.release()
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+        limiter.release()
+
+    asyncio.run(scenario())
+    assert limiter._in_flight == 0
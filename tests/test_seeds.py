@@ -0,0 +1,30 @@
+from software_whitelisting_assistant.scripts.seeds import SeedTree, plan_document_types
+
+
+def test_node_seed_depends_only_on_root_and_path():
+    assert SeedTree(3).document("Pixel Weave", "Privacy Policy").seed == SeedTree(3).document("Pixel Weave", "Privacy Policy").seed
+    assert SeedTree(3).document("Pixel Weave", "Privacy Policy").seed != SeedTree(4).document("Pixel Weave", "Privacy Policy").seed
+    assert SeedTree(3).document("Pixel Weave", "Privacy Policy").seed != SeedTree(3).document("Pixel Weave", "Terms of Service").seed
+
+
+def test_document_node_uses_normalized_names():
+    assert SeedTree(3).document("Pixel Weave", "Privacy Policy").path == SeedTree(3).document("pixel_weave", "privacy policy").path
+
+
+def test_choices_do_not_depend_on_other_documents():
+    seeds = SeedTree(3)
+    alone = seeds.document("Pixel Weave", "Privacy Policy").child("issues").rng().random()
+
+    # drawing from other nodes first does not shift the document's choices
+    seeds.document("Ledger Lynx", "Privacy Policy").child("issues").rng().random()
+    assert seeds.document("Pixel Weave", "Privacy Policy").child("issues").rng().random() == alone
+
+
+def test_plan_document_types_is_reproducible():
+    types = ["Privacy Policy", "Terms of Service", "Security Whitepaper", "Service Level Agreement"]
+    plan = plan_document_types(SeedTree(3), types, per_tool=2, tool_count=3)
+
+    assert plan == plan_document_types(SeedTree(3), types, per_tool=2, tool_count=3)
+    assert all(len(set(doc_types)) == 2 for doc_types in plan)
+    # a longer run keeps the plans of the first tools
+    assert plan_document_types(SeedTree(3), types, per_tool=2, tool_count=5)[:3] == plan
@@ -0,0 +1,66 @@
+from software_whitelisting_assistant.scripts.classes import Tool
+from software_whitelisting_assistant.scripts.tool_dedup import ToolIndex
+
+
+def make_tool(name: str, purpose: str) -> Tool:
+    return Tool(name=name, purpose=purpose, category="Productivity", user_base="Teams")
+
+
+def open_index(path) -> ToolIndex:
+    return ToolIndex(path, threshold=0.6, num_perm=64, shingle_size=4)
+
+
+def test_near_duplicate_is_rejected(tmp_path):
+    index = open_index(tmp_path / "tools.sqlite")
+    assert index.claim(make_tool("Pixel Weave", "Collaborative image editing for design teams")) is None
+
+    match = index.claim(make_tool("PixelWeave", "Collaborative image editing for design teams"))
+
+    assert match is not None
+    assert match.tool_key == "pixel_weave"
+
+
+def test_distinct_tool_is_accepted(tmp_path):
+    index = open_index(tmp_path / "tools.sqlite")
+    index.claim(make_tool("Pixel Weave", "Collaborative image editing for design teams"))
+
+    assert index.claim(make_tool("Ledger Lynx", "Automated bookkeeping for small businesses")) is None
+    assert len(index) == 2
+
+
+def test_same_tool_twice_in_one_run_collides(tmp_path):
+    index = open_index(tmp_path / "tools.sqlite")
+    tool = make_tool("Pixel Weave", "Collaborative image editing for design teams")
+    index.claim(tool)
+
+    assert index.claim(tool) is not None
+
+
+def test_rerun_accepts_tool_of_earlier_run(tmp_path):
+    path = tmp_path / "tools.sqlite"
+    tool = make_tool("Pixel Weave", "Collaborative image editing for design teams")
+    open_index(path).claim(tool)
+
+    # a rerun replaying the same tool from the response cache
+    rerun = open_index(path)
+    assert rerun.claim(tool) is None
+    # but a second claim within the rerun is still a collision
+    assert rerun.claim(tool) is not None
+
+
+def test_rerun_rejects_other_tool_with_existing_name(tmp_path):
+    path = tmp_path / "tools.sqlite"
+    open_index(path).claim(make_tool("Pixel Weave", "Collaborative image editing for design teams"))
+
+    rerun = open_index(path)
+    assert rerun.claim(make_tool("Pixel Weave", "Password manager for families")) is not None
+
+
+def test_journaled_tool_counts_as_claimed(tmp_path):
+    path = tmp_path / "tools.sqlite"
+    tool = make_tool("Pixel Weave", "Collaborative image editing for design teams")
+    open_index(path).claim(tool)
+
+    resumed = open_index(path)
+    resumed.add(tool, claimed=True)
+    assert resumed.claim(tool) is not None
@@ -0,0 +1,123 @@
+import threading
+import pytest
+from software_whitelisting_assistant.config.classes import WorkQueueConfig
+from software_whitelisting_assistant.scripts import generate_dataset, work_queue
+from software_whitelisting_assistant.scripts.classes import TOC, TOCSection, Tool
+from software_whitelisting_assistant.scripts.generate_sections import GenerationCancelledError
+from software_whitelisting_assistant.scripts.html_writer import IncrementalHTMLWriter
+from software_whitelisting_assistant.scripts.work_queue import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time seen by the queue; advance it with `clock.advance(seconds)`."""
+    class Clock:
+        now = 1_000_000.0
+
+        def advance(self, seconds: float) -> None:
+            self.now += seconds
+
+    fake = Clock()
+    monkeypatch.setattr(work_queue.time, "time", lambda: fake.now)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = WorkQueue(tmp_path / "queue.sqlite", WorkQueueConfig(lease_s=60, max_attempts=2))
+    queue.enqueue([("pixel_weave", "Privacy Policy")])
+    yield queue
+    queue.close()
+
+
+def test_live_lease_is_not_handed_out_again(queue, clock):
+    job = queue.claim("worker-a")
+
+    clock.advance(59)
+    assert queue.claim("worker-b") is None
+
+    # a heartbeat extends the lease
+    assert queue.heartbeat(job)
+    clock.advance(59)
+    assert queue.claim("worker-b") is None
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue, clock):
+    stale = queue.claim("worker-a")
+
+    clock.advance(61)
+    job = queue.claim("worker-b")
+
+    assert (job.worker, job.attempt) == ("worker-b", 2)
+    # the first worker lost its lease and cannot finish the job any more
+    assert not queue.heartbeat(stale)
+    assert not queue.complete(stale)
+    assert queue.complete(job)
+    assert queue.progress()[DONE] == 1
+
+
+def test_job_fails_after_max_attempts_expired_leases(queue, clock):
+    for worker in ("worker-a", "worker-b"):
+        assert queue.claim(worker) is not None
+        clock.advance(61)
+
+    assert queue.claim("worker-c") is None
+    assert queue.progress()[FAILED] == 1
+    assert queue.failures() == [("pixel_weave", "Privacy Policy", "lease expired")]
+
+
+def test_released_job_is_retried_until_max_attempts(queue):
+    assert queue.release(queue.claim("worker-a"), "boom")
+    assert queue.progress()[PENDING] == 1
+
+    assert queue.release(queue.claim("worker-b"), "boom again")
+    assert queue.failures() == [("pixel_weave", "Privacy Policy", "boom again")]
+
+
+def test_job_abandoned_after_a_lost_lease_is_not_released(queue, tmp_path, monkeypatch):
+    job = queue.claim("worker-a")
+    calls = []
+
+    def generate_document(config, tool, tool_dir, document_type, toc, cancel, partial_tag):
+        calls.append(partial_tag)
+        # the heartbeat found the job claimed by another worker
+        cancel.set()
+        raise GenerationCancelledError("Generation cancelled before section '1'")
+
+    monkeypatch.setattr(work_queue, "load_tool", lambda tool, output_folder: None)
+    monkeypatch.setattr(work_queue, "generate_document", generate_document)
+    work_queue.process_job(None, tmp_path, queue, job)
+
+    assert calls == ["worker-a.1"]
+    # the job stays with the new lease holder instead of going back to the queue
+    assert queue.progress()[LEASED] == 1
+    assert queue.failures() == []
+
+
+def test_cancelled_document_makes_no_section_calls(mock_config, tmp_path):
+    tool = Tool(name="Pixel Weave", purpose="Image editing", category="Design", user_base="Studios")
+    toc = TOC(id="privacy", title="Privacy Policy", sections=[
+        TOCSection(id=str(i), title=title)
+        for i, title in enumerate(["Introduction", "Scope", "Data", "Sharing", "Retention", "Contact"], 1)
+    ])
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(GenerationCancelledError):
+        generate_dataset.generate_document(
+            mock_config, tool, tmp_path / "pixel_weave", "Privacy Policy", toc=toc, cancel=cancel
+        )
+    assert not (tmp_path / "pixel_weave" / "privacy_policy.html").exists()
+
+
+def test_partial_files_of_two_attempts_are_distinct(tmp_path):
+    toc = TOC(id="privacy", title="Privacy Policy", sections=[TOCSection(id="1", title="Introduction")])
+    path = tmp_path / "privacy_policy.html"
+
+    first = IncrementalHTMLWriter(toc, path, partial_tag="worker-a.1")
+    second = IncrementalHTMLWriter(toc, path, partial_tag="worker-b.2")
+    first.abort()
+
+    assert second.partial_path == tmp_path / "privacy_policy.html.worker-b.2.partial"
+    assert second.partial_path.exists()
+    second.abort()